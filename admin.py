@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Admin client for YOLOv11x backend
+Sends admin events to a running server (requires config.ADMIN_TOKEN / YOLO_ADMIN_TOKEN)
+
+Usage:
+  python admin.py reload                       # Re-read config.py now
+  python admin.py reload --preset BALANCED     # Change the default preset live
+  python admin.py reload --param conf=0.5 --param max_det=50
+  python admin.py reload --reset               # Drop earlier overrides
+  python admin.py swap model/best_v2.pt        # Hot-swap the default model's weights
+  python admin.py swap model/fast_v2.pt --model fast --version 2024-06-01
+  python admin.py record on                    # Record all sessions' frames (replay.py)
+  python admin.py record on --sid <sid>        # Record one session
+  python admin.py record off
+  python admin.py profile --seconds 15         # Sample the server, write a .folded flamegraph file
+  python admin.py stats
+"""
+
+import argparse
+import ast
+import json
+import os
+
+import socketio
+
+SERVER_URL = "http://localhost:3000"
+
+
+def parse_params(items):
+    """Parse key=value pairs, evaluating values as Python literals when possible"""
+    params = {}
+    for item in items or []:
+        key, _, value = item.partition("=")
+        try:
+            params[key] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            params[key] = value
+    return params
+
+
+def main():
+    parser = argparse.ArgumentParser(description="YOLOv11x backend admin")
+    parser.add_argument("--url", default=SERVER_URL)
+    parser.add_argument("--token", default=os.environ.get("YOLO_ADMIN_TOKEN"),
+                        help="Admin token (default: $YOLO_ADMIN_TOKEN)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    reload_cmd = commands.add_parser("reload", help="Reload config / change settings live")
+    reload_cmd.add_argument("--preset", help="New default preset")
+    reload_cmd.add_argument("--param", action="append", metavar="KEY=VALUE",
+                            help="YOLO parameter override (repeatable)")
+    reload_cmd.add_argument("--reset", action="store_true", help="Drop earlier overrides")
+
+    swap_cmd = commands.add_parser("swap", help="Load new weights and switch to them live")
+    swap_cmd.add_argument("path", help="New weights file (on the server)")
+    swap_cmd.add_argument("--model", help="Model name from MODELS (default: DEFAULT_MODEL)")
+    swap_cmd.add_argument("--version", help="Version label reported in detections")
+
+    record_cmd = commands.add_parser("record", help="Turn frame recording on or off")
+    record_cmd.add_argument("state", choices=["on", "off"])
+    record_cmd.add_argument("--sid", help="Only this session (default: all sessions)")
+
+    profile_cmd = commands.add_parser("profile", help="Run the sampling profiler for a while")
+    profile_cmd.add_argument("--seconds", type=float, default=10)
+    profile_cmd.add_argument("--interval-ms", type=float, help="Sampling interval (default: PROFILE_INTERVAL_MS)")
+
+    commands.add_parser("stats", help="Show serving statistics for all sessions")
+
+    args = parser.parse_args()
+
+    sio = socketio.Client()
+    sio.connect(args.url)
+    try:
+        if args.command == "reload":
+            response = sio.call("reload_config", {
+                "token": args.token,
+                "preset": args.preset,
+                "params": parse_params(args.param),
+                "reset": args.reset,
+            }, timeout=30)
+        elif args.command == "swap":
+            # Loading and warming up large weights can take a while
+            response = sio.call("swap_model", {
+                "token": args.token,
+                "path": args.path,
+                "model": args.model,
+                "version": args.version,
+            }, timeout=300)
+        elif args.command == "record":
+            response = sio.call("record", {
+                "token": args.token,
+                "enable": args.state == "on",
+                "sid": args.sid,
+            }, timeout=10)
+        elif args.command == "profile":
+            response = sio.call("profile", {
+                "token": args.token,
+                "seconds": args.seconds,
+                "interval_ms": args.interval_ms,
+            }, timeout=args.seconds + 30)
+        else:
+            response = sio.call("stats", {"token": args.token, "all": True}, timeout=10)
+        print(json.dumps(response, indent=2))
+    finally:
+        sio.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Annotation rendering for YOLOv11x backend and clients
+Boxes, labels and info panels drawn in place, with cached label glyphs
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+Color = Tuple[int, int, int]
+
+
+class AnnotationRenderer:
+    """
+    Draws detections and info panels onto frames without copying them.
+
+    - canvas() copies a frame into a buffer reused across calls (only
+      reallocated when the frame size changes); draw into the frame itself
+      when it may be modified.
+    - All boxes of a frame are drawn with one cv2.polylines call, from
+      corners computed with numpy.
+    - A label (background plus text) is rendered once per class name and
+      confidence bucket, kept in a small LRU, and pasted with a slice copy
+      instead of getTextSize/rectangle/putText per box. Buckets are the
+      label's display precision, so cached labels read exactly the same.
+    - panel() darkens only the panel's region instead of blending a full
+      copy of the frame.
+
+    The label cache is locked, so one renderer can serve several
+    post-processing threads (the canvas buffer is not: one per thread).
+    """
+
+    def __init__(
+        self,
+        box_color: Color = (0, 255, 0),
+        box_thickness: int = 2,
+        label_color: Color = (0, 255, 0),
+        text_color: Color = (0, 0, 0),
+        font_scale: float = 0.5,
+        text_thickness: int = 1,
+        label_format: str = "{name}: {confidence:.2f}",
+        confidence_step: float = 0.01,
+        padding: int = 5,
+        max_labels: int = 256,
+    ):
+        """
+        Args:
+            box_color / label_color / text_color: BGR colors
+            label_format: Label text, formatted with name and confidence
+            confidence_step: Confidence bucket of cached labels (match label_format's precision)
+            padding: Pixels around the label text
+            max_labels: Cached label glyphs (least recently used dropped first)
+        """
+        self.box_color = box_color
+        self.box_thickness = box_thickness
+        self.label_color = label_color
+        self.text_color = text_color
+        self.font_scale = font_scale
+        self.text_thickness = text_thickness
+        self.label_format = label_format
+        self.confidence_step = confidence_step
+        self.padding = padding
+        self.max_labels = max_labels
+        self.font = cv2.FONT_HERSHEY_SIMPLEX
+        self.labels: "OrderedDict[Tuple[str, int], np.ndarray]" = OrderedDict()
+        self.label_hits = 0
+        self.label_misses = 0
+        self._canvas: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    # -------------------------------
+    # Buffers
+    # -------------------------------
+    def canvas(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Copy a frame into the reused drawing buffer
+
+        Args:
+            frame: Frame to annotate (left untouched)
+
+        Returns:
+            The buffer, valid until the next canvas() call
+        """
+        if self._canvas is None or self._canvas.shape != frame.shape or self._canvas.dtype != frame.dtype:
+            self._canvas = np.empty_like(frame)
+        np.copyto(self._canvas, frame)
+        return self._canvas
+
+    # -------------------------------
+    # Detections
+    # -------------------------------
+    def label(self, name: str, confidence: float) -> np.ndarray:
+        """Rendered label glyph (background + text) for a class and confidence bucket"""
+        key = (name, int(round(confidence / self.confidence_step)))
+        with self._lock:
+            glyph = self.labels.get(key)
+            if glyph is not None:
+                self.labels.move_to_end(key)
+                self.label_hits += 1
+                return glyph
+            self.label_misses += 1
+
+        text = self.label_format.format(name=name, confidence=key[1] * self.confidence_step)
+        (text_w, text_h), baseline = cv2.getTextSize(text, self.font, self.font_scale, self.text_thickness)
+        glyph = np.empty((text_h + baseline + 2 * self.padding, text_w + 2 * self.padding, 3), np.uint8)
+        glyph[:] = self.label_color
+        cv2.putText(glyph, text, (self.padding, self.padding + text_h), self.font,
+                    self.font_scale, self.text_color, self.text_thickness, cv2.LINE_AA)
+        with self._lock:
+            self.labels[key] = glyph
+            while len(self.labels) > self.max_labels:
+                self.labels.popitem(last=False)
+        return glyph
+
+    def draw_detections(
+        self,
+        frame: np.ndarray,
+        detections: List[Dict],
+        boxes: Optional[Sequence[Sequence[float]]] = None,
+    ) -> np.ndarray:
+        """
+        Draw boxes and labels into a frame (in place)
+
+        Args:
+            frame: BGR frame to draw on (e.g. from canvas())
+            detections: Detection dicts with 'class_name' and 'confidence'
+            boxes: [x1, y1, x2, y2] per detection in frame pixels (default: each 'bbox')
+
+        Returns:
+            The same frame
+        """
+        if not detections:
+            return frame
+        if boxes is None:
+            boxes = [det["bbox"] for det in detections]
+        height, width = frame.shape[:2]
+        corners = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        corners = np.rint(corners).astype(np.int32)
+        np.clip(corners[:, 0::2], 0, width - 1, out=corners[:, 0::2])
+        np.clip(corners[:, 1::2], 0, height - 1, out=corners[:, 1::2])
+        # (x1, y1), (x2, y1), (x2, y2), (x1, y2) for every box, one polyline each
+        polygons = corners[:, [0, 1, 2, 1, 2, 3, 0, 3]].reshape(-1, 4, 2)
+        cv2.polylines(frame, list(polygons), True, self.box_color, self.box_thickness)
+
+        for det, (x1, y1, _, _) in zip(detections, corners.tolist()):
+            glyph = self.label(det.get("class_name", str(det.get("class_id", "obj"))), det.get("confidence", 0.0))
+            # Above the box, or just inside its top edge when there is no room;
+            # shifted left rather than cut off at the right edge
+            top = y1 - glyph.shape[0] if y1 >= glyph.shape[0] else y1
+            self._paste(frame, glyph, max(0, min(x1, width - glyph.shape[1])), top)
+        return frame
+
+    @staticmethod
+    def _paste(frame: np.ndarray, glyph: np.ndarray, x: int, y: int):
+        """Copy a glyph into the frame at (x, y), clipped to the frame"""
+        h = min(glyph.shape[0], frame.shape[0] - y)
+        w = min(glyph.shape[1], frame.shape[1] - x)
+        if h > 0 and w > 0:
+            frame[y:y + h, x:x + w] = glyph[:h, :w]
+
+    # -------------------------------
+    # Info panel
+    # -------------------------------
+    def panel(
+        self,
+        frame: np.ndarray,
+        rect: Tuple[int, int, int, int],
+        lines: Sequence[Tuple[str, Color, float, int]],
+        opacity: float = 0.6,
+        line_height: int = 25,
+    ) -> np.ndarray:
+        """
+        Darken a rectangle of the frame and write text lines on it (in place)
+
+        Args:
+            frame: BGR frame to draw on
+            rect: Panel (x1, y1, x2, y2), clipped to the frame
+            lines: (text, color, font scale, thickness) per line, top to bottom
+            opacity: How dark the panel is (0 = invisible, 1 = black)
+            line_height: Pixels between baselines
+
+        Returns:
+            The same frame
+        """
+        height, width = frame.shape[:2]
+        x1, y1 = max(0, rect[0]), max(0, rect[1])
+        x2, y2 = min(width, rect[2]), min(height, rect[3])
+        if x2 > x1 and y2 > y1:
+            region = frame[y1:y2, x1:x2]  # View: blended in place, the rest of the frame is untouched
+            cv2.convertScaleAbs(region, dst=region, alpha=1.0 - opacity)
+        for i, (text, color, scale, thickness) in enumerate(lines):
+            cv2.putText(frame, text, (x1 + 10, y1 + 35 + i * line_height),
+                        self.font, scale, color, thickness, cv2.LINE_AA)
+        return frame
+
+    def stats(self) -> Dict:
+        lookups = self.label_hits + self.label_misses
+        return {
+            "labels": len(self.labels),
+            "label_hit_rate": round(self.label_hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+def encode_annotated(frame: np.ndarray, quality: int = 80) -> Optional[bytes]:
+    """JPEG bytes of an annotated frame (None if encoding failed)"""
+    ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buffer.tobytes() if ok else None
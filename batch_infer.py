@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Offline batch inference for YOLOv11x backend
+Runs a model over image folders and video files with the server's
+letterbox / inference / post-processing code and writes every detection
+
+A reader thread decodes frames ahead of inference (up to --prefetch), the
+main thread runs batched model calls, and a writer thread serialises the
+results, so decoding, inference and disk I/O overlap.
+
+Output:
+  <out>.jsonl     One line per frame: source, frame index, timestamp, size, model, detections
+  <out>.parquet   One row per detection (columnar) when pyarrow is installed,
+                  otherwise <out>.npz holding the same columns as numpy arrays
+
+Usage:
+  python batch_infer.py images/ --out results
+  python batch_infer.py clip.mp4 --stride 5 --model fast
+  python batch_infer.py data/ --recursive --batch 32 --imgsz 640 --top 1
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import queue
+import threading
+import time
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+import config
+from inference import extract_detections, infer_batch
+from model_registry import ModelRegistry
+from profiler import StageTimers
+from runtime_config import RuntimeConfig
+from thread_budget import apply_thread_budget, plan_threads
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:  # Columnar output falls back to .npz
+    pyarrow = None
+
+
+def collect_sources(paths: List[str], recursive: bool) -> List[str]:
+    """Expand folders into their image and video files (sorted), keep files as given"""
+    extensions = tuple(config.OFFLINE_IMAGE_EXTENSIONS + config.OFFLINE_VIDEO_EXTENSIONS)
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            if recursive:
+                found = [os.path.join(root, name) for root, _, names in os.walk(path) for name in names]
+            else:
+                found = [os.path.join(path, name) for name in os.listdir(path)]
+            sources.extend(sorted(f for f in found if f.lower().endswith(extensions)))
+        elif os.path.isfile(path):
+            sources.append(path)
+        else:
+            print(f"[BATCH] ⚠️ Skipping {path}: not found")
+    return sources
+
+
+def is_video(path: str) -> bool:
+    return path.lower().endswith(tuple(config.OFFLINE_VIDEO_EXTENSIONS))
+
+
+class FrameReader:
+    """
+    Reader thread: decodes images and video frames into a bounded queue.
+
+    Items are (source, frame index, timestamp in seconds or None, BGR frame);
+    None marks the end. The queue bound keeps at most `prefetch` decoded
+    frames in memory when inference is the bottleneck.
+    """
+
+    def __init__(self, sources: List[str], prefetch: int, stride: int = 1, limit: int = None,
+                 timers: StageTimers = None):
+        self.sources = sources
+        self.stride = max(1, stride)
+        self.limit = limit
+        self.timers = timers or StageTimers()
+        self.frames: "queue.Queue" = queue.Queue(maxsize=prefetch)
+        self.read = 0
+        self.unreadable = 0
+        self.thread = threading.Thread(target=self._run, name="frame-reader", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def _emit(self, item) -> bool:
+        self.frames.put(item)
+        self.read += 1
+        return self.limit is None or self.read < self.limit
+
+    def _read_video(self, path: str) -> bool:
+        capture = cv2.VideoCapture(path)
+        if not capture.isOpened():
+            print(f"[BATCH] ⚠️ Cannot open video {path}")
+            self.unreadable += 1
+            return True
+        fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+        index = 0
+        try:
+            while True:
+                with self.timers.stage('decode'):
+                    if index % self.stride:
+                        ok, frame = capture.grab(), None  # Skipped frames are not decoded
+                    else:
+                        ok, frame = capture.read()
+                if not ok:
+                    return True
+                if frame is not None and not self._emit((path, index, round(index / fps, 3) if fps else None, frame)):
+                    return False
+                index += 1
+        finally:
+            capture.release()
+
+    def _run(self):
+        try:
+            for path in self.sources:
+                if is_video(path):
+                    if not self._read_video(path):
+                        break
+                    continue
+                with self.timers.stage('decode'):
+                    frame = cv2.imread(path, cv2.IMREAD_COLOR)
+                if frame is None:
+                    print(f"[BATCH] ⚠️ Cannot decode {path}")
+                    self.unreadable += 1
+                elif not self._emit((path, 0, None, frame)):
+                    break
+        finally:
+            self.frames.put(None)
+
+
+class ResultWriter:
+    """
+    Writer thread: one JSONL line per frame, plus one columnar row per detection.
+
+    Columns are accumulated in memory (a few numbers per detection) and
+    written once at the end as Parquet, or as .npz without pyarrow.
+    """
+
+    COLUMNS = ("source", "frame", "timestamp", "class_id", "class_name", "confidence", "x1", "y1", "x2", "y2")
+    DTYPES = (str, np.int64, np.float64, np.int32, str, np.float32, np.float32, np.float32, np.float32, np.float32)
+
+    def __init__(self, out: str, timers: StageTimers = None):
+        self.out = out
+        self.timers = timers or StageTimers()
+        self.results: "queue.Queue" = queue.Queue(maxsize=config.OFFLINE_PREFETCH)
+        self.columns: Dict[str, list] = {name: [] for name in self.COLUMNS}
+        self.frames = 0
+        self.detections = 0
+        self.paths: List[str] = []
+        self.thread = threading.Thread(target=self._run, name="result-writer", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def put(self, record: Dict):
+        self.results.put(record)
+
+    def close(self) -> List[str]:
+        """Flush everything and return the files written"""
+        self.results.put(None)
+        self.thread.join()
+        return self.paths
+
+    def _run(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.out)), exist_ok=True)
+        with open(self.out + ".jsonl", "w") as f:
+            while True:
+                record = self.results.get()
+                if record is None:
+                    break
+                with self.timers.stage('write'):
+                    f.write(json.dumps(record, separators=(",", ":")) + "\n")
+                    for det in record["detections"]:
+                        x1, y1, x2, y2 = det["bbox"]
+                        for name, value in zip(self.COLUMNS, (
+                                record["source"], record["frame"], record["timestamp"], det["class_id"],
+                                det["class_name"], det["confidence"], x1, y1, x2, y2)):
+                            self.columns[name].append(value)
+                    self.frames += 1
+                    self.detections += len(record["detections"])
+        self.paths = [self.out + ".jsonl", self._write_columns()]
+
+    def _write_columns(self) -> str:
+        if pyarrow is not None:
+            path = self.out + ".parquet"
+            pq.write_table(pyarrow.table(self.columns), path)
+            return path
+        path = self.out + ".npz"
+        timestamps = [np.nan if t is None else t for t in self.columns["timestamp"]]
+        arrays = {name: np.asarray(timestamps if name == "timestamp" else self.columns[name], dtype)
+                  for name, dtype in zip(self.COLUMNS, self.DTYPES)}
+        np.savez_compressed(path, **arrays)
+        return path
+
+
+def image_size(value: str) -> int:
+    """argparse type for --imgsz: a positive multiple of the model stride (32)"""
+    try:
+        size = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{value!r} is not a number")
+    if size <= 0 or size % 32:
+        raise argparse.ArgumentTypeError(f"{size} is not a positive multiple of 32 (e.g. 320, 480, 640)")
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run YOLOv11x over image folders and videos")
+    parser.add_argument("inputs", nargs="+", help="Image files, video files or folders")
+    parser.add_argument("--out", default="results", help="Output path without extension")
+    parser.add_argument("--model", choices=list(config.MODELS) + list(config.CASCADES),
+                        help="Model or cascade name (default: DEFAULT_MODEL)")
+    parser.add_argument("--preset", choices=list(config.PRESETS), help="Quality preset (default: ACTIVE_PRESET)")
+    parser.add_argument("--imgsz", type=image_size, help="Inference size, a multiple of 32 (default: IMAGE_SIZE)")
+    parser.add_argument("--batch", type=int, default=config.OFFLINE_BATCH_SIZE, help="Frames per model call")
+    parser.add_argument("--prefetch", type=int, default=config.OFFLINE_PREFETCH, help="Decoded frames kept ahead")
+    parser.add_argument("--stride", type=int, default=1, help="Use every Nth video frame")
+    parser.add_argument("--top", type=int, help="Keep only the N most confident detections per frame")
+    parser.add_argument("--limit", type=int, help="Stop after this many frames")
+    parser.add_argument("--recursive", action="store_true", help="Descend into sub-folders")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("YOLOv11x Offline Batch Inference")
+    print("=" * 70)
+
+    sources = collect_sources(args.inputs, args.recursive)
+    if not sources:
+        print("No images or videos found")
+        return 1
+    videos = sum(is_video(s) for s in sources)
+    print(f"Inputs:  {len(sources) - videos} image(s), {videos} video(s)")
+
+    if config.THREAD_BUDGET_ENABLED:
+        plan = apply_thread_budget(plan_threads(decode_workers=1))  # The reader thread decodes
+        print(f"Threads: torch {plan['torch_intra']} intra-op, OpenCV {plan['opencv']} ({plan['cores']} cores)")
+    settings = RuntimeConfig().resolve(args.preset)
+    size = args.imgsz or settings['image_size']
+    registry = ModelRegistry()
+    route = asyncio.run(registry.acquire(args.model))
+    print(f"Model:   '{route['name']}' at {size}px, preset {settings['preset']}, batch {args.batch}\n")
+
+    timers = StageTimers()
+    reader = FrameReader(sources, args.prefetch, args.stride, args.limit, timers)
+    writer = ResultWriter(args.out, timers)
+    reader.start()
+    writer.start()
+
+    def run(batch):
+        outputs = infer_batch(route, size, settings['params'], [item[3] for item in batch], timers)
+        with timers.stage('postprocess'):
+            for (source, index, timestamp, frame), output in zip(batch, outputs):
+                writer.put({
+                    'source': source,
+                    'frame': index,
+                    'timestamp': timestamp,
+                    'width': frame.shape[1],
+                    'height': frame.shape[0],
+                    'model': output['model'],
+                    'model_version': output['model_version'],
+                    'detections': extract_detections(output, args.top),
+                })
+
+    start = time.perf_counter()
+    last_report = start
+    done = 0
+    batch = []
+    while True:
+        wait_start = time.perf_counter()
+        item = reader.frames.get()
+        timers.record('wait_for_reader', (time.perf_counter() - wait_start) * 1000)
+        if item is not None:
+            batch.append(item)
+        if batch and (item is None or len(batch) >= args.batch):
+            run(batch)
+            done += len(batch)
+            batch = []
+            now = time.perf_counter()
+            if now - last_report >= 2.0:
+                print(f"[BATCH] {done} frames, {done / (now - start):.1f} FPS")
+                last_report = now
+        if item is None:
+            break
+    inference_done = time.perf_counter()
+    paths = writer.close()
+    registry.release(route)
+    elapsed = time.perf_counter() - start
+
+    print(f"\n{'=' * 70}")
+    print(f"Frames:      {writer.frames} ({reader.unreadable} unreadable input(s))")
+    print(f"Detections:  {writer.detections}")
+    print(f"Throughput:  {writer.frames / elapsed if elapsed else 0:.1f} frames/sec "
+          f"({elapsed:.1f}s total, {inference_done - start:.1f}s until the last batch)")
+    print("Stages (ms per call):")
+    for name, stats in timers.stats().items():
+        print(f"  {name:<16} count {stats['count']:>6} | avg {stats['avg_ms']:7.2f} | "
+              f"p95 {stats['p95_ms']:7.2f} | max {stats['max_ms']:7.2f}")
+    print("Output:      " + ", ".join(paths))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
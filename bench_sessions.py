@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Benchmark: session churn (connect/disconnect cycles) without leaks
+In-process, runs thousands of create → frames → remove cycles through the
+session registry and the per-session components it cleans up, and checks
+that memory and every per-sid table return to baseline. With --url, churns
+real Socket.IO connections against a running server and checks its
+registry statistics instead.
+
+Usage:
+  python bench_sessions.py
+  python bench_sessions.py --cycles 20000
+  python bench_sessions.py --url http://localhost:3000 --cycles 2000
+"""
+
+import argparse
+import contextlib
+import io
+import threading
+import time
+import tracemalloc
+import uuid
+
+import config
+from flow_control import CreditManager
+from rate_control import RateController
+from sessions import SessionRegistry
+
+
+def run_in_process(cycles: int, objects: int):
+    rate_controller = RateController()
+    credit_manager = CreditManager()
+    registry = SessionRegistry()
+    registry.on_remove(rate_controller.forget)
+    registry.on_remove(credit_manager.forget)
+
+    def cycle(i: int):
+        sid = f"sid-{i}"
+        session = registry.create(sid, "PYTHON")
+        for _ in range(objects):  # A few frames worth of per-session state
+            registry.touch(sid)
+            credit_manager.acquire(sid)
+            session.track(uuid.uuid4().hex)
+            rate_controller.frame_finished(sid, 50.0)
+            credit_manager.release(sid)
+        rate_controller.mark_sent(sid, rate_controller.recommend(sid))
+        registry.remove(sid)
+
+    for i in range(1000):  # Warm up interpreter caches and dict sizes
+        cycle(i)
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    for i in range(cycles):
+        cycle(1000 + i)
+    elapsed = time.perf_counter() - start
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"Churn:   {cycles} cycles in {elapsed:.2f}s ({elapsed / cycles * 1e6:.1f} µs/cycle)")
+    print(f"Memory:  {(after - before) / 1024:+.1f} KB retained after churn "
+          f"(peak {(peak - before) / 1024:.1f} KB while running)")
+    print(f"Tables:  sessions {len(registry.sessions)}, heap {len(registry._heap)}, "
+          f"credits {len(credit_manager.sessions)}, rate control {len(rate_controller.latency_ms)}")
+
+    # Hard cap: connections past SESSION_MAX_COUNT are refused, live sessions are kept
+    print()
+    with contextlib.redirect_stdout(io.StringIO()):  # Silence per-session log lines
+        refused = sum(registry.create(f"idle-{i}") is None for i in range(config.SESSION_MAX_COUNT + 3))
+    print(f"Cap:     {config.SESSION_MAX_COUNT + 3} connected, {len(registry.sessions)} kept, {refused} refused "
+          f"(SESSION_MAX_COUNT {config.SESSION_MAX_COUNT})")
+
+    # Idle expiry: sessions that never disconnect are swept by deadline
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        expired = registry.sweep(now=time.monotonic() + config.SESSION_IDLE_TTL_S + 1)
+    elapsed = time.perf_counter() - start
+    print(f"Expiry:  {expired} idle sessions swept in {elapsed * 1000:.1f} ms, "
+          f"{len(registry.sessions)} left, heap {len(registry._heap)}")
+    print(f"Registry: {registry.stats()}")
+
+    # Stale heap entries are compacted away, so the heap stays within 2x live + 64
+    leaked = len(registry.sessions) + len(credit_manager.sessions) + len(rate_controller.latency_ms)
+    leaked += len(registry._heap) > 2 * len(registry.sessions) + 64
+    print("\n✓ No per-session state left behind" if not leaked else f"\n✗ {leaked} entries leaked")
+
+
+def run_against_server(url: str, cycles: int, concurrency: int):
+    import socketio
+
+    probe = socketio.Client()
+    probe.connect(url)
+    baseline = probe.call("stats", timeout=10)["registry"]
+
+    def churn(n: int):
+        for _ in range(n):
+            client = socketio.Client()
+            client.connect(url)
+            client.disconnect()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=churn, args=(cycles // concurrency,)) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    time.sleep(1)  # Let the server process the last disconnects
+
+    stats = probe.call("stats", timeout=10)
+    registry = stats["registry"]
+    probe.disconnect()
+
+    print(f"Churn:   {cycles} connect/disconnect cycles in {elapsed:.1f}s "
+          f"({cycles / elapsed:.0f}/s, {concurrency} concurrent)")
+    print(f"Before:  {baseline}")
+    print(f"After:   {registry}")
+    print(f"Server peak RSS: {stats['buffer_pool'].get('peak_rss_mb')} MB")
+    leaked = registry["active"] - baseline["active"]
+    print("\n✓ Every session was freed" if leaked <= 0 else f"\n✗ {leaked} sessions still registered")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Session registry churn benchmark")
+    parser.add_argument("--cycles", type=int, default=10000)
+    parser.add_argument("--objects", type=int, default=5, help="Frames / tracked objects per session (in-process)")
+    parser.add_argument("--url", help="Churn real connections against this server instead")
+    parser.add_argument("--concurrency", type=int, default=8, help="Parallel connections (--url)")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("Session Churn Benchmark")
+    print("=" * 70)
+    if args.url:
+        run_against_server(args.url, args.cycles, args.concurrency)
+    else:
+        run_in_process(args.cycles, args.objects)
+
+
+if __name__ == "__main__":
+    main()
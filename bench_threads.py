@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Benchmark: CPU thread budget sweep
+Runs the server's decode + inference work (JPEG decode threads feeding a
+bounded queue, one model call per frame) under different OpenCV / PyTorch
+thread settings and reports throughput and frame latency for each.
+
+Every configuration runs in a fresh process, since PyTorch's inter-op pool
+can only be sized once per process. The recommendation is the highest
+throughput whose p95 latency stays within --latency-slack of the best p95.
+
+Usage:
+  python bench_threads.py                                   # Sweep around the automatic plan
+  python bench_threads.py --torch 1 2 4 --opencv 1 4 --decode-workers 1 2
+  python bench_threads.py --image test.jpg --imgsz 320 --frames 200
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import queue
+import subprocess
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+import config
+from thread_budget import detect_cores, plan_threads
+
+
+def make_jpeg(image_path: str = None) -> bytes:
+    image = cv2.imread(image_path) if image_path else None
+    if image is None:
+        rng = np.random.default_rng(0)
+        image = cv2.resize(rng.integers(0, 255, (45, 80, 3), dtype=np.uint8), (1280, 720), interpolation=cv2.INTER_CUBIC)
+    return cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 85])[1].tobytes()
+
+
+def run_trial(trial: dict, args) -> dict:
+    """One configuration, in this process: returns throughput and latency"""
+    from inference import infer_batch
+    from model_registry import ModelRegistry
+    from runtime_config import RuntimeConfig
+    from thread_budget import apply_thread_budget
+
+    applied = apply_thread_budget({key: trial[key] for key in ("cores", "torch_intra", "torch_interop", "opencv")})
+    settings = RuntimeConfig().resolve(None)
+    size = args.imgsz or settings['image_size']
+    route = asyncio.run(ModelRegistry().acquire(args.model))
+    jpeg = np.frombuffer(make_jpeg(args.image), np.uint8)
+
+    def decode():
+        frame = cv2.imdecode(jpeg, cv2.IMREAD_COLOR)
+        frame.mean()  # The server scans every frame for its log line
+        return frame
+
+    for _ in range(args.warmup):
+        infer_batch(route, size, settings['params'], [decode()])
+
+    workers = trial["decode_workers"]
+    frames: "queue.Queue" = queue.Queue(maxsize=max(1, workers) * 2)  # Bounded, like the pipeline's decode stage
+    counter = itertools.count()
+
+    def decoder():
+        while next(counter) < args.frames:
+            start = time.perf_counter()
+            frames.put((start, decode()))
+        frames.put(None)
+
+    threads = [threading.Thread(target=decoder, daemon=True) for _ in range(workers)]
+    latencies = []
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    finished = 0
+    while len(latencies) < args.frames:
+        if workers:
+            item = frames.get()
+            if item is None:
+                finished += 1
+                if finished == workers:
+                    break
+                continue
+            frame_start, frame = item
+        else:
+            frame_start = time.perf_counter()
+            frame = decode()  # Decoded on the event loop, one at a time
+        infer_batch(route, size, settings['params'], [frame])
+        latencies.append((time.perf_counter() - frame_start) * 1000)
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return dict(trial, torch_interop=applied["torch_interop"], frames=len(latencies),
+                fps=len(latencies) / elapsed,
+                p50_ms=latencies[len(latencies) // 2],
+                p95_ms=latencies[int(len(latencies) * 0.95)])
+
+
+def sweep(args) -> list:
+    cores = detect_cores()
+    auto = plan_threads(cores)
+    torch_options = args.torch or sorted({1, max(1, cores // 2), max(1, cores - 1), cores, auto["torch_intra"]})
+    opencv_options = args.opencv or sorted({1, cores, auto["opencv"]})
+    decode_options = args.decode_workers or [config.PIPELINE_DECODE_WORKERS]
+
+    trials = [
+        {"cores": cores, "torch_intra": t, "torch_interop": args.interop, "opencv": o, "decode_workers": d}
+        for t, o, d in itertools.product(torch_options, opencv_options, decode_options)
+    ]
+    print(f"{cores} core(s) available; automatic plan: torch {auto['torch_intra']}, OpenCV {auto['opencv']}, "
+          f"decode workers {config.PIPELINE_DECODE_WORKERS}")
+    print(f"Running {len(trials)} configuration(s), {args.frames} frames each\n")
+    print(f"{'torch':>6} {'interop':>8} {'opencv':>7} {'decode':>7} | {'FPS':>7} | {'p50 ms':>8} {'p95 ms':>8}")
+
+    results = []
+    for trial in trials:
+        command = [sys.executable, __file__, "--trial", json.dumps(trial), "--frames", str(args.frames),
+                   "--warmup", str(args.warmup)]
+        for flag, value in (("--image", args.image), ("--imgsz", args.imgsz), ("--model", args.model)):
+            if value:
+                command += [flag, str(value)]
+        output = subprocess.run(command, capture_output=True, text=True)
+        lines = [line for line in output.stdout.splitlines() if line.startswith("{")]
+        if output.returncode or not lines:
+            print(f"  ⚠️ {trial} failed:\n{output.stderr[-500:]}")
+            continue
+        result = json.loads(lines[-1])
+        results.append(result)
+        planned = plan_threads(cores, decode_workers=trial["decode_workers"])
+        auto_mark = "  (auto)" if (trial["torch_intra"], trial["opencv"]) == (planned["torch_intra"], planned["opencv"]) else ""
+        print(f"{result['torch_intra']:>6} {result['torch_interop']:>8} {result['opencv']:>7} {result['decode_workers']:>7} | "
+              f"{result['fps']:7.2f} | {result['p50_ms']:8.1f} {result['p95_ms']:8.1f}{auto_mark}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep OpenCV / PyTorch thread settings")
+    parser.add_argument("--torch", type=int, nargs="+", help="torch.set_num_threads values to try")
+    parser.add_argument("--opencv", type=int, nargs="+", help="cv2.setNumThreads values to try")
+    parser.add_argument("--decode-workers", type=int, nargs="+", help="Decode thread counts to try")
+    parser.add_argument("--interop", type=int, default=config.THREADS_TORCH_INTEROP, help="Inter-op threads")
+    parser.add_argument("--frames", type=int, default=100, help="Frames per configuration")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--image", help="JPEG to decode (default: synthetic 1280x720)")
+    parser.add_argument("--imgsz", type=int, help="Inference size (default: IMAGE_SIZE)")
+    parser.add_argument("--model", help="Model name (default: DEFAULT_MODEL)")
+    parser.add_argument("--latency-slack", type=float, default=1.2,
+                        help="Recommend the fastest setting with p95 within this factor of the best p95")
+    parser.add_argument("--trial", help=argparse.SUPPRESS)  # Internal: run one configuration
+    args = parser.parse_args()
+
+    if args.trial:
+        print(json.dumps(run_trial(json.loads(args.trial), args)))
+        return 0
+
+    print("=" * 70)
+    print("CPU Thread Budget Sweep")
+    print("=" * 70)
+    results = sweep(args)
+    if not results:
+        return 1
+
+    best_p95 = min(r["p95_ms"] for r in results)
+    best = max((r for r in results if r["p95_ms"] <= best_p95 * args.latency_slack), key=lambda r: r["fps"])
+    print(f"\nRecommended ({best['fps']:.2f} FPS, p95 {best['p95_ms']:.1f} ms) — in config.py:")
+    print(f"  THREADS_TORCH_INTRA = {best['torch_intra']}")
+    print(f"  THREADS_TORCH_INTEROP = {best['torch_interop']}")
+    print(f"  THREADS_OPENCV = {best['opencv']}")
+    print(f"  PIPELINE_DECODE_WORKERS = {best['decode_workers']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
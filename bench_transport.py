@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Socket.IO 'frame' event vs the raw WebSocket endpoint
+Sends the same JPEG frame by frame (one in flight) over each transport
+against a running server and reports round-trip latency plus client and
+server CPU time per frame. Inference is identical on both paths, so the
+differences are the transports' framing and handling overhead.
+
+Usage:
+  python bench_transport.py
+  python bench_transport.py --frames 500 --imgsz 320
+  python bench_transport.py --image test.jpg --url http://192.168.1.10:3000
+"""
+
+import argparse
+import threading
+import time
+from urllib.parse import urlencode
+
+import cv2
+import numpy as np
+import socketio
+import websocket
+
+import config
+from raw_ws import FRAME_ID, unpack_reply
+
+
+def summarize(name: str, rtts_ms, client_cpu_s: float, server_cpu_s: float, errors: int) -> str:
+    rtts = sorted(rtts_ms)
+    n = len(rtts) or 1
+    return (
+        f"{name:<10} frames {len(rtts):>5} | RTT p50 {rtts[n // 2]:6.1f} ms  p95 {rtts[int(n * 0.95)]:6.1f} ms  "
+        f"mean {sum(rtts) / n:6.1f} ms | CPU/frame client {client_cpu_s / n * 1000:5.2f} ms  "
+        f"server {server_cpu_s / n * 1000:6.2f} ms | errors {errors}"
+    )
+
+
+def server_cpu(url: str) -> float:
+    probe = socketio.Client()
+    probe.connect(url)
+    try:
+        return probe.call("stats", timeout=10)["cpu_s"]
+    finally:
+        probe.disconnect()
+
+
+def run_socketio(url: str, jpeg: bytes, frames: int, imgsz: int):
+    sio = socketio.Client()
+    replied = threading.Event()
+    errors = []
+
+    def on_reply(data):
+        replied.set()
+
+    def on_error(data):
+        errors.append(data.get("message"))
+        replied.set()
+
+    sio.on("detections", on_reply)
+    sio.on("error", on_error)
+    sio.connect(url, auth={"client": "PYTHON", "format": "jpeg", "binary": True}, transports=["websocket"])
+
+    rtts = []
+    cpu_start = time.process_time()
+    for i in range(frames):
+        replied.clear()
+        start = time.perf_counter()
+        sio.emit("frame", {"image": jpeg, "imgsz": imgsz, "frame_id": i})
+        if not replied.wait(timeout=30):
+            errors.append("timeout")
+            continue
+        rtts.append((time.perf_counter() - start) * 1000)
+    client_cpu = time.process_time() - cpu_start
+    sio.disconnect()
+    return rtts, client_cpu, len(errors)
+
+
+def run_raw(url: str, jpeg: bytes, frames: int, imgsz: int):
+    ws_url = url.replace("http", "ws", 1).rstrip("/") + config.RAW_WS_PATH + "?" + urlencode(
+        {"client": "PYTHON", "format": "jpeg", "imgsz": imgsz})
+    ws = websocket.create_connection(ws_url)
+    ws.recv()  # connection_response (text)
+
+    rtts = []
+    errors = 0
+    cpu_start = time.process_time()
+    for i in range(frames):
+        start = time.perf_counter()
+        ws.send_binary(FRAME_ID.pack(i) + jpeg)
+        while True:
+            message = ws.recv()
+            if isinstance(message, bytes):
+                break  # Text messages (rate_control) are skipped
+        reply = unpack_reply(message)
+        if "error" in reply or reply["frame_id"] != i:
+            errors += 1
+            continue
+        rtts.append((time.perf_counter() - start) * 1000)
+    client_cpu = time.process_time() - cpu_start
+    ws.close()
+    return rtts, client_cpu, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Socket.IO vs raw WebSocket transport benchmark")
+    parser.add_argument("--url", default="http://localhost:3000")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--image", help="JPEG/PNG to send (default: synthetic 640x480)")
+    parser.add_argument("--imgsz", type=int, default=320, help="Server inference size")
+    args = parser.parse_args()
+
+    image = cv2.imread(args.image) if args.image else None
+    if image is None:
+        image = np.random.default_rng(0).integers(0, 255, (480, 640, 3), dtype=np.uint8)
+    jpeg = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 80])[1].tobytes()
+
+    print("=" * 70)
+    print("Transport Benchmark")
+    print("=" * 70)
+    print(f"{args.frames} frames of {len(jpeg) / 1024:.1f} KB, one in flight, inference at {args.imgsz}px\n")
+
+    results = []
+    for name, run in (("socket.io", run_socketio), ("raw ws", run_raw)):
+        run(args.url, jpeg, args.warmup, args.imgsz)
+        cpu_before = server_cpu(args.url)
+        rtts, client_cpu, errors = run(args.url, jpeg, args.frames, args.imgsz)
+        server_cpu_s = server_cpu(args.url) - cpu_before
+        results.append((name, rtts))
+        print(summarize(name, rtts, client_cpu, server_cpu_s, errors))
+
+    (_, sio_rtts), (_, raw_rtts) = results
+    if sio_rtts and raw_rtts:
+        saved = sorted(sio_rtts)[len(sio_rtts) // 2] - sorted(raw_rtts)[len(raw_rtts) // 2]
+        print(f"\nRaw WebSocket median round trip: {saved:+.1f} ms faster than Socket.IO")
+
+
+if __name__ == "__main__":
+    main()
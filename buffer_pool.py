@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Reusable NumPy buffers for YOLOv11x backend
+Per-worker, shape-keyed pools so decode/convert/resize stop churning the allocator
+"""
+
+import sys
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+import config
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class BufferPool:
+    """
+    Shape-keyed pool of reusable NumPy arrays, one per worker thread.
+
+    Buffers are leased with acquire() and handed back with release(); a
+    released buffer is returned by the next acquire() of the same shape and
+    dtype. Leasing (rather than one fixed scratch array per shape) keeps
+    frames that interleave on the event loop from overwriting each other.
+
+    Pass leased buffers to OpenCV as dst= so results land in pooled memory.
+    A buffer leased on a decode thread may be released from the event loop
+    once its frame is done, so acquire() and release() take a (normally
+    uncontended) lock.
+    """
+
+    def __init__(self, max_bytes: int = None):
+        self.max_bytes = max_bytes or config.BUFFER_POOL_MAX_MB * 1024 * 1024
+        self.free: Dict[Tuple, List[np.ndarray]] = defaultdict(list)
+        self.held_bytes = 0      # Bytes owned by the pool (leased + free)
+        self.peak_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.dropped = 0         # Released buffers not kept because of max_bytes
+        self.leased = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(shape, dtype) -> Tuple:
+        return tuple(int(d) for d in shape), np.dtype(dtype).str
+
+    def acquire(self, shape, dtype=np.uint8) -> np.ndarray:
+        """
+        Lease a buffer (contents are undefined)
+
+        Args:
+            shape: Array shape
+            dtype: Array dtype
+
+        Returns:
+            Array to use as an OpenCV dst=; give it back with release()
+        """
+        with self._lock:
+            free = self.free.get(self._key(shape, dtype))
+            self.leased += 1
+            if free:
+                self.hits += 1
+                return free.pop()
+            self.misses += 1
+
+        buffer = np.empty(shape, dtype=dtype)
+        with self._lock:
+            self.held_bytes += buffer.nbytes
+            self.peak_bytes = max(self.peak_bytes, self.held_bytes)
+        return buffer
+
+    def release(self, buffer: np.ndarray):
+        """Return a leased buffer to the pool"""
+        with self._lock:
+            self.leased = max(0, self.leased - 1)
+            if self.held_bytes > self.max_bytes:
+                # Over budget (e.g. many distinct frame sizes): let this one go
+                self.held_bytes -= buffer.nbytes
+                self.dropped += 1
+                return
+            self.free[self._key(buffer.shape, buffer.dtype)].append(buffer)
+
+    @contextmanager
+    def lease(self, shape, dtype=np.uint8):
+        """Context manager form of acquire()/release()"""
+        buffer = self.acquire(shape, dtype)
+        try:
+            yield buffer
+        finally:
+            self.release(buffer)
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and memory held by this pool"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "dropped": self.dropped,
+            "leased": self.leased,
+            "held_mb": round(self.held_bytes / (1024 * 1024), 2),
+            "peak_mb": round(self.peak_bytes / (1024 * 1024), 2),
+        }
+
+
+# One pool per worker thread; the registry is only used for stats
+_local = threading.local()
+_pools: Dict[str, BufferPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_buffer_pool() -> BufferPool:
+    """Get the calling thread's buffer pool"""
+    pool = getattr(_local, "pool", None)
+    if pool is None:
+        pool = _local.pool = BufferPool()
+        with _pools_lock:
+            _pools[threading.current_thread().name] = pool
+    return pool
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of the process in MB (None if unavailable)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def buffer_pool_stats() -> Dict:
+    """
+    Aggregate statistics over every worker's pool
+
+    Returns:
+        Dictionary with totals, per-thread pool stats and peak process RSS
+    """
+    with _pools_lock:
+        pools = dict(_pools)
+    per_thread = {name: pool.stats() for name, pool in pools.items()}
+    hits = sum(p.hits for p in pools.values())
+    misses = sum(p.misses for p in pools.values())
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        "held_mb": round(sum(p.held_bytes for p in pools.values()) / (1024 * 1024), 2),
+        "peak_rss_mb": peak_rss_mb(),
+        "workers": per_thread,
+    }
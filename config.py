@@ -3,6 +3,8 @@ Configuration file for YOLOv11x Backend Server
 Adjust these settings to optimize detection accuracy and performance
 """
 
+import os
+
 # ============================================================
 # INFERENCE SETTINGS
 # ============================================================
@@ -21,6 +23,21 @@ IOU_THRESHOLD = 0.45
 # Common values: 320, 640, 1280
 IMAGE_SIZE = 640
 
+# Inference resolution tiers a session may use
+# Clients pick one with 'imgsz' in frame data (e.g. low-end phones → 320)
+INFERENCE_TIERS = [320, 480, 640]
+
+# Let the load controller choose each session's tier (see RATE_CONTROL_IMGSZ)
+# when the client has not picked one; False = always IMAGE_SIZE
+AUTO_INFERENCE_TIER = True
+
+# Optional model file per tier (e.g. fixed-shape ONNX/TensorRT exports)
+# Tiers not listed here share the MODEL_PATH model
+TIER_MODEL_PATHS = {}
+
+# Run a dummy inference per tier at startup so first frames aren't slow
+WARMUP_TIERS = True
+
 # Device for inference
 # Options: 'cpu', 'cuda', 'cuda:0', 'cuda:1'
 DEVICE = "cpu"
@@ -40,6 +57,10 @@ SERVER_PORT = 3000
 # CORS allowed origins (for web clients)
 CORS_ORIGINS = "*"  # Change to specific domains in production
 
+# Token required by admin events (e.g. 'reload_config')
+# Admin events are disabled when no token is set
+ADMIN_TOKEN = os.environ.get("YOLO_ADMIN_TOKEN")
+
 # ============================================================
 # MODEL SETTINGS
 # ============================================================
@@ -47,6 +68,25 @@ CORS_ORIGINS = "*"  # Change to specific domains in production
 # Path to model weights
 MODEL_PATH = "model/final_model.pt"
 
+# Models that can be served side by side (name -> weights path)
+# Sessions pick one by name; DEFAULT_MODEL is loaded at startup, others on first use
+MODELS = {
+    "final": MODEL_PATH,
+    # "fast": "model/fast_model.pt",
+}
+DEFAULT_MODEL = "final"
+
+# Cascades: run 'first' on every frame, then re-run frames whose best
+# confidence is below 'min_confidence' on 'second'
+# Sessions select a cascade by name like a model
+CASCADES = {
+    # "cascade": {"first": "fast", "second": "final", "min_confidence": 0.5},
+}
+
+# Memory budget for loaded models (MB)
+# Least recently used idle models are unloaded when a new one exceeds it
+MODEL_MEMORY_BUDGET_MB = 2048
+
 # Enable/disable verbose inference output
 VERBOSE_INFERENCE = False
 
@@ -105,18 +145,35 @@ PRESET_VERY_HIGH_ACCURACY = {
     "max_det": 50,
 }
 
+# Presets by name (clients may pick one per session with 'preset' in frame data)
+PRESETS = {
+    "HIGH_ACCURACY": PRESET_HIGH_ACCURACY,
+    "BALANCED": PRESET_BALANCED,
+    "HIGH_RECALL": PRESET_HIGH_RECALL,
+    "VERY_HIGH_ACCURACY": PRESET_VERY_HIGH_ACCURACY,
+}
+
 # Select active preset (or set to None to use YOLO_PARAMS)
 ACTIVE_PRESET = "HIGH_RECALL"  # Options: 'HIGH_ACCURACY', 'BALANCED', 'HIGH_RECALL', 'VERY_HIGH_ACCURACY', None (using HIGH_RECALL for Flutter debugging)
 
+# Parameters before any preset is applied (base for per-session presets)
+BASE_YOLO_PARAMS = dict(YOLO_PARAMS)
+
 # Apply preset if selected
-if ACTIVE_PRESET == "HIGH_ACCURACY":
-    YOLO_PARAMS.update(PRESET_HIGH_ACCURACY)
-elif ACTIVE_PRESET == "BALANCED":
-    YOLO_PARAMS.update(PRESET_BALANCED)
-elif ACTIVE_PRESET == "HIGH_RECALL":
-    YOLO_PARAMS.update(PRESET_HIGH_RECALL)
-elif ACTIVE_PRESET == "VERY_HIGH_ACCURACY":
-    YOLO_PARAMS.update(PRESET_VERY_HIGH_ACCURACY)
+if ACTIVE_PRESET:
+    YOLO_PARAMS.update(PRESETS[ACTIVE_PRESET])
+
+# ============================================================
+# RUNTIME RELOAD
+# ============================================================
+
+# Watch this file and apply changes without restarting the server
+# (inference parameters, presets, IMAGE_SIZE, rate/flow control settings)
+# DEVICE and MODEL_PATH changes still require a restart
+CONFIG_WATCH_ENABLED = True
+
+# How often to check this file for changes (seconds)
+CONFIG_WATCH_INTERVAL_S = 2.0
 
 # ============================================================
 # DISPLAY SETTINGS (for test client)
@@ -146,6 +203,334 @@ FONT_SCALE = 0.5
 # Smaller values = faster processing but lower quality
 FRAME_MAX_DIM = 640  # Resize frames to max 640px on longest side
 
+# ============================================================
+# ADAPTIVE RATE CONTROL
+# ============================================================
+
+# Send per-client FPS / resolution / JPEG quality recommendations
+# based on measured inference latency and server queue depth
+RATE_CONTROL_ENABLED = True
+
+# Bounds for the recommended client send rate
+RATE_CONTROL_MIN_FPS = 2
+RATE_CONTROL_MAX_FPS = 15
+
+# Fraction of estimated capacity handed out to clients (< 1.0 leaves headroom)
+RATE_CONTROL_HEADROOM = 0.8
+
+# Latency assumed for a client before its first frame is measured (ms)
+RATE_CONTROL_INITIAL_LATENCY_MS = 100.0
+
+# Smoothing factor for per-client latency (0 - 1, higher = reacts faster)
+RATE_CONTROL_EMA_ALPHA = 0.3
+
+# Load thresholds for picking a quality tier
+RATE_CONTROL_QUEUE_LOW = 1    # frames in flight at or below -> "high" tier allowed
+RATE_CONTROL_QUEUE_HIGH = 4   # frames in flight at or above -> "low" tier
+RATE_CONTROL_LATENCY_LOW_MS = 80.0
+RATE_CONTROL_LATENCY_HIGH_MS = 250.0
+
+# Quality tiers: (max frame dimension in px, JPEG quality)
+RATE_CONTROL_TIERS = {
+    "low": (320, 60),
+    "medium": (480, 70),
+    "high": (640, 80),
+}
+
+# Inference resolution used for each tier when AUTO_INFERENCE_TIER is on
+RATE_CONTROL_IMGSZ = {
+    "low": 320,
+    "medium": 480,
+    "high": 640,
+}
+
+# Re-send an unchanged recommendation at least this often (seconds)
+RATE_CONTROL_INTERVAL_S = 5.0
+
+# Minimum relative FPS change that triggers a new recommendation
+RATE_CONTROL_FPS_CHANGE = 0.2
+
+# ============================================================
+# FLOW CONTROL
+# ============================================================
+
+# Limit the number of frames each client may have in flight
+FLOW_CONTROL_ENABLED = True
+
+# In-flight frame credits granted to each client
+# A credit is returned with every 'detections' / 'error' reply
+FLOW_CONTROL_WINDOW = 2
+
+# Tell the client when a frame is dropped for lack of credits
+# (False = drop silently)
+FLOW_CONTROL_NOTIFY_DROPS = True
+
+# ============================================================
+# SESSIONS
+# ============================================================
+
+# Disconnect clients that send no frames for this many seconds
+SESSION_IDLE_TTL_S = 120
+
+# How often idle sessions are checked for expiry (seconds)
+SESSION_SWEEP_INTERVAL_S = 1.0
+
+# Forget tracked objects not seen for this many seconds
+SESSION_OBJECT_TTL_S = 5
+
+# Hard caps that bound per-session memory: at most this many sessions
+# (further connections are refused until one disconnects or idles out), each tracking
+# at most this many objects
+SESSION_MAX_COUNT = 1000
+SESSION_MAX_TRACKED_OBJECTS = 256
+
+# ============================================================
+# OUTBOUND EMIT QUEUE
+# ============================================================
+
+# Send replies from a per-session background queue instead of inline in the
+# frame handler, so slow client sockets never hold up inference (raw
+# WebSocket replies always go through the queue: their sends block)
+EMIT_QUEUE_ENABLED = True
+
+# Hold replies back while this many packets are still waiting in the
+# client's transport queue (slow network)
+EMIT_MAX_BACKLOG = 2
+
+# Drop replies that could not be sent within this many seconds
+EMIT_TIMEOUT_S = 2.0
+
+# Events where only the newest unsent message matters
+EMIT_COALESCE_EVENTS = ["detections", "rate_control"]
+
+# ============================================================
+# FRAME RECORDING
+# ============================================================
+
+# Record every session's incoming frames for replay (python replay.py);
+# admins can also turn recording on for one session with the 'record' event
+RECORDING_ENABLED = False
+
+# Directory for .yrec / .yidx recordings
+RECORDING_DIR = "recordings"
+
+# Stop recording a session once its file reaches this size
+RECORDING_MAX_MB_PER_SESSION = 200
+
+# Frames waiting for the writer thread before new ones are skipped
+RECORDING_QUEUE_SIZE = 256
+
+# ============================================================
+# VIDEO STREAM INGEST
+# ============================================================
+
+# Clients that declare format 'h264' or 'mjpeg' at connect send an encoded
+# video stream in 'stream' events; inference runs on the newest decoded frame
+# (H.264 needs PyAV: pip install av)
+
+# Drop a session's MJPEG buffer if it grows this large without a complete frame
+STREAM_MAX_BUFFER_MB = 8
+
+# ============================================================
+# RAW WEBSOCKET
+# ============================================================
+
+# Minimal binary WebSocket route served next to Socket.IO (see raw_ws.py):
+# frames in, packed detections out, no Engine.IO framing
+RAW_WS_ENABLED = True
+RAW_WS_PATH = "/ws"
+
+# ============================================================
+# PROFILING
+# ============================================================
+
+# Directory for sampling profiles (folded stacks, one file per 'profile' run)
+# View with flamegraph.pl, speedscope.app or inferno-flamegraph
+PROFILE_DIR = "profiles"
+
+# Time between stack samples while a profile runs (ms)
+PROFILE_INTERVAL_MS = 5
+
+# Longest profile an admin may request (seconds)
+PROFILE_MAX_SECONDS = 120
+
+# Recent measurements per stage used for p50/p95 in stats
+PROFILE_STAGE_WINDOW = 1024
+
+# ============================================================
+# OFFLINE INFERENCE (batch_infer.py)
+# ============================================================
+
+# Frames per model call when processing folders and videos
+OFFLINE_BATCH_SIZE = 16
+
+# Decoded frames the reader thread may run ahead of inference
+OFFLINE_PREFETCH = 64
+
+# File types picked up when a folder is given
+OFFLINE_IMAGE_EXTENSIONS = [".jpg", ".jpeg", ".png", ".bmp", ".webp"]
+OFFLINE_VIDEO_EXTENSIONS = [".mp4", ".mov", ".avi", ".mkv", ".webm"]
+
+# ============================================================
+# INFERENCE SCHEDULING
+# ============================================================
+
+# Maximum frames of the same tier and preset run in one model call
+MAX_BATCH_SIZE = 4
+
+# Number of inference worker threads
+# Keep at 1 unless the model is safe to call from several threads
+INFERENCE_WORKERS = 1
+
+# Deficit round-robin weights per client type (frames per scheduling turn)
+# Higher weight = larger share of inference time when the server is busy
+SCHEDULER_CLASS_WEIGHTS = {
+    "FLUTTER": 2.0,
+    "PYTHON": 1.0,
+    "UNKNOWN": 1.0,
+}
+
+# ============================================================
+# REGION OF INTEREST INFERENCE
+# ============================================================
+
+# After a confident detection, infer the next frames on a crop around the
+# last box at a lower size instead of the whole frame (see roi.py)
+ROI_ENABLED = True
+
+# Detections at or above this confidence keep the session on crops
+ROI_MIN_CONFIDENCE = 0.5
+
+# Padding added on every side of the last box (fraction of its width/height)
+ROI_PADDING = 0.5
+
+# Smallest crop side in pixels (tiny boxes still get context)
+ROI_MIN_SIZE = 160
+
+# Crops larger than this fraction of the frame run full-frame instead
+ROI_MAX_AREA = 0.6
+
+# Inference size for crops; None = smallest of INFERENCE_TIERS
+ROI_IMAGE_SIZE = None
+
+# Run a full frame at least every N frames to catch objects outside the crop
+ROI_FULL_FRAME_INTERVAL = 10
+
+# ============================================================
+# TEMPORAL SMOOTHING
+# ============================================================
+
+# Filter each session's selected detection over time before it is sent
+# (see smoothing.py), so boxes don't jitter and classes don't flip
+SMOOTHING_ENABLED = True
+
+# Box filter: "one_euro" (adapts to motion) or "ema"
+SMOOTHING_METHOD = "one_euro"
+
+# One-Euro parameters: cutoff (Hz) while still, extra cutoff per px/s of
+# corner speed, and cutoff for the speed estimate
+SMOOTHING_MIN_CUTOFF = 1.0
+SMOOTHING_BETA = 0.005
+SMOOTHING_D_CUTOFF = 1.0
+
+# EMA weight of the newest box (0 - 1, higher = reacts faster)
+SMOOTHING_EMA_ALPHA = 0.5
+
+# EMA weight of the newest confidence
+SMOOTHING_CONFIDENCE_ALPHA = 0.4
+
+# Frames another class must win in a row before the reported class changes
+SMOOTHING_CLASS_SWITCH_FRAMES = 3
+
+# Keep reporting a missing object for up to this many frames, while its
+# averaged confidence stays at or above SMOOTHING_HIDE_CONFIDENCE
+SMOOTHING_HOLD_FRAMES = 2
+SMOOTHING_HIDE_CONFIDENCE = 0.3
+
+# Boxes overlapping the previous one less than this are a new object (filter restarts)
+SMOOTHING_RESET_IOU = 0.1
+
+# ============================================================
+# RESULT CACHE
+# ============================================================
+
+# Answer byte-identical frames (static kiosks, retries) from a cache shared
+# across sessions, keyed by a hash of the frame bytes and the inference
+# settings, before any decoding (see result_cache.py)
+RESULT_CACHE_ENABLED = True
+
+# Most recently used results kept
+RESULT_CACHE_MAX_ENTRIES = 1024
+
+# Seconds a result stays valid
+RESULT_CACHE_TTL_S = 60
+
+# ============================================================
+# ANNOTATED FRAMES
+# ============================================================
+
+# Thin clients may declare 'annotate': True at connect to receive each frame
+# back as a JPEG with the detections drawn on it ('annotated' in replies,
+# rendered in the post-processing stage, see annotate.py)
+ANNOTATE_ENABLED = True
+
+# JPEG quality of annotated frames
+ANNOTATE_JPEG_QUALITY = 75
+
+# ============================================================
+# LATENCY TRACING
+# ============================================================
+
+# Replies to 'frame' events carry 'timing': server timestamps (ms since the
+# epoch) for received, decoded, infer_start, infer_end and emit, plus the
+# client's 'capture_ts' echoed back (test_client.py prints the breakdown)
+LATENCY_TRACING_ENABLED = True
+
+# ============================================================
+# FRAME PIPELINE
+# ============================================================
+
+# Threads decoding incoming frames (base64 + JPEG/YUV420), so the next
+# frames decode while the model is busy; 0 = decode on the event loop
+PIPELINE_DECODE_WORKERS = 2
+
+# Threads extracting detections from model output
+PIPELINE_POST_WORKERS = 1
+
+# Frames each stage may hold (waiting + running). A full stage keeps
+# frames in the previous one, so queues never grow without bound
+PIPELINE_DECODE_QUEUE = 8
+PIPELINE_INFER_QUEUE = 8
+PIPELINE_POST_QUEUE = 8
+
+# Window (seconds) over which stage utilisation is reported in stats
+PIPELINE_UTILISATION_WINDOW_S = 10
+
+# ============================================================
+# CPU THREAD BUDGET
+# ============================================================
+
+# Size OpenCV's and PyTorch's thread pools together at startup from the
+# detected cores, INFERENCE_WORKERS and PIPELINE_DECODE_WORKERS
+# (see thread_budget.py; bench_threads.py sweeps alternatives)
+THREAD_BUDGET_ENABLED = True
+
+# Cores kept free for the event loop and sockets
+THREADS_RESERVED = 1
+
+# Fixed thread counts; None = derived from the budget
+THREADS_TORCH_INTRA = None    # torch.set_num_threads (threads per model call; INFERENCE_WORKERS calls run side by side)
+THREADS_OPENCV = None         # cv2.setNumThreads
+THREADS_TORCH_INTEROP = 1     # torch.set_num_interop_threads
+
+# ============================================================
+# BUFFER POOL
+# ============================================================
+
+# Maximum memory each worker's buffer pool may keep for reuse (MB)
+# Decode/convert/letterbox buffers are reused instead of reallocated per frame
+BUFFER_POOL_MAX_MB = 64
+
 # ============================================================
 # PERFORMANCE TIPS
 # ============================================================
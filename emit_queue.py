@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Outbound emit queue for YOLOv11x backend
+Per-session send queues with coalescing, so slow sockets never hold the frame handler
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict
+
+import config
+
+
+class EmitQueue:
+    """
+    Sends events to each session from its own background task.
+
+    send() only enqueues, so the frame handler returns as soon as inference
+    is done. While a client's transport still has EMIT_MAX_BACKLOG packets
+    waiting (slow network), its messages are held here instead, and events
+    listed in EMIT_COALESCE_EVENTS are coalesced: a newer 'detections'
+    replaces the unsent one rather than queueing behind it; the surviving
+    reply lists the replaced replies' frame ids in 'coalesced_frame_ids'
+    (its 'credits' is the current absolute count, so no credit is lost)
+    and clients can settle those frames. Messages that
+    cannot be handed to the transport within EMIT_TIMEOUT_S are dropped.
+    Replies carrying latency tracing 'timing' get their 'emit' timestamp
+    when they are actually handed over. Sessions on another transport (raw
+    WebSocket) pass its send coroutine as transport; it is awaited by the
+    session's own sender task, so a client that stops reading only stalls
+    its own queue (and its replies to numbered frames are not coalesced).
+
+    All methods are called from the event loop, so no locking is needed.
+    """
+
+    POLL_S = 0.01  # How often a held message re-checks the transport backlog
+
+    def __init__(self, sio):
+        self.sio = sio
+        self.sessions: Dict[str, Dict] = {}  # sid -> queue, sender task and counters
+
+    def _session(self, sid: str, transport: Callable[[str, str, Dict], Awaitable] = None) -> Dict:
+        state = self.sessions.get(sid)
+        if state is None:
+            state = {
+                "queue": deque(),  # [event, payload, enqueued_at]
+                "transport": transport,  # None = Socket.IO
+                "wakeup": asyncio.Event(),
+                "sent": 0,
+                "coalesced": 0,
+                "timed_out": 0,
+                "total_latency_ms": 0.0,
+                "max_latency_ms": 0.0,
+                "last_latency_ms": 0.0,
+            }
+            state["task"] = asyncio.create_task(self._sender(sid, state))
+            self.sessions[sid] = state
+        return state
+
+    def send(self, sid: str, event: str, payload: Dict,
+             transport: Callable[[str, str, Dict], Awaitable] = None):
+        """
+        Queue an event for a session (returns immediately)
+
+        Args:
+            sid: Socket ID
+            event: Event name
+            payload: Event data
+            transport: Coroutine function (sid, event, payload) sending on a
+                non-Socket.IO connection (default: emit over Socket.IO)
+        """
+        if sid not in self.sessions and transport is None and not self.sio.manager.is_connected(sid, "/"):
+            return  # Frame finished after its client left
+        state = self._session(sid, transport)
+        now = time.perf_counter()
+        queue = state["queue"]
+        # Binary raw WebSocket replies have no room for coalesced_frame_ids,
+        # so replies to numbered frames are only coalesced on Socket.IO
+        if event in config.EMIT_COALESCE_EVENTS and (state["transport"] is None or "frame_id" not in payload):
+            for item in queue:
+                if item[0] == event:
+                    # Only the newest unsent message of this kind survives
+                    queue.remove(item)
+                    state["coalesced"] += 1
+                    self._merge_frame_ids(item[1], payload)
+                    break
+        queue.append([event, payload, now])
+        state["wakeup"].set()
+
+    @staticmethod
+    def _merge_frame_ids(replaced, payload):
+        """Carry the frame ids of a coalesced reply over to the one replacing it"""
+        if not isinstance(replaced, dict) or not isinstance(payload, dict):
+            return
+        ids = list(replaced.get("coalesced_frame_ids", ()))
+        if replaced.get("frame_id") is not None:
+            ids.append(replaced["frame_id"])
+        if ids:
+            payload["coalesced_frame_ids"] = ids + list(payload.get("coalesced_frame_ids", ()))
+
+    def backlog(self, sid: str) -> int:
+        """Packets waiting in the session's Engine.IO transport queue"""
+        try:
+            eio_sid = self.sio.manager.eio_sid_from_sid(sid, "/")
+            socket = self.sio.eio.sockets.get(eio_sid)
+            return socket.queue.qsize() if socket is not None else 0
+        except Exception:
+            return 0
+
+    async def _sender(self, sid: str, state: Dict):
+        queue = state["queue"]
+        while True:
+            if not queue:
+                state["wakeup"].clear()
+                await state["wakeup"].wait()
+                continue
+
+            # Hold the head message while the transport is backed up; it stays
+            # in the queue meanwhile, so a newer message of its kind can still replace it
+            while (self.backlog(sid) >= config.EMIT_MAX_BACKLOG
+                   and time.perf_counter() - queue[0][2] < config.EMIT_TIMEOUT_S):
+                await asyncio.sleep(self.POLL_S)
+
+            event, payload, enqueued = queue.popleft()
+            if time.perf_counter() - enqueued >= config.EMIT_TIMEOUT_S:
+                state["timed_out"] += 1
+                continue
+            timing = payload.get("timing") if isinstance(payload, dict) else None
+            if isinstance(timing, dict) and "emit" in timing:
+                timing["emit"] = round(time.time() * 1000, 2)
+            try:
+                if state["transport"] is not None:
+                    sending = state["transport"](sid, event, payload)
+                else:
+                    sending = self.sio.emit(event, payload, to=sid)
+                await asyncio.wait_for(sending, config.EMIT_TIMEOUT_S)
+            except asyncio.TimeoutError:
+                state["timed_out"] += 1
+                continue
+            except Exception as e:
+                print(f"[{sid[:10]}] ⚠️ Emit of '{event}' failed: {e}")
+                continue
+
+            latency_ms = (time.perf_counter() - enqueued) * 1000
+            state["sent"] += 1
+            state["total_latency_ms"] += latency_ms
+            state["max_latency_ms"] = max(state["max_latency_ms"], latency_ms)
+            state["last_latency_ms"] = latency_ms
+
+    def stats(self, sid: str) -> Dict:
+        """
+        Emit statistics for one session
+
+        Returns:
+            Dictionary with sent/coalesced/timed-out counts, queue sizes and emit latency
+        """
+        state = self.sessions.get(sid)
+        if state is None:
+            return {"sent": 0, "coalesced": 0, "timed_out": 0, "queued": 0, "backlog": self.backlog(sid)}
+        return {
+            "sent": state["sent"],
+            "coalesced": state["coalesced"],
+            "timed_out": state["timed_out"],
+            "queued": len(state["queue"]),
+            "backlog": self.backlog(sid),
+            "avg_latency_ms": round(state["total_latency_ms"] / state["sent"], 2) if state["sent"] else 0.0,
+            "max_latency_ms": round(state["max_latency_ms"], 2),
+            "last_latency_ms": round(state["last_latency_ms"], 2),
+        }
+
+    def forget(self, sid: str):
+        """Stop the sender and drop unsent messages for a disconnected session"""
+        state = self.sessions.pop(sid, None)
+        if state is not None:
+            state["task"].cancel()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Credit-based flow control for YOLOv11x backend
+Limits how many frames each client may have in flight at once
+"""
+
+from typing import Dict
+
+import config
+
+
+class CreditManager:
+    """
+    Grants each session a window of in-flight frame credits.
+
+    A frame consumes a credit when it arrives and returns it when the
+    server replies with 'detections' or 'error'. Frames that arrive with no
+    credit left are dropped before any decoding work is done.
+
+    All methods are called from the event loop, so no locking is needed.
+    """
+
+    def __init__(self, window: int = None):
+        self._window = window                # None = follow config (hot-reloadable)
+        self.sessions: Dict[str, Dict] = {}  # sid -> credit counters
+
+    @property
+    def window(self) -> int:
+        return self._window or config.FLOW_CONTROL_WINDOW
+
+    @staticmethod
+    def _new_state() -> Dict:
+        return {
+            "in_flight": 0,
+            "max_in_flight": 0,
+            "accepted": 0,
+            "dropped": 0,
+        }
+
+    def _session(self, sid: str) -> Dict:
+        state = self.sessions.get(sid)
+        if state is None:
+            state = self._new_state()
+            self.sessions[sid] = state
+        return state
+
+    def acquire(self, sid: str) -> bool:
+        """
+        Take a credit for an incoming frame
+
+        Args:
+            sid: Socket ID
+
+        Returns:
+            True if the frame may be processed, False if it must be dropped
+        """
+        state = self._session(sid)
+        if state["in_flight"] >= self.window:
+            state["dropped"] += 1
+            return False
+        state["in_flight"] += 1
+        state["accepted"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        return True
+
+    def release(self, sid: str) -> int:
+        """
+        Return a frame's credit
+
+        Args:
+            sid: Socket ID
+
+        Returns:
+            Number of credits now available to the session
+        """
+        state = self.sessions.get(sid)
+        if state is None:
+            return self.window
+        state["in_flight"] = max(0, state["in_flight"] - 1)
+        return self.window - state["in_flight"]
+
+    def available(self, sid: str) -> int:
+        """Number of credits the session can still spend"""
+        state = self.sessions.get(sid)
+        return self.window - (state["in_flight"] if state else 0)
+
+    def stats(self, sid: str) -> Dict:
+        """
+        Credit statistics for one session
+
+        Returns:
+            Dictionary with window, in-flight, accepted and dropped counts
+            (all zero for an unknown session, which is not created)
+        """
+        state = self.sessions.get(sid) or self._new_state()
+        total = state["accepted"] + state["dropped"]
+        return {
+            "window": self.window,
+            "available": self.window - state["in_flight"],
+            **state,
+            "drop_rate": state["dropped"] / total if total else 0.0,
+        }
+
+    def forget(self, sid: str):
+        """Drop all state for a disconnected session"""
+        self.sessions.pop(sid, None)
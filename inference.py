@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Inference core for YOLOv11x backend
+Batched model calls and detection post-processing shared by server.py and batch_infer.py
+"""
+
+import contextlib
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from preprocess import get_letterboxer, unletterbox_box
+
+
+def _untimed(name: str):
+    return contextlib.nullcontext()
+
+
+def top_confidence(result) -> float:
+    """Highest box confidence in a result (0 when nothing was detected)"""
+    return float(result.boxes.conf.max()) if len(result.boxes) else 0.0
+
+
+def infer_batch(route: Dict, size: int, params: Dict, frames: List[np.ndarray], timers=None) -> List[Dict]:
+    """
+    Run one model call for a batch of BGR frames (on the calling thread)
+
+    Args:
+        route: Route from ModelRegistry.acquire() (one model, or a cascade of two)
+        size: Inference size
+        params: YOLO parameters (conf, iou, max_det ...)
+        frames: Frames of any size; each is letterboxed into its own batch slot
+        timers: Optional StageTimers for the 'letterbox' and 'infer' stages
+
+    Returns:
+        Per frame: {'result', 'transform', 'latency_ms', 'model', 'model_version', 'names'}
+    """
+    stage = timers.stage if timers is not None else _untimed
+    start = time.perf_counter()
+    # Single resize per frame: letterbox straight into this thread's model input buffer
+    # (tensor input bypasses Ultralytics' own letterbox)
+    with stage('letterbox'):
+        letterboxer = get_letterboxer(size, len(frames))
+        transforms = [letterboxer.fill(slot, frame) for slot, frame in enumerate(frames)]
+        inputs = letterboxer.tensor_for(len(frames))
+    with stage('infer'):
+        first = route['entries'][0]
+        results = list(first.tiers.get(size)(inputs, **params))
+        used = [first] * len(frames)
+
+        # Cascade: re-run only the low-confidence frames on the second (larger) model
+        if len(route['entries']) > 1:
+            second = route['entries'][1]
+            redo = [i for i, result in enumerate(results) if top_confidence(result) < route['min_confidence']]
+            if redo:
+                for i, result in zip(redo, second.tiers.get(size)(inputs[redo], **params)):
+                    results[i] = result
+                    used[i] = second
+
+    latency_ms = (time.perf_counter() - start) * 1000
+    return [
+        {'result': result, 'transform': transform, 'latency_ms': latency_ms,
+         'model': entry.name, 'model_version': entry.version, 'names': entry.model.names}
+        for result, transform, entry in zip(results, transforms, used)
+    ]
+
+
+def extract_detections(output: Dict, top: int = None) -> List[Dict]:
+    """
+    Turn one frame's model output into detections in frame pixels
+
+    Args:
+        output: One item returned by infer_batch()
+        top: Keep only the most confident detections (None = all)
+
+    Returns:
+        Detections sorted by confidence (highest first), each with
+        'bbox' [x1, y1, x2, y2], 'confidence', 'class_id' and 'class_name'
+    """
+    boxes = output['result'].boxes
+    names = output['names']
+    detections = []
+    for box in boxes:
+        detections.append({
+            'bbox': unletterbox_box(box.xyxy[0].tolist(), output['transform']),  # [x1, y1, x2, y2] in frame pixels
+            'confidence': float(box.conf[0]),
+            'class_id': int(box.cls[0]),
+            'class_name': names[int(box.cls[0])]
+        })
+    detections.sort(key=lambda x: x['confidence'], reverse=True)
+    return detections if top is None else detections[:top]
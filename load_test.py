@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Load harness for YOLOv11x backend
+Runs several Socket.IO clients at different frame rates against one server
+and reports throughput, round-trip latency and per-session scheduler wait times
+
+Usage:
+  python load_test.py --fps 30 5 --duration 20
+  python load_test.py --fps 10 10 10 10 --image test.jpg
+"""
+
+import argparse
+import base64
+import threading
+import time
+
+import cv2
+import numpy as np
+import socketio
+
+SERVER_URL = "http://localhost:3000"
+
+
+class LoadClient:
+    """One simulated client sending frames at a fixed rate"""
+
+    def __init__(self, name: str, url: str, fps: float, frame_b64: str):
+        self.name = name
+        self.url = url
+        self.fps = fps
+        self.frame_b64 = frame_b64
+        self.sio = socketio.Client()
+        self.sent = 0
+        self.received = 0
+        self.dropped = 0
+        self.errors = 0
+        self.latencies_ms = []
+        self.send_times = []
+        self.lock = threading.Lock()
+
+        self.sio.on("detections", self._on_detections)
+        self.sio.on("error", self._on_error)
+
+    def _on_detections(self, data):
+        with self.lock:
+            self.received += 1
+            if self.send_times:
+                self.latencies_ms.append((time.perf_counter() - self.send_times.pop(0)) * 1000)
+
+    def _on_error(self, data):
+        with self.lock:
+            if data.get("code") == "no_credits":
+                self.dropped += 1
+            else:
+                self.errors += 1
+            if self.send_times:
+                self.send_times.pop(0)
+
+    def run(self, duration: float):
+        self.sio.connect(self.url, auth={"client": "PYTHON", "format": "jpeg", "fps": self.fps})
+        delay = 1.0 / self.fps
+        end = time.time() + duration
+        next_send = time.time()
+        while time.time() < end:
+            with self.lock:
+                self.send_times.append(time.perf_counter())
+                self.sent += 1
+            self.sio.emit("frame", {"image": self.frame_b64})
+            next_send += delay
+            time.sleep(max(0.0, next_send - time.time()))
+        time.sleep(1.0)  # Let in-flight replies arrive
+
+    def summary(self, duration: float) -> str:
+        lat = sorted(self.latencies_ms)
+        p50 = lat[len(lat) // 2] if lat else 0.0
+        p95 = lat[int(len(lat) * 0.95)] if lat else 0.0
+        return (
+            f"{self.name:<10} target {self.fps:>5.1f} FPS | sent {self.sent:>5} | "
+            f"served {self.received:>5} ({self.received / duration:5.1f}/s) | "
+            f"dropped {self.dropped:>5} | errors {self.errors:>3} | "
+            f"RTT p50 {p50:6.0f} ms p95 {p95:6.0f} ms"
+        )
+
+
+def make_frame_b64(image_path: str = None, quality: int = 80) -> str:
+    """Load an image (or generate noise) and encode it as base64 JPEG"""
+    if image_path:
+        image = cv2.imread(image_path)
+        if image is None:
+            raise SystemExit(f"[ERROR] Could not read image: {image_path}")
+    else:
+        image = np.random.randint(0, 255, (640, 360, 3), dtype=np.uint8)
+    _, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return base64.b64encode(buffer).decode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="YOLOv11x backend load harness")
+    parser.add_argument("--url", default=SERVER_URL)
+    parser.add_argument("--fps", type=float, nargs="+", default=[30, 5],
+                        help="Send rate of each simulated client")
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds to run")
+    parser.add_argument("--image", help="Image to send (default: random noise)")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("YOLOv11x Load Test")
+    print("=" * 70)
+    print(f"Server: {args.url}")
+    print(f"Clients: {', '.join(f'{f:g} FPS' for f in args.fps)}")
+    print(f"Duration: {args.duration:.0f}s\n")
+
+    frame_b64 = make_frame_b64(args.image)
+    clients = [
+        LoadClient(f"client{i}", args.url, fps, frame_b64)
+        for i, fps in enumerate(args.fps)
+    ]
+    threads = [threading.Thread(target=c.run, args=(args.duration,)) for c in clients]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    print("Client view:")
+    for c in clients:
+        print("  " + c.summary(args.duration))
+
+    # Server view: per-session scheduler and emit statistics (each client asks
+    # for its own session; every session at once needs the admin token)
+    print("\nServer view:")
+    for c in clients:
+        stats = c.sio.call("stats", timeout=5)
+        s = stats.get("sessions", {}).get(c.sio.get_sid(), {})
+        sched = s.get("scheduler", {})
+        emit = s.get("emit", {})
+        print(
+            f"  {c.name:<10} weight {sched.get('weight', 0):.1f} | "
+            f"served {sched.get('served', 0):>5} | "
+            f"wait avg {sched.get('avg_wait_ms', 0):6.0f} ms max {sched.get('max_wait_ms', 0):6.0f} ms | "
+            f"emit avg {emit.get('avg_latency_ms', 0):5.1f} ms, "
+            f"coalesced {emit.get('coalesced', 0)}, timed out {emit.get('timed_out', 0)}"
+        )
+
+    pool = stats.get("buffer_pool", {})
+    print(
+        f"  buffer pool: hit rate {pool.get('hit_rate', 0):.1%} | "
+        f"held {pool.get('held_mb', 0)} MB | peak RSS {pool.get('peak_rss_mb')} MB"
+    )
+
+    for c in clients:
+        c.sio.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Multi-model serving for YOLOv11x backend
+Lazy loading, per-model memory accounting, LRU eviction, cascades and hot-swap
+"""
+
+import asyncio
+import gc
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+import torch
+from ultralytics import YOLO
+
+import config
+from tiers import TierModels
+
+
+def model_bytes(model) -> int:
+    """Bytes held by a model's parameters and buffers (0 for exported backends)"""
+    module = getattr(model, "model", None)
+    if not isinstance(module, torch.nn.Module):
+        return 0
+    return sum(
+        t.numel() * t.element_size()
+        for t in itertools.chain(module.parameters(), module.buffers())
+    )
+
+
+class ModelEntry:
+    """A loaded model with its tier instances and usage accounting"""
+
+    def __init__(self, name: str, path: str, model, tiers: TierModels, nbytes: int, load_ms: float,
+                 version: str = "v1"):
+        self.name = name
+        self.path = path
+        self.version = version
+        self.model = model
+        self.tiers = tiers
+        self.nbytes = nbytes
+        self.load_ms = load_ms
+        self.loaded_at = time.time()
+        self.last_used = time.time()
+        self.uses = 0
+        self.in_use = 0  # Frames currently routed to this model
+
+
+class ModelRegistry:
+    """
+    Serves several models side by side.
+
+    Models named in config.MODELS are loaded on first use (the default one
+    at startup) and accounted by parameter/buffer memory. When the total
+    exceeds config.MODEL_MEMORY_BUDGET_MB, least recently used models with
+    no frames in flight are unloaded; the default model is never evicted.
+
+    A route is what a session asks for by name: either a single model or a
+    cascade from config.CASCADES (fast model first, large model only for
+    low-confidence frames).
+
+    swap() replaces a loaded model with new weights without downtime: the
+    new version is loaded and warmed up beside the old one, then swapped in
+    under the lock. Frames that already acquired the old entry finish on it,
+    and it is freed once the last of them releases it.
+    """
+
+    def __init__(self):
+        self.entries: "OrderedDict[str, ModelEntry]" = OrderedDict()  # LRU order
+        self.paths: Dict[str, str] = {}  # Weights swapped in at runtime (override config.MODELS)
+        self.versions: Dict[str, str] = {}  # Version label of swapped-in weights
+        self.swaps: List[Dict] = []
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, asyncio.Lock] = {}
+
+    # -------------------------------
+    # Names
+    # -------------------------------
+    @property
+    def default_name(self) -> str:
+        return config.DEFAULT_MODEL
+
+    @property
+    def ready(self) -> bool:
+        """Whether the default model is loaded"""
+        return self.default_name in self.entries
+
+    def names(self) -> List[str]:
+        """Model and cascade names sessions may request"""
+        return list(config.MODELS) + list(config.CASCADES)
+
+    def is_known(self, name: str) -> bool:
+        return name in config.MODELS or name in config.CASCADES
+
+    # -------------------------------
+    # Loading / eviction
+    # -------------------------------
+    def load(self, name: str) -> ModelEntry:
+        """
+        Load a model by name (blocking)
+
+        Args:
+            name: Key of config.MODELS
+
+        Returns:
+            The loaded entry (existing one if already loaded)
+        """
+        with self._lock:
+            entry = self.entries.get(name)
+        if entry is not None:
+            return entry
+
+        path = self.paths.get(name, config.MODELS[name])
+        # Original weights may use the fixed-size tier exports; swapped-in ones don't have any
+        tier_paths = config.TIER_MODEL_PATHS if name == self.default_name and name not in self.paths else None
+        entry = self._build(name, path, tier_paths, self.versions.get(name, "v1"))
+        with self._lock:
+            self.entries[name] = entry
+        print(f"[MODELS] ✓ Loaded '{name}' {entry.version} from {path} "
+              f"({entry.nbytes / (1024 * 1024):.1f} MB, {entry.load_ms:.0f} ms)")
+        self._evict(keep=name)
+        return entry
+
+    def _build(self, name: str, path: str, tier_paths: Dict[int, str], version: str) -> ModelEntry:
+        """Load and warm up weights into a new (not yet registered) entry"""
+        start = time.perf_counter()
+        cuda_before = torch.cuda.memory_allocated() if torch.cuda.is_available() else 0
+        model = YOLO(path)
+        tiers = TierModels(model, tier_paths)
+        if config.WARMUP_TIERS:
+            tiers.warm_up(config.YOLO_PARAMS)
+        nbytes = model_bytes(model)
+        if torch.cuda.is_available():
+            nbytes = max(nbytes, torch.cuda.memory_allocated() - cuda_before)
+        load_ms = (time.perf_counter() - start) * 1000
+        return ModelEntry(name, path, model, tiers, nbytes, load_ms, version)
+
+    def swap(self, name: str, path: str, version: str = None) -> Dict:
+        """
+        Replace a model's weights while it keeps serving (blocking)
+
+        Args:
+            name: Key of config.MODELS
+            path: New weights file
+            version: Label reported in detections (default: next "vN")
+
+        Returns:
+            Dictionary describing the swap
+        """
+        version = version or f"v{sum(1 for s in self.swaps if s['model'] == name) + 2}"
+        entry = self._build(name, path, None, version)
+
+        with self._lock:
+            previous = self.entries.get(name)
+            self.entries[name] = entry
+            self.entries.move_to_end(name)
+            self.paths[name] = path
+            self.versions[name] = version
+        swap = {
+            "model": name,
+            "version": version,
+            "path": path,
+            "previous": previous.version if previous else None,
+            "in_flight_on_previous": previous.in_use if previous else 0,
+            "load_ms": round(entry.load_ms, 1),
+            "at": time.time(),
+        }
+        self.swaps.append(swap)
+        print(f"[MODELS] 🔁 Swapped '{name}' {swap['previous']} → {version} from {path} "
+              f"({entry.load_ms:.0f} ms, {swap['in_flight_on_previous']} frame(s) finishing on old weights)")
+        self._evict(keep=name)
+        return swap
+
+    async def swap_async(self, name: str, path: str, version: str = None) -> Dict:
+        """swap() off the event loop; one load per name at a time"""
+        lock = self._load_locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            return await asyncio.get_running_loop().run_in_executor(None, self.swap, name, path, version)
+
+    def _evict(self, keep: str = None):
+        """Unload idle least-recently-used models (other than keep) until within the memory budget"""
+        budget = config.MODEL_MEMORY_BUDGET_MB * 1024 * 1024
+        evicted = []
+        with self._lock:
+            for name in list(self.entries):
+                if sum(e.nbytes for e in self.entries.values()) <= budget:
+                    break
+                entry = self.entries[name]
+                if name in (self.default_name, keep) or entry.in_use:
+                    continue
+                del self.entries[name]
+                evicted.append(entry)
+                self.evictions += 1
+            over = sum(e.nbytes for e in self.entries.values()) > budget
+        for entry in evicted:
+            print(f"[MODELS] ♻️ Evicted '{entry.name}' ({entry.nbytes / (1024 * 1024):.1f} MB, LRU)")
+        if evicted:
+            gc.collect()
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        if over:
+            print("[MODELS] ⚠️ Over MODEL_MEMORY_BUDGET_MB, but remaining models are in use")
+
+    async def _ensure_loaded(self, name: str) -> ModelEntry:
+        entry = self.entries.get(name)
+        if entry is not None:
+            return entry
+        lock = self._load_locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            # Load off the event loop; concurrent requests wait for the same load
+            return await asyncio.get_running_loop().run_in_executor(None, self.load, name)
+
+    # -------------------------------
+    # Routing
+    # -------------------------------
+    async def acquire(self, name: str = None) -> Dict:
+        """
+        Resolve a model or cascade name to loaded models and pin them
+
+        Args:
+            name: Model or cascade name (None = default model)
+
+        Returns:
+            Route dict with 'name', 'entries' and 'min_confidence'
+            (release() it when the frame is done)
+        """
+        name = name or self.default_name
+        cascade = config.CASCADES.get(name)
+        members = [cascade["first"], cascade["second"]] if cascade else [name]
+        route = {
+            "name": name,
+            "entries": [],
+            "min_confidence": cascade.get("min_confidence", 0.5) if cascade else None,
+        }
+        pinned = False
+        try:
+            # Pin each model as soon as it is loaded: loading a cascade's second
+            # model may evict to stay within budget, and must not evict the first
+            for member in members:
+                entry = await self._ensure_loaded(member)
+                self._pin(entry)
+                route["entries"].append(entry)
+            pinned = True
+        finally:
+            if not pinned:
+                self.release(route)
+        # Frames batch together only on identical weights (differs across a swap)
+        route["key"] = (name,) + tuple(entry.version for entry in route["entries"])
+        return route
+
+    def _pin(self, entry: ModelEntry):
+        """Count a frame in flight on a model, so _evict() leaves it loaded"""
+        with self._lock:
+            entry.in_use += 1
+            entry.uses += 1
+            entry.last_used = time.time()
+            if entry.name in self.entries:
+                self.entries.move_to_end(entry.name)
+
+    def route_key(self, name: str = None) -> Tuple:
+        """The 'key' acquire() would return for a name, without loading anything"""
+        name = name or self.default_name
+        cascade = config.CASCADES.get(name)
+        members = [cascade["first"], cascade["second"]] if cascade else [name]
+        return (name,) + tuple(self.versions.get(member, "v1") for member in members)
+
+    def release(self, route: Dict):
+        """Unpin the models of a route acquired with acquire()"""
+        with self._lock:
+            for entry in route["entries"]:
+                entry.in_use = max(0, entry.in_use - 1)
+
+    # -------------------------------
+    # Stats
+    # -------------------------------
+    def stats(self) -> Dict:
+        """Loaded models with memory and usage, plus available names"""
+        with self._lock:
+            entries = list(self.entries.values())
+        return {
+            "default": self.default_name,
+            "available": self.names(),
+            "budget_mb": config.MODEL_MEMORY_BUDGET_MB,
+            "loaded_mb": round(sum(e.nbytes for e in entries) / (1024 * 1024), 1),
+            "evictions": self.evictions,
+            "swaps": self.swaps[-10:],
+            "loaded": {
+                e.name: {
+                    "version": e.version,
+                    "path": e.path,
+                    "memory_mb": round(e.nbytes / (1024 * 1024), 1),
+                    "load_ms": round(e.load_ms, 1),
+                    "uses": e.uses,
+                    "in_use": e.in_use,
+                    "idle_s": round(time.time() - e.last_used, 1),
+                }
+                for e in entries
+            },
+        }
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Staged frame pipeline for YOLOv11x backend
+Decode → inference → post-process/emit stages joined by bounded queues,
+so frame N+1 is decoded while frame N is being inferred
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+import config
+
+
+class PipelineStage:
+    """
+    One pipeline stage: a bounded set of slots and, optionally, its own threads.
+
+    A frame holds a slot while it waits for and uses the stage, so at most
+    `capacity` frames are in a stage at once; the rest wait upstream. Busy
+    time of the stage's workers is kept for the last
+    PIPELINE_UTILISATION_WINDOW_S seconds to report utilisation.
+    """
+
+    def __init__(self, name: str, workers: int, capacity: int):
+        self.name = name
+        self.workers = max(1, workers)
+        self.capacity = max(capacity, self.workers)
+        # workers == 0: the stage's work runs where it is called (event loop or scheduler threads)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name) if workers > 0 else None
+        self._slots: Optional[asyncio.Semaphore] = None  # Created on first use (needs the event loop)
+        self._busy = deque()  # (end time, busy seconds) per finished task
+        self._lock = threading.Lock()  # _busy is appended from worker threads
+        self.entered = 0
+        self.held = 0
+        self.waiting = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+
+    def slots(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.capacity)
+        return self._slots
+
+    @contextmanager
+    def busy(self):
+        """Count the enclosed block as work of this stage (on any thread)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self._busy.append((end, end - start))
+
+    def _call(self, fn: Callable, args):
+        with self.busy():
+            return fn(*args)
+
+    async def run(self, fn: Callable, *args):
+        """Run a blocking call on the stage's threads (inline without them)"""
+        if self.executor is None:
+            return self._call(fn, args)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self._call, fn, args)
+
+    def utilisation(self) -> float:
+        """Fraction of the stage's worker time spent busy over the window"""
+        now = time.perf_counter()
+        window = config.PIPELINE_UTILISATION_WINDOW_S
+        with self._lock:
+            while self._busy and self._busy[0][0] < now - window:
+                self._busy.popleft()
+            busy = sum(min(duration, window) for _, duration in self._busy)
+        return min(1.0, busy / (window * self.workers))
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "capacity": self.capacity,
+            "in_stage": self.held,
+            "waiting": self.waiting,
+            "utilisation": round(self.utilisation(), 3),
+            "avg_wait_ms": round(self.total_wait_ms / self.entered, 2) if self.entered else 0.0,
+            "max_wait_ms": round(self.max_wait_ms, 2),
+        }
+
+
+class FrameTicket:
+    """
+    A frame's place in the pipeline: holds a slot in at most one stage.
+
+    enter() takes a slot in the next stage before giving up the current
+    one, so a full downstream queue holds frames upstream (backpressure)
+    instead of piling up decoded frames. Use as `async with pipeline.ticket()`;
+    the held slot is released on exit.
+    """
+
+    def __init__(self, pipeline: "FramePipeline"):
+        self.pipeline = pipeline
+        self.stage: Optional[PipelineStage] = None
+
+    async def enter(self, name: str) -> PipelineStage:
+        stage = self.pipeline.stages[name]
+        start = time.perf_counter()
+        stage.waiting += 1
+        try:
+            await stage.slots().acquire()
+        finally:
+            stage.waiting -= 1
+        wait_ms = (time.perf_counter() - start) * 1000
+        stage.entered += 1
+        stage.held += 1
+        stage.total_wait_ms += wait_ms
+        stage.max_wait_ms = max(stage.max_wait_ms, wait_ms)
+        self.release()
+        self.stage = stage
+        return stage
+
+    def release(self):
+        if self.stage is not None:
+            self.stage.held -= 1
+            self.stage.slots().release()
+            self.stage = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+
+class FramePipeline:
+    """
+    The server's three frame stages:
+      decode  PIPELINE_DECODE_WORKERS threads (base64/JPEG/YUV decoding releases the GIL)
+      infer   the fair scheduler's inference threads (slots bound frames queued for it)
+      post    PIPELINE_POST_WORKERS threads for detection extraction; the emit follows on the event loop
+    With PIPELINE_DECODE_WORKERS = 0 frames are decoded on the event loop
+    as before, one at a time.
+
+    Slots are only taken and released on the event loop, so no locking is needed there.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, PipelineStage] = {
+            "decode": PipelineStage("decode", config.PIPELINE_DECODE_WORKERS, config.PIPELINE_DECODE_QUEUE),
+            "infer": PipelineStage("infer", 0, config.PIPELINE_INFER_QUEUE),
+            "post": PipelineStage("post", config.PIPELINE_POST_WORKERS, config.PIPELINE_POST_QUEUE),
+        }
+        # The infer stage runs on the scheduler's threads
+        self.stages["infer"].workers = config.INFERENCE_WORKERS
+
+    def ticket(self) -> FrameTicket:
+        return FrameTicket(self)
+
+    async def run(self, name: str, fn: Callable, *args):
+        return await self.stages[name].run(fn, *args)
+
+    def busy(self, name: str):
+        return self.stages[name].busy()
+
+    def stats(self) -> Dict:
+        return {name: stage.stats() for name, stage in self.stages.items()}
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Server-side preprocessing for YOLOv11x backend
+Letterboxes each frame once, directly into a reused model input buffer
+"""
+
+import threading
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+import torch
+
+import config
+from buffer_pool import get_buffer_pool
+
+# Same grey Ultralytics uses for letterbox padding
+PAD_COLOR = 114
+
+
+class Letterboxer:
+    """
+    Resizes and pads frames into a preallocated (B, 3, S, S) input tensor.
+
+    The frame is resized straight into the padded canvas (no intermediate
+    copy), then converted BGR HWC uint8 -> RGB CHW float in [0, 1] into the
+    model input buffer. Passing that tensor to the model skips Ultralytics'
+    own letterbox, so each frame is resized exactly once.
+
+    One instance per inference thread: the buffers are leased once from the
+    thread's buffer pool and reused every call. Frames of a batch are written
+    to consecutive slots with fill(), then tensor_for(n) hands the model the
+    first n slots.
+    """
+
+    def __init__(self, size: int = None, device: str = None, half: bool = None,
+                 max_batch: int = 1):
+        self.size = size or config.IMAGE_SIZE
+        self.max_batch = max(1, max_batch)
+        self.device = torch.device(device or config.DEVICE)
+        half = config.HALF_PRECISION if half is None else half
+        self.dtype = np.float16 if half and self.device.type != "cpu" else np.float32
+
+        pool = get_buffer_pool()
+        self.canvas = pool.acquire((self.size, self.size, 3), np.uint8)
+        self.canvas.fill(PAD_COLOR)
+        self.input = pool.acquire((self.max_batch, 3, self.size, self.size), self.dtype)
+        host_tensor = torch.from_numpy(self.input)  # Shares memory with self.input
+        if self.device.type == "cpu":
+            self.tensor = host_tensor
+            self._host_tensor = None
+        else:
+            self.tensor = torch.empty(host_tensor.shape, dtype=host_tensor.dtype, device=self.device)
+            self._host_tensor = host_tensor
+        self._layout = None  # (new_w, new_h, pad_left, pad_top) of the last frame
+
+    def release(self):
+        """Hand the buffers back to the thread's pool (the letterboxer is unusable afterwards)"""
+        pool = get_buffer_pool()
+        pool.release(self.canvas)
+        pool.release(self.input)
+
+    def __call__(self, frame: np.ndarray) -> Tuple[torch.Tensor, Dict]:
+        """
+        Letterbox a single BGR frame into the model input buffer
+
+        Args:
+            frame: Decoded BGR image (H, W, 3) uint8
+
+        Returns:
+            Tuple of (model input tensor, transform dict for mapping boxes back)
+        """
+        transform = self.fill(0, frame)
+        return self.tensor_for(1), transform
+
+    def tensor_for(self, count: int) -> torch.Tensor:
+        """Model input holding the first `count` filled slots"""
+        if self._host_tensor is None:
+            return self.tensor[:count]
+        self.tensor[:count].copy_(self._host_tensor[:count], non_blocking=True)
+        return self.tensor[:count]
+
+    def fill(self, slot: int, frame: np.ndarray) -> Dict:
+        """
+        Letterbox a BGR frame into one slot of the model input buffer
+
+        Args:
+            slot: Batch index to write (0 <= slot < max_batch)
+            frame: Decoded BGR image (H, W, 3) uint8
+
+        Returns:
+            Transform dict for mapping boxes back to the frame
+        """
+        h, w = frame.shape[:2]
+        scale = min(self.size / w, self.size / h)
+        new_w = max(1, int(round(w * scale)))
+        new_h = max(1, int(round(h * scale)))
+        pad_left = (self.size - new_w) // 2
+        pad_top = (self.size - new_h) // 2
+
+        layout = (new_w, new_h, pad_left, pad_top)
+        if layout != self._layout:
+            # Padding only needs repainting when the frame geometry changes
+            self.canvas.fill(PAD_COLOR)
+            self._layout = layout
+
+        roi = self.canvas[pad_top:pad_top + new_h, pad_left:pad_left + new_w]
+        interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+        cv2.resize(frame, (new_w, new_h), dst=roi, interpolation=interpolation)
+
+        # BGR HWC uint8 -> RGB CHW float [0, 1], written in place
+        np.multiply(
+            self.canvas.transpose(2, 0, 1)[::-1],
+            self.dtype(1.0 / 255.0),
+            out=self.input[slot],
+            dtype=self.dtype,
+            casting="unsafe",
+        )
+
+        transform = {
+            "scale": scale,
+            "pad_left": pad_left,
+            "pad_top": pad_top,
+            "input_width": self.size,
+            "input_height": self.size,
+            "frame_width": w,
+            "frame_height": h,
+        }
+        return transform
+
+
+# Buffers are reused, so every inference thread gets its own letterboxers
+_local = threading.local()
+
+
+def get_letterboxer(size: int = None, batch: int = 1) -> Letterboxer:
+    """
+    Get the calling thread's letterboxer for an input size
+
+    Args:
+        size: Model input size (defaults to config.IMAGE_SIZE)
+        batch: Number of slots needed
+
+    Returns:
+        Letterboxer owned by the current thread
+    """
+    size = size or config.IMAGE_SIZE
+    letterboxers = getattr(_local, "letterboxers", None)
+    if letterboxers is None:
+        letterboxers = _local.letterboxers = {}
+    letterboxer = letterboxers.get(size)
+    if letterboxer is None or letterboxer.max_batch < batch:
+        if letterboxer is not None:
+            letterboxer.release()
+        capacity = max(batch, config.MAX_BATCH_SIZE)
+        letterboxer = letterboxers[size] = Letterboxer(size, max_batch=capacity)
+    return letterboxer
+
+
+def unletterbox_box(bbox: List[float], transform: Dict) -> List[float]:
+    """
+    Map a box from model input coordinates back to the original frame
+
+    Args:
+        bbox: Box in letterboxed input space [x1, y1, x2, y2]
+        transform: Transform returned by Letterboxer
+
+    Returns:
+        Box in original frame pixels [x1, y1, x2, y2], clipped to the frame
+    """
+    scale = transform["scale"]
+    max_x = transform["frame_width"]
+    max_y = transform["frame_height"]
+    x1, y1, x2, y2 = bbox
+    return [
+        min(max((x1 - transform["pad_left"]) / scale, 0.0), max_x),
+        min(max((y1 - transform["pad_top"]) / scale, 0.0), max_y),
+        min(max((x2 - transform["pad_left"]) / scale, 0.0), max_x),
+        min(max((y2 - transform["pad_top"]) / scale, 0.0), max_y),
+    ]
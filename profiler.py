@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Profiling for YOLOv11x backend
+Per-stage timers and an on-demand sampling profiler with flamegraph output
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import config
+
+
+class StageTimers:
+    """
+    Latency per pipeline stage (decode, queue, letterbox, infer, postprocess).
+
+    stage() times a block and also marks the calling thread as being in that
+    stage, so SamplingProfiler can file its samples under the stage. Blocks
+    passed to stage() must not await: on the event loop, another coroutine
+    would run inside the marked section.
+
+    Thread-safe (inference threads record too).
+    """
+
+    def __init__(self, window: int = None):
+        self.window = window or config.PROFILE_STAGE_WINDOW
+        self.stages: Dict[str, Dict] = {}
+        self.active: Dict[int, str] = {}  # thread id -> stage being run
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a (synchronous) block as one sample of a stage"""
+        thread = threading.get_ident()
+        previous = self.active.get(thread)
+        self.active[thread] = name
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000)
+            if previous is None:
+                self.active.pop(thread, None)
+            else:
+                self.active[thread] = previous
+
+    def record(self, name: str, ms: float):
+        """Add one measurement to a stage"""
+        with self._lock:
+            stage = self.stages.get(name)
+            if stage is None:
+                stage = self.stages[name] = {
+                    "count": 0, "total_ms": 0.0, "max_ms": 0.0, "recent": deque(maxlen=self.window),
+                }
+            stage["count"] += 1
+            stage["total_ms"] += ms
+            stage["max_ms"] = max(stage["max_ms"], ms)
+            stage["recent"].append(ms)
+
+    def stats(self) -> Dict:
+        """Average, recent p50/p95 and max per stage"""
+        with self._lock:
+            stages = {name: (s["count"], s["total_ms"], s["max_ms"], sorted(s["recent"]))
+                      for name, s in self.stages.items()}
+        return {
+            name: {
+                "count": count,
+                "avg_ms": round(total / count, 2),
+                "p50_ms": round(recent[len(recent) // 2], 2),
+                "p95_ms": round(recent[int(len(recent) * 0.95)], 2),
+                "max_ms": round(max_ms, 2),
+            }
+            for name, (count, total, max_ms, recent) in stages.items()
+        }
+
+    def reset(self):
+        with self._lock:
+            self.stages.clear()
+
+
+class SamplingProfiler:
+    """
+    Low-overhead statistical profiler for the whole process.
+
+    A background thread snapshots every thread's Python stack with
+    sys._current_frames() every interval_ms and counts identical stacks.
+    Nothing is hooked into the profiled code, so cost is one stack walk per
+    thread per sample, and it can be run briefly in production.
+
+    Output is the folded-stack format ("root;caller;callee count" per line)
+    read by flamegraph.pl, speedscope and inferno. Each stack is rooted at
+    the stage its thread was in (from StageTimers), or at the thread name.
+
+    The stack counts are locked: summary() may read them while sampling runs.
+    """
+
+    def __init__(self, timers: StageTimers = None):
+        self.timers = timers
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.running = False
+        self.started_at: Optional[float] = None
+        self.duration_s = 0.0
+        self.interval_s = 0.0
+        self.output: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _label(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _sample(self, own_thread: int):
+        names = {t.ident: t.name for t in threading.enumerate()}
+        active = dict(self.timers.active) if self.timers else {}
+        stacks = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(self._label(frame))
+                frame = frame.f_back
+            root = active.get(thread_id) or f"thread:{names.get(thread_id, thread_id)}"
+            stacks.append(";".join([root] + labels[::-1]))
+        with self._lock:
+            self.stacks.update(stacks)
+            self.samples += 1
+
+    def _run(self, duration_s: float, interval_s: float):
+        own = threading.get_ident()
+        end = time.perf_counter() + duration_s
+        next_sample = time.perf_counter()
+        try:
+            while time.perf_counter() < end:
+                self._sample(own)
+                next_sample += interval_s
+                time.sleep(max(0.0, next_sample - time.perf_counter()))
+            self.output = self.dump()
+        finally:
+            # Also on errors, so waiting requests return and later profiles can start
+            self.running = False
+
+    def start(self, duration_s: float, interval_ms: float = None) -> bool:
+        """
+        Sample for duration_s seconds in the background
+
+        Returns:
+            False if a profile is already running
+        """
+        if self.running:
+            return False
+        with self._lock:
+            self.stacks.clear()
+            self.samples = 0
+        self.output = None
+        self.running = True
+        self.started_at = time.time()
+        self.duration_s = duration_s
+        self.interval_s = (interval_ms or config.PROFILE_INTERVAL_MS) / 1000.0
+        self._thread = threading.Thread(target=self._run, args=(duration_s, self.interval_s),
+                                        name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return True
+
+    def dump(self) -> str:
+        """Write the folded stacks to PROFILE_DIR and return the path"""
+        os.makedirs(config.PROFILE_DIR, exist_ok=True)
+        path = os.path.join(config.PROFILE_DIR, f"profile-{time.strftime('%Y%m%d-%H%M%S')}.folded")
+        with self._lock:
+            stacks = self.stacks.copy()
+        with open(path, "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        print(f"[PROFILER] 🔥 {self.samples} samples written to {path}")
+        return path
+
+    def summary(self, top: int = 10) -> Dict:
+        """Samples per root (stage / thread) and the hottest leaf functions"""
+        with self._lock:
+            stacks = self.stacks.copy()
+        roots: Counter = Counter()
+        leaves: Counter = Counter()
+        for stack, count in stacks.items():
+            frames = stack.split(";")
+            roots[frames[0]] += count
+            leaves[frames[-1]] += count
+        total = sum(roots.values()) or 1
+        return {
+            "running": self.running,
+            "samples": self.samples,
+            "interval_ms": round(self.interval_s * 1000, 2),
+            "duration_s": self.duration_s,
+            "output": self.output,
+            "by_root": {root: round(count / total, 3) for root, count in roots.most_common(top)},
+            "hottest": {leaf: round(count / total, 3) for leaf, count in leaves.most_common(top)},
+        }
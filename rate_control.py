@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Adaptive rate control for YOLOv11x backend
+Recommends per-client FPS, resolution and JPEG quality from server load
+"""
+
+import time
+from typing import Dict, Optional
+
+import config
+
+
+class RateController:
+    """
+    Tracks per-session inference latency and global queue depth, and turns
+    them into a send-rate / quality recommendation for each client.
+
+    All methods are called from the event loop, so no locking is needed.
+    """
+
+    def __init__(self):
+        self.queue_depth = 0                      # Frames currently in flight
+        self.latency_ms: Dict[str, float] = {}    # sid -> EMA of inference latency
+        self.last_sent: Dict[str, Dict] = {}      # sid -> last recommendation sent
+        self.last_sent_at: Dict[str, float] = {}  # sid -> time of last recommendation
+        self.client_max_fps: Dict[str, float] = {}  # sid -> FPS the client declared it targets
+
+    def set_client_fps(self, sid: str, fps: Optional[float]):
+        """Cap a session's recommended FPS at the rate its client declared"""
+        if fps:
+            self.client_max_fps[sid] = fps
+
+    def frame_started(self):
+        """Mark a frame as entering the processing pipeline"""
+        self.queue_depth += 1
+
+    def frame_finished(self, sid: str, latency_ms: Optional[float] = None):
+        """
+        Mark a frame as done and fold its latency into the session average
+
+        Args:
+            sid: Socket ID
+            latency_ms: Measured inference latency (None if the frame failed early)
+        """
+        self.queue_depth = max(0, self.queue_depth - 1)
+        if latency_ms is None:
+            return
+        previous = self.latency_ms.get(sid)
+        if previous is None:
+            self.latency_ms[sid] = latency_ms
+        else:
+            alpha = config.RATE_CONTROL_EMA_ALPHA
+            self.latency_ms[sid] = alpha * latency_ms + (1 - alpha) * previous
+
+    def recommend(self, sid: str) -> Dict:
+        """
+        Build the recommendation for a session
+
+        Args:
+            sid: Socket ID
+
+        Returns:
+            Dictionary with fps, max_dim, jpeg_quality, imgsz and the inputs used
+        """
+        latency = self.latency_ms.get(sid, config.RATE_CONTROL_INITIAL_LATENCY_MS)
+        depth = self.queue_depth
+
+        # Frames ahead of this client's next one share the same workers
+        capacity_fps = 1000.0 / max(latency, 1.0) / max(1, depth)
+        fps = capacity_fps * config.RATE_CONTROL_HEADROOM
+        max_fps = min(config.RATE_CONTROL_MAX_FPS, self.client_max_fps.get(sid, config.RATE_CONTROL_MAX_FPS))
+        fps = max(min(config.RATE_CONTROL_MIN_FPS, max_fps), min(max_fps, fps))
+
+        if depth >= config.RATE_CONTROL_QUEUE_HIGH or latency >= config.RATE_CONTROL_LATENCY_HIGH_MS:
+            tier = "low"
+        elif depth <= config.RATE_CONTROL_QUEUE_LOW and latency <= config.RATE_CONTROL_LATENCY_LOW_MS:
+            tier = "high"
+        else:
+            tier = "medium"
+        max_dim, jpeg_quality = config.RATE_CONTROL_TIERS[tier]
+
+        return {
+            "fps": round(fps, 1),
+            "max_dim": max_dim,
+            "jpeg_quality": jpeg_quality,
+            "imgsz": config.RATE_CONTROL_IMGSZ.get(tier, config.IMAGE_SIZE),
+            "tier": tier,
+            "latency_ms": round(latency, 1),
+            "queue_depth": depth,
+        }
+
+    def should_send(self, sid: str, recommendation: Dict) -> bool:
+        """
+        Decide whether a recommendation is worth emitting
+
+        Sends on tier changes, significant FPS changes, or when the last
+        recommendation is older than RATE_CONTROL_INTERVAL_S.
+        """
+        previous = self.last_sent.get(sid)
+        if previous is None:
+            return True
+        if previous["tier"] != recommendation["tier"]:
+            return True
+        change = abs(recommendation["fps"] - previous["fps"]) / max(previous["fps"], 0.1)
+        if change >= config.RATE_CONTROL_FPS_CHANGE:
+            return True
+        return time.time() - self.last_sent_at.get(sid, 0) >= config.RATE_CONTROL_INTERVAL_S
+
+    def mark_sent(self, sid: str, recommendation: Dict):
+        """Remember the recommendation last emitted to a session"""
+        self.last_sent[sid] = recommendation
+        self.last_sent_at[sid] = time.time()
+
+    def forget(self, sid: str):
+        """Drop all state for a disconnected session"""
+        self.latency_ms.pop(sid, None)
+        self.last_sent.pop(sid, None)
+        self.last_sent_at.pop(sid, None)
+        self.client_max_fps.pop(sid, None)
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Raw WebSocket endpoint for YOLOv11x backend
+A minimal binary protocol served next to Socket.IO by the same uvicorn app,
+without Engine.IO framing, acks or polling fallbacks
+
+Connect:  ws://host:3000/ws?client=PYTHON&format=jpeg&fps=10&width=720&height=1280
+          Query parameters are the Socket.IO auth capabilities (plus optional
+          model, preset and imgsz); frames are always binary. Capabilities
+          whose results the binary replies have no room for (annotate,
+          timing) are refused.
+Client → server, binary message:
+          4-byte frame id (u32) + encoded frame (JPEG / YUV420, or a chunk
+          of the video stream for format h264 / mjpeg)
+Server → client, binary message:
+          REPLY header (kind, frame id, credits, detection count), then one
+          DETECTION record per detection (boxes in frame pixels). Kind 1 is
+          an error, followed by its UTF-8 message.
+Server → client, text message:
+          JSON {"event": ..., "data": ...} for everything else: the
+          connection_response (with class names) and rate_control.
+
+All integers and floats are little-endian.
+"""
+
+import asyncio
+import json
+import struct
+import uuid
+from typing import Awaitable, Callable, Dict, List, Tuple
+from urllib.parse import parse_qsl
+
+import config
+from sessions import parse_flag
+
+FRAME_ID = struct.Struct("<I")
+REPLY = struct.Struct("<BIhH")     # kind, frame id, credits (-1 = flow control off), detection count
+DETECTION = struct.Struct("<5fH")  # x1, y1, x2, y2, confidence, class id
+
+KIND_DETECTIONS = 0
+KIND_ERROR = 1
+
+# Capabilities that add reply fields the binary REPLY format cannot carry
+UNSUPPORTED_CAPABILITIES = ("annotate", "timing")
+
+
+def capabilities_from_query(params: Dict[str, str]) -> Tuple[Dict, List[str]]:
+    """
+    Session capabilities from a raw connection's query parameters
+
+    Args:
+        params: Query parameters (all strings)
+
+    Returns:
+        (auth dict for Session.apply_capabilities, problems found)
+    """
+    auth = dict(params, binary=True)
+    problems = []
+    if "binary" in params and parse_flag(params["binary"]) is not True:
+        problems.append("raw WebSocket frames are always binary")
+    for name in UNSUPPORTED_CAPABILITIES:
+        if name in auth and parse_flag(auth.pop(name)) is not False:
+            problems.append(f"'{name}' is not available over the raw WebSocket (binary replies can't carry it)")
+    return auth, problems
+
+
+def pack_reply(event: str, payload: Dict) -> bytes:
+    """Pack a 'detections' or 'error' payload into a binary reply"""
+    frame_id = payload.get("frame_id", payload.get("stream_frame")) or 0
+    credits = payload.get("credits", -1)
+    if event == "error":
+        return REPLY.pack(KIND_ERROR, frame_id, credits, 0) + str(payload.get("message", "")).encode()
+    detections = payload.get("detections", [])
+    return REPLY.pack(KIND_DETECTIONS, frame_id, credits, len(detections)) + b"".join(
+        DETECTION.pack(*det["bbox"], det["confidence"], det["class_id"]) for det in detections
+    )
+
+
+def unpack_reply(message: bytes) -> Dict:
+    """Decode a binary reply (for clients)"""
+    kind, frame_id, credits, count = REPLY.unpack_from(message)
+    reply = {"frame_id": frame_id, "credits": None if credits < 0 else credits}
+    if kind == KIND_ERROR:
+        reply["error"] = bytes(message[REPLY.size:]).decode(errors="replace")
+        return reply
+    reply["detections"] = []
+    for i in range(count):
+        *bbox, confidence, class_id = DETECTION.unpack_from(message, REPLY.size + i * DETECTION.size)
+        reply["detections"].append({"bbox": bbox, "confidence": confidence, "class_id": class_id})
+    return reply
+
+
+class RawWebSocketEndpoint:
+    """
+    ASGI app for config.RAW_WS_PATH (plain HTTP and other paths get 404).
+
+    Every connection becomes an ordinary session with a 'ws-' sid, so
+    credits, scheduling, rate control and stats work as for Socket.IO
+    clients. The server supplies the handlers:
+      on_connect(sid, params)            coroutine, after the socket is accepted
+      on_frame(sid, frame_id, payload)   coroutine, run as its own task per message
+      on_disconnect(sid)
+    Frames are handled in their own tasks (like Socket.IO events), so the
+    receive loop never waits for inference; credits bound how many run at once.
+    send() is the transport the server's emit queue uses for these sessions.
+
+    All methods are called from the event loop, so no locking is needed
+    (sends of one connection are serialised with an asyncio.Lock).
+    """
+
+    def __init__(self, on_connect: Callable[[str, Dict], Awaitable], on_frame: Callable[[str, int, memoryview], Awaitable],
+                 on_disconnect: Callable[[str], None]):
+        self.on_connect = on_connect
+        self.on_frame = on_frame
+        self.on_disconnect = on_disconnect
+        self.connections: Dict[str, Dict] = {}  # sid -> ASGI send and send lock
+        self._tasks = set()  # Frames in flight (referenced until done)
+        self.accepted = 0
+        self.frames = 0
+
+    def owns(self, sid: str) -> bool:
+        return sid in self.connections
+
+    async def send(self, sid: str, event: str, payload: Dict):
+        """Send an event: detections/errors as packed binary, anything else as JSON text"""
+        connection = self.connections.get(sid)
+        if connection is None:
+            return
+        if event in ("detections", "error"):
+            message = {"type": "websocket.send", "bytes": pack_reply(event, payload)}
+        else:
+            message = {"type": "websocket.send", "text": json.dumps({"event": event, "data": payload})}
+        async with connection["lock"]:  # ASGI sends of one socket must not interleave
+            try:
+                await connection["send"](message)
+            except Exception:
+                pass  # Closed meanwhile; the receive loop cleans up
+
+    async def close(self, sid: str, code: int = 1000):
+        """Close a connection from the server side (e.g. idle expiry)"""
+        connection = self.connections.get(sid)
+        if connection is not None:
+            async with connection["lock"]:
+                try:
+                    await connection["send"]({"type": "websocket.close", "code": code})
+                except Exception:
+                    pass
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            await send({"type": "http.response.start", "status": 404,
+                        "headers": [(b"content-type", b"text/plain")]})
+            await send({"type": "http.response.body", "body": b"Not Found"})
+            return
+        if scope["type"] != "websocket":
+            return
+        if (await receive())["type"] != "websocket.connect":
+            return
+        if scope["path"].rstrip("/") != config.RAW_WS_PATH:
+            await send({"type": "websocket.close", "code": 1008})
+            return
+
+        await send({"type": "websocket.accept"})
+        sid = f"ws-{uuid.uuid4().hex[:16]}"
+        self.connections[sid] = {"send": send, "lock": asyncio.Lock()}
+        self.accepted += 1
+        try:
+            await self.on_connect(sid, dict(parse_qsl(scope.get("query_string", b"").decode())))
+            while True:
+                message = await receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                data = message.get("bytes")
+                if not data or len(data) <= FRAME_ID.size:
+                    continue  # Text and empty messages are ignored
+                (frame_id,) = FRAME_ID.unpack_from(data)
+                self.frames += 1
+                task = asyncio.ensure_future(self.on_frame(sid, frame_id, memoryview(data)[FRAME_ID.size:]))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        finally:
+            # Frames still in flight finish normally; their replies are dropped by send()
+            self.connections.pop(sid, None)
+            self.on_disconnect(sid)
+
+    def stats(self) -> Dict:
+        return {
+            "path": config.RAW_WS_PATH,
+            "connected": len(self.connections),
+            "accepted": self.accepted,
+            "frames": self.frames,
+        }
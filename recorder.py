@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Frame recording for YOLOv11x backend
+Append-only per-session recordings of incoming frames, timing and metadata
+
+File layout (one pair of files per session):
+  <name>.yrec  MAGIC, then a 4-byte length + JSON header (session, client
+               capabilities, start time), then one record per frame:
+               4-byte meta length, 4-byte payload length, JSON meta
+               (t, seq, format, width, height, imgsz, preset ...), payload
+               (the frame exactly as received: JPEG or raw YUV420 bytes)
+  <name>.yidx  One fixed-size entry per record: offset (u64), t (f64), payload length (u32)
+
+All integers are little-endian. The index makes seeking cheap; if it is
+missing or short (e.g. the server was killed), read_recording() rebuilds
+the offsets by scanning the data file.
+"""
+
+import json
+import os
+import queue
+import struct
+import threading
+import time
+from typing import Dict, Iterator, Optional, Tuple
+
+import config
+
+MAGIC = b"YREC1\n"
+_LENGTH = struct.Struct("<I")
+_RECORD = struct.Struct("<II")     # meta length, payload length
+_INDEX = struct.Struct("<QdI")     # offset, t, payload length
+
+
+class FrameRecorder:
+    """
+    Records frames per session on a background writer thread.
+
+    record() only enqueues, so the frame handler never waits on disk; if
+    the writer falls behind by RECORDING_QUEUE_SIZE frames, new frames are
+    skipped (and counted) rather than slowing down serving. A session stops
+    recording once its file reaches RECORDING_MAX_MB_PER_SESSION.
+
+    Recording is off unless config.RECORDING_ENABLED is set or an admin
+    turns it on (for all sessions or one) with enable().
+
+    Only sessions between register() (on connect) and forget() (on
+    disconnect) are recorded, so a frame finishing after its client left
+    cannot open a file that nothing would close.
+    """
+
+    def __init__(self, directory: str = None):
+        self.directory = directory or config.RECORDING_DIR
+        self.override: Optional[bool] = None  # Admin on/off for all sessions (None = follow config)
+        self.sids = set()                     # Sessions an admin turned on individually
+        self.live = set()                     # Connected sessions (register() .. forget())
+        self.files: Dict[str, Dict] = {}      # sid -> open file state (writer thread only)
+        self.started: Dict[str, float] = {}   # sid -> monotonic time of first recorded frame
+        self.seq: Dict[str, int] = {}
+        self.skipped = 0
+        self.recorded = 0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=config.RECORDING_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+
+    # -------------------------------
+    # Control
+    # -------------------------------
+    def register(self, sid: str):
+        """Allow recording for a newly connected session"""
+        self.live.add(sid)
+
+    def enabled(self, sid: str) -> bool:
+        if sid not in self.live:
+            return False
+        if sid in self.sids:
+            return True
+        return self.override if self.override is not None else config.RECORDING_ENABLED
+
+    def enable(self, on: bool, sid: str = None):
+        """Turn recording on/off for one session, or for all sessions"""
+        if sid is None:
+            self.override = on
+            if not on:
+                self.sids.clear()
+        elif on:
+            self.sids.add(sid)
+        else:
+            self.sids.discard(sid)
+
+    # -------------------------------
+    # Recording (event loop side)
+    # -------------------------------
+    def record(self, sid: str, payload: bytes, meta: Dict, header: Dict = None):
+        """
+        Queue one received frame for writing
+
+        Args:
+            sid: Socket ID
+            payload: Frame bytes as received (after base64 decoding)
+            meta: Per-frame metadata (format, width, height, imgsz, preset ...)
+            header: Session metadata written once at the top of the file
+        """
+        if sid not in self.live:
+            return  # Disconnected (forget() already ran): don't reopen its recording
+        now = time.monotonic()
+        start = self.started.setdefault(sid, now)
+        seq = self.seq.get(sid, 0)
+        self.seq[sid] = seq + 1
+        record = dict(meta, t=round(now - start, 6), seq=seq)
+        try:
+            self._queue.put_nowait(("frame", sid, bytes(payload), record, header))
+        except queue.Full:
+            self.skipped += 1
+            return
+        self._ensure_writer()
+
+    def forget(self, sid: str):
+        """Close a session's recording (on disconnect)"""
+        self.live.discard(sid)
+        self.sids.discard(sid)
+        self.seq.pop(sid, None)
+        if self.started.pop(sid, None) is not None:
+            try:
+                self._queue.put_nowait(("close", sid, None, None, None))
+            except queue.Full:
+                pass  # The writer closes leftovers when it next runs dry
+
+    def _ensure_writer(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._writer, name="frame-recorder", daemon=True)
+            self._thread.start()
+
+    # -------------------------------
+    # Writer thread
+    # -------------------------------
+    def _open(self, sid: str, header: Dict) -> Dict:
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}_{sid[:12].replace('/', '_')}"
+        path = os.path.join(self.directory, name)
+        data = open(path + ".yrec", "ab")
+        index = open(path + ".yidx", "ab")
+        header_bytes = json.dumps(dict(header or {}, sid=sid, started_at=time.time())).encode()
+        data.write(MAGIC + _LENGTH.pack(len(header_bytes)) + header_bytes)
+        print(f"[RECORDER] ⏺️ Recording {sid[:10]} → {path}.yrec")
+        return {"data": data, "index": index, "path": path, "bytes": data.tell(), "full": False}
+
+    def _close(self, sid: str):
+        state = self.files.pop(sid, None)
+        if state is not None:
+            state["data"].close()
+            state["index"].close()
+            print(f"[RECORDER] ⏹️ Closed {state['path']}.yrec ({state['bytes'] / (1024 * 1024):.1f} MB)")
+
+    def _writer(self):
+        while True:
+            try:
+                kind, sid, payload, record, header = self._queue.get(timeout=5.0)
+            except queue.Empty:
+                # Idle: flush and close files of sessions that are gone
+                for sid in [s for s in self.files if s not in self.started]:
+                    self._close(sid)
+                for state in self.files.values():
+                    state["data"].flush()
+                    state["index"].flush()
+                continue
+
+            if kind == "close":
+                self._close(sid)
+                continue
+            try:
+                state = self.files.get(sid) or self.files.setdefault(sid, self._open(sid, header))
+                if state["full"]:
+                    continue
+                meta = json.dumps(record, separators=(",", ":")).encode()
+                offset = state["bytes"]
+                state["data"].write(_RECORD.pack(len(meta), len(payload)) + meta + payload)
+                state["index"].write(_INDEX.pack(offset, record["t"], len(payload)))
+                state["bytes"] += _RECORD.size + len(meta) + len(payload)
+                self.recorded += 1
+                if state["bytes"] >= config.RECORDING_MAX_MB_PER_SESSION * 1024 * 1024:
+                    state["full"] = True
+                    print(f"[RECORDER] ⚠️ {sid[:10]} reached RECORDING_MAX_MB_PER_SESSION, recording stopped")
+            except OSError as e:
+                self.skipped += 1
+                print(f"[RECORDER] ⚠️ Write failed for {sid[:10]}: {e}")
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.override if self.override is not None else config.RECORDING_ENABLED,
+            "sessions": sorted(self.sids),
+            "recording": len(self.started),
+            "recorded": self.recorded,
+            "skipped": self.skipped,
+            "queued": self._queue.qsize(),
+            "directory": os.path.abspath(self.directory),
+        }
+
+
+def read_header(path: str) -> Tuple[Dict, int]:
+    """
+    Read a recording's header
+
+    Returns:
+        (header dict, offset of the first record)
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a frame recording")
+        (length,) = _LENGTH.unpack(f.read(_LENGTH.size))
+        header = json.loads(f.read(length))
+        return header, f.tell()
+
+
+def read_index(path: str) -> Iterator[Tuple[int, float, int]]:
+    """(offset, t, payload length) per record, from the .yidx file or by scanning the data file"""
+    index_path = path[:-len(".yrec")] + ".yidx" if path.endswith(".yrec") else path + ".yidx"
+    data_size = os.path.getsize(path)
+    entries = []
+    if os.path.exists(index_path):
+        with open(index_path, "rb") as f:
+            raw = f.read()
+        entries = [_INDEX.unpack_from(raw, i) for i in range(0, len(raw) - _INDEX.size + 1, _INDEX.size)]
+        entries = [e for e in entries if e[0] + _RECORD.size + e[2] <= data_size]
+
+    with open(path, "rb") as f:
+        # Scan whatever the index doesn't cover (missing index, or records written after it)
+        if entries:
+            f.seek(entries[-1][0])
+            meta_len, payload_len = _RECORD.unpack(f.read(_RECORD.size))
+            offset = entries[-1][0] + _RECORD.size + meta_len + payload_len
+        else:
+            _, offset = read_header(path)
+        while offset + _RECORD.size <= data_size:
+            f.seek(offset)
+            meta_len, payload_len = _RECORD.unpack(f.read(_RECORD.size))
+            end = offset + _RECORD.size + meta_len + payload_len
+            if end > data_size:
+                break  # Truncated last record
+            meta = json.loads(f.read(meta_len))
+            entries.append((offset, meta["t"], payload_len))
+            offset = end
+    return iter(entries)
+
+
+def read_recording(path: str) -> Iterator[Tuple[Dict, bytes]]:
+    """Yield (meta, payload) for every complete record in a recording"""
+    with open(path, "rb") as f:
+        for offset, _, _ in read_index(path):
+            f.seek(offset)
+            meta_len, payload_len = _RECORD.unpack(f.read(_RECORD.size))
+            meta = json.loads(f.read(meta_len))
+            yield meta, f.read(payload_len)
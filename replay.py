@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Replay recorded sessions against a YOLOv11x backend
+Feeds .yrec recordings (see recorder.py) back through the server with their
+original timing, or faster, and reports round-trip latency per client
+
+Usage:
+  python replay.py recordings/20240601-101500_abc.yrec
+  python replay.py recordings/*.yrec --speed 2           # Twice as fast
+  python replay.py session.yrec --speed 0 --copies 4     # As fast as credits allow, 4 clients
+  python replay.py session.yrec --info                   # Show what's in a recording
+"""
+
+import argparse
+import os
+import threading
+import time
+
+import socketio
+
+from recorder import read_header, read_index, read_recording
+
+SERVER_URL = "http://localhost:3000"
+
+
+class ReplayClient:
+    """One Socket.IO client replaying one recording"""
+
+    def __init__(self, name: str, url: str, path: str, speed: float, loops: int):
+        self.name = name
+        self.url = url
+        self.path = path
+        self.speed = speed
+        self.loops = loops
+        self.header, _ = read_header(path)
+        self.sio = socketio.Client()
+        self.lock = threading.Lock()
+        self.sent = 0
+        self.received = 0
+        self.dropped = 0
+        self.errors = 0
+        self.coalesced = 0         # Replies the server replaced with a newer one (slow link)
+        self.max_lag_ms = 0.0      # How far sending fell behind the recorded schedule
+        self.send_times = {}       # frame_id -> send time, matched by the id echoed in replies
+        self.next_id = 0
+        self.latencies_ms = []
+        self.elapsed = 0.0
+        self.sio.on("detections", self._on_detections)
+        self.sio.on("error", self._on_error)
+
+    def _on_detections(self, data):
+        with self.lock:
+            self.received += 1
+            sent_at = self.send_times.pop(data.get("frame_id"), None)
+            if sent_at is not None:
+                self.latencies_ms.append((time.perf_counter() - sent_at) * 1000)
+            for frame_id in data.get("coalesced_frame_ids", ()):
+                if self.send_times.pop(frame_id, None) is not None:
+                    self.coalesced += 1
+
+    def _on_error(self, data):
+        with self.lock:
+            if data.get("code") == "no_credits":
+                self.dropped += 1
+            else:
+                self.errors += 1
+            self.send_times.pop(data.get("frame_id"), None)
+
+    def run(self):
+        # Same capabilities as the recorded client, but frames always go out as bytes;
+        # the format comes from the frames (legacy clients only sent it per frame)
+        auth = {key: self.header.get(key) for key in ("fps", "width", "height")
+                if self.header.get(key) is not None}
+        if self.header.get("client") in ("FLUTTER", "PYTHON"):
+            auth["client"] = self.header["client"]
+        first = next(read_recording(self.path), None)
+        auth["format"] = first[0]["format"] if first else self.header.get("format", "jpeg")
+        auth["binary"] = True
+        self.sio.connect(self.url, auth=auth)
+        start = time.perf_counter()
+        for _ in range(self.loops):
+            loop_start = time.perf_counter()
+            for meta, payload in read_recording(self.path):
+                if self.speed > 0:
+                    due = loop_start + meta["t"] / self.speed
+                    delay = due - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    else:
+                        self.max_lag_ms = max(self.max_lag_ms, -delay * 1000)
+                frame = {key: meta[key] for key in ("width", "height", "imgsz", "preset", "force_rgb")
+                         if meta.get(key) is not None}
+                frame["image"] = payload
+                with self.lock:
+                    frame["frame_id"] = self.next_id
+                    self.send_times[self.next_id] = time.perf_counter()
+                    self.next_id += 1
+                    self.sent += 1
+                self.sio.emit("frame", frame)
+                if self.speed <= 0:
+                    time.sleep(0.001)  # Yield to the receive thread
+        self.elapsed = time.perf_counter() - start
+        time.sleep(1.0)  # Let in-flight replies arrive
+
+    def summary(self) -> str:
+        lat = sorted(self.latencies_ms)
+        p50 = lat[len(lat) // 2] if lat else 0.0
+        p95 = lat[int(len(lat) * 0.95)] if lat else 0.0
+        fps = self.sent / self.elapsed if self.elapsed else 0.0
+        return (
+            f"{self.name:<24} sent {self.sent:>5} ({fps:5.1f}/s) | served {self.received:>5} | "
+            f"dropped {self.dropped:>5} | coalesced {self.coalesced:>4} | errors {self.errors:>3} | "
+            f"RTT p50 {p50:6.0f} ms p95 {p95:6.0f} ms | max lag {self.max_lag_ms:5.0f} ms"
+        )
+
+
+def describe(path: str):
+    header, _ = read_header(path)
+    index = list(read_index(path))
+    duration = index[-1][1] if index else 0.0
+    total = sum(length for _, _, length in index)
+    print(f"{path}")
+    print(f"  Session:  {header.get('sid')} ({header.get('client')}, {header.get('format')}), "
+          f"recorded {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(header.get('started_at', 0)))}")
+    print(f"  Frames:   {len(index)} over {duration:.1f}s "
+          f"({len(index) / duration if duration else 0:.1f} FPS)")
+    print(f"  Payload:  {total / (1024 * 1024):.1f} MB ({total / max(1, len(index)) / 1024:.1f} KB/frame)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded YOLOv11x sessions")
+    parser.add_argument("recordings", nargs="+", help=".yrec files")
+    parser.add_argument("--url", default=SERVER_URL)
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Timing multiplier (1 = as recorded, 2 = twice as fast, 0 = no delays)")
+    parser.add_argument("--copies", type=int, default=1, help="Concurrent clients per recording")
+    parser.add_argument("--loops", type=int, default=1, help="Times to play each recording")
+    parser.add_argument("--info", action="store_true", help="Describe the recordings and exit")
+    args = parser.parse_args()
+
+    if args.info:
+        for path in args.recordings:
+            describe(path)
+        return
+
+    clients = [
+        ReplayClient(f"{os.path.basename(path)[:20]}#{copy}", args.url, path, args.speed, args.loops)
+        for path in args.recordings
+        for copy in range(args.copies)
+    ]
+    print(f"Replaying {len(args.recordings)} recording(s) × {args.copies} at "
+          f"{'max speed' if args.speed <= 0 else f'{args.speed:g}x'} against {args.url}\n")
+
+    threads = [threading.Thread(target=c.run, daemon=True) for c in clients]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    for c in clients:
+        print("  " + c.summary())
+    for c in clients:
+        c.sio.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Detection result cache for YOLOv11x backend
+Replies keyed by a hash of the frame bytes as received plus everything that
+affects inference, shared across sessions
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+import config
+
+try:
+    import xxhash
+except ImportError:  # blake2b (hashlib) is used instead
+    xxhash = None
+
+
+def content_hash(payload) -> bytes:
+    """128-bit hash of frame bytes (or base64 text) as received"""
+    if isinstance(payload, str):
+        payload = payload.encode("ascii", "replace")
+    if xxhash is not None:
+        return xxhash.xxh3_128_digest(payload)
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+
+class ResultCache:
+    """
+    LRU cache of full-frame detection results.
+
+    Kiosk and test clients often send byte-identical frames (a static
+    exhibit, a retry after reconnecting); their replies are served without
+    decoding or inference. The key is the content hash plus the inference
+    settings (model versions, size, preset, config version, frame format),
+    so a hot swap or config reload never serves stale results. At most
+    RESULT_CACHE_MAX_ENTRIES entries are kept, least recently used evicted
+    first, and entries expire after RESULT_CACHE_TTL_S.
+
+    All methods are called from the event loop, so no locking is needed.
+    """
+
+    def __init__(self):
+        self.entries: "OrderedDict[Tuple, Tuple[float, Dict, Dict]]" = OrderedDict()  # key -> (expires, reply, names)
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    @staticmethod
+    def key(payload, settings: Tuple[Hashable, ...]) -> Tuple:
+        """
+        Cache key for a frame
+
+        Args:
+            payload: Frame as received ('image' of the frame event)
+            settings: Everything else the result depends on
+
+        Returns:
+            Hashable key
+        """
+        return (content_hash(payload),) + tuple(settings)
+
+    def get(self, key: Tuple) -> Optional[Tuple[Dict, Dict]]:
+        """(reply, class names) cached for a key, or None"""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires, reply, names = entry
+        if time.monotonic() > expires:
+            del self.entries[key]
+            self.expired += 1
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return reply, names
+
+    def put(self, key: Tuple, reply: Dict, names: Dict):
+        """Store a reply (not copied: callers must not mutate it afterwards)"""
+        self.entries[key] = (time.monotonic() + config.RESULT_CACHE_TTL_S, reply, names)
+        self.entries.move_to_end(key)
+        while len(self.entries) > config.RESULT_CACHE_MAX_ENTRIES:
+            self.entries.popitem(last=False)
+            self.evicted += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": config.RESULT_CACHE_ENABLED,
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "hash": "xxh3_128" if xxhash is not None else "blake2b",
+        }
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Region-of-interest inference for YOLOv11x backend
+Runs frames on a padded crop around the session's last detection, at a
+lower inference size, and falls back to the full frame periodically
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import config
+
+
+class RoiPlanner:
+    """
+    Decides per frame whether a session runs on a crop or on the full frame.
+
+    After a confident detection (>= ROI_MIN_CONFIDENCE), the next frames of
+    the session are cropped to the last box grown by ROI_PADDING on every
+    side (at least ROI_MIN_SIZE px) and inferred at ROI_IMAGE_SIZE. Every
+    ROI_FULL_FRAME_INTERVAL frames, and as soon as a crop comes back empty
+    or unconfident, the session goes back to the full frame to re-acquire.
+    Crops covering more than ROI_MAX_AREA of the frame aren't worth it and
+    run full-frame too.
+
+    State per session is one box and a few counters.
+    All methods are called from the event loop, so no locking is needed.
+    """
+
+    def __init__(self):
+        self.sessions: Dict[str, Dict] = {}
+
+    def plan(self, sid: str, frame_shape, image_size: int) -> Tuple[Optional[Tuple[int, int, int, int]], int]:
+        """
+        Pick the region and inference size for a session's next frame
+
+        Args:
+            sid: Socket ID
+            frame_shape: Shape of the decoded frame (height, width, ...)
+            image_size: Inference size the full frame would use
+
+        Returns:
+            ((x1, y1, x2, y2) crop in frame pixels, or None for the full frame; inference size)
+        """
+        if not config.ROI_ENABLED:
+            return None, image_size
+        state = self.sessions.setdefault(sid, {
+            "box": None, "shape": None, "since_full": 0,
+            "roi_frames": 0, "full_frames": 0, "lost": 0,
+        })
+        height, width = frame_shape[:2]
+        box = state["box"]
+        if box is None or state["shape"] != (height, width) or state["since_full"] >= config.ROI_FULL_FRAME_INTERVAL:
+            return self._full(state, (height, width), image_size)
+
+        x1, y1, x2, y2 = box
+        pad_x = max((x2 - x1) * config.ROI_PADDING, (config.ROI_MIN_SIZE - (x2 - x1)) / 2)
+        pad_y = max((y2 - y1) * config.ROI_PADDING, (config.ROI_MIN_SIZE - (y2 - y1)) / 2)
+        crop = (max(0, int(x1 - pad_x)), max(0, int(y1 - pad_y)),
+                min(width, int(x2 + pad_x + 1)), min(height, int(y2 + pad_y + 1)))
+        if (crop[2] - crop[0]) * (crop[3] - crop[1]) > config.ROI_MAX_AREA * width * height:
+            return self._full(state, (height, width), image_size)
+
+        state["since_full"] += 1
+        state["roi_frames"] += 1
+        roi_size = config.ROI_IMAGE_SIZE or min(config.INFERENCE_TIERS)
+        return crop, min(roi_size, image_size)
+
+    def _full(self, state: Dict, shape: Tuple[int, int], image_size: int):
+        state["shape"] = shape
+        state["since_full"] = 0
+        state["full_frames"] += 1
+        return None, image_size
+
+    def update(self, sid: str, detections: List[Dict], crop: Optional[Tuple[int, int, int, int]]):
+        """
+        Remember the best detection of a frame (in full-frame pixels) as the next region
+
+        Args:
+            sid: Socket ID
+            detections: The frame's detections, most confident first
+            crop: The region the frame was inferred on (None = full frame)
+        """
+        state = self.sessions.get(sid)
+        if state is None:
+            return
+        if detections and detections[0]["confidence"] >= config.ROI_MIN_CONFIDENCE:
+            state["box"] = detections[0]["bbox"]
+            return
+        if crop is not None:
+            state["lost"] += 1  # Object left the crop or faded: re-acquire on the full frame
+        state["box"] = None
+
+    @staticmethod
+    def to_frame(detections: List[Dict], crop: Optional[Tuple[int, int, int, int]]) -> List[Dict]:
+        """Shift detections from crop pixels to full-frame pixels (in place)"""
+        if crop is not None:
+            for det in detections:
+                x1, y1, x2, y2 = det["bbox"]
+                det["bbox"] = [x1 + crop[0], y1 + crop[1], x2 + crop[0], y2 + crop[1]]
+        return detections
+
+    def stats(self, sid: str) -> Optional[Dict]:
+        """ROI counters for a session (None before its first frame)"""
+        state = self.sessions.get(sid)
+        if state is None:
+            return None
+        total = state["roi_frames"] + state["full_frames"]
+        return {
+            "roi_frames": state["roi_frames"],
+            "full_frames": state["full_frames"],
+            "roi_rate": round(state["roi_frames"] / total, 3) if total else 0.0,
+            "lost": state["lost"],
+            "tracking": state["box"] is not None,
+        }
+
+    def forget(self, sid: str):
+        """Drop a session's region (on disconnect)"""
+        self.sessions.pop(sid, None)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Runtime configuration for YOLOv11x backend
+Hot-reloads config.py and resolves inference parameters per request
+"""
+
+import asyncio
+import importlib.util
+import os
+from typing import Dict, Optional
+
+import config
+
+# Name used for "no preset" (base parameters plus overrides)
+CUSTOM_PRESET = "CUSTOM"
+
+
+class RuntimeConfig:
+    """
+    Immutable snapshots of the inference settings, swapped atomically.
+
+    Every frame resolves its parameters from the current snapshot with a
+    single attribute read, so a reload can never hand a frame half-old,
+    half-new settings. A reload re-executes config.py into a fresh module
+    first; if that raises, the running configuration is left untouched.
+
+    Admin overrides (default preset, individual YOLO parameters) survive
+    file reloads until reset.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or config.__file__
+        self.preset_override: Optional[str] = None
+        self.param_overrides: Dict = {}
+        self.version = 0
+        self._mtime = self._stat()
+        self.snapshot = self._build()
+
+    # -------------------------------
+    # Per-request lookups
+    # -------------------------------
+    def resolve(self, preset: str = None) -> Dict:
+        """
+        Inference settings for one request
+
+        Args:
+            preset: Preset requested by the session (None = server default)
+
+        Returns:
+            Dictionary with preset name, YOLO params, image size and config version
+        """
+        snapshot = self.snapshot  # One read: consistent even during a reload
+        if preset not in snapshot["params"]:
+            preset = snapshot["default_preset"]
+        return {
+            "preset": preset,
+            "params": snapshot["params"][preset],
+            "image_size": snapshot["image_size"],
+            "version": snapshot["version"],
+        }
+
+    def is_preset(self, name: str) -> bool:
+        """Whether a preset name is known to the current configuration"""
+        return name in self.snapshot["params"]
+
+    def info(self) -> Dict:
+        """Summary of the active configuration"""
+        snapshot = self.snapshot
+        return {
+            "version": snapshot["version"],
+            "default_preset": snapshot["default_preset"],
+            "presets": sorted(snapshot["params"]),
+            "image_size": snapshot["image_size"],
+            "params": snapshot["params"][snapshot["default_preset"]],
+            "overrides": dict(self.param_overrides),
+        }
+
+    # -------------------------------
+    # Reloading
+    # -------------------------------
+    def reload(self, preset: str = None, params: Dict = None, reset: bool = False) -> Dict:
+        """
+        Re-read config.py and swap in a new snapshot
+
+        Args:
+            preset: New default preset (None keeps the current one)
+            params: YOLO parameter overrides to merge in (e.g. {'conf': 0.5})
+            reset: Drop all previous overrides first
+
+        Returns:
+            info() of the new configuration
+
+        Raises:
+            Exception from config.py, or ValueError for an unknown preset;
+            the previous configuration stays active in that case
+        """
+        fresh = self._load_module()
+        presets = getattr(fresh, "PRESETS", {})
+
+        preset_override = None if reset else self.preset_override
+        param_overrides = {} if reset else dict(self.param_overrides)
+        if preset is not None:
+            if preset != CUSTOM_PRESET and preset not in presets:
+                raise ValueError(f"Unknown preset: {preset}")
+            preset_override = preset
+        if params:
+            param_overrides.update(params)
+
+        # One dict.update: other modules reading config.X never see a mix
+        config.__dict__.update(
+            {name: value for name, value in vars(fresh).items() if name.isupper()}
+        )
+        self.preset_override = preset_override
+        self.param_overrides = param_overrides
+        self._mtime = self._stat()
+        self.snapshot = self._build()
+        return self.info()
+
+    async def watch(self):
+        """Poll config.py and reload when it changes (runs on the event loop)"""
+        while True:
+            await asyncio.sleep(config.CONFIG_WATCH_INTERVAL_S)
+            if not config.CONFIG_WATCH_ENABLED:
+                continue
+            mtime = self._stat()
+            if mtime == self._mtime:
+                continue
+            self._mtime = mtime
+            try:
+                info = self.reload()
+                print(f"[CONFIG] 🔄 Reloaded {os.path.basename(self.path)} "
+                      f"(v{info['version']}, preset={info['default_preset']}, imgsz={info['image_size']})")
+            except Exception as e:
+                print(f"[CONFIG] ⚠️ Reload failed, keeping previous config: {e}")
+
+    # -------------------------------
+    # Internals
+    # -------------------------------
+    def _stat(self) -> float:
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return 0.0
+
+    def _load_module(self):
+        spec = importlib.util.spec_from_file_location("_config_reload", self.path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+    def _build(self) -> Dict:
+        base = dict(getattr(config, "BASE_YOLO_PARAMS", config.YOLO_PARAMS))
+        params = {CUSTOM_PRESET: {**base, **self.param_overrides}}
+        for name, preset in config.PRESETS.items():
+            params[name] = {**base, **preset, **self.param_overrides}
+
+        default_preset = self.preset_override or config.ACTIVE_PRESET or CUSTOM_PRESET
+        self.version += 1
+        return {
+            "version": self.version,
+            "default_preset": default_preset,
+            "params": params,
+            "image_size": config.IMAGE_SIZE,
+        }
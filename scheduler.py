@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Fair inference scheduling for YOLOv11x backend
+Deficit round-robin across client sessions in front of the model
+"""
+
+import asyncio
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Set, Tuple
+
+import config
+
+# A queued job. Plain jobs: payload is a callable, batch_key/runner are None.
+# Batchable jobs: runner(list_of_payloads) -> list_of_results, and jobs with
+# equal batch_key may be run together in one call.
+Job = namedtuple("Job", "enqueued payload future batch_key runner")
+
+
+class FairScheduler:
+    """
+    Runs inference jobs with deficit round-robin fairness across sessions.
+
+    Each session has its own FIFO. Sessions with pending frames take turns;
+    on each turn a session earns a quantum equal to its priority class weight
+    (config.SCHEDULER_CLASS_WEIGHTS) and may run one frame per whole unit of
+    accumulated deficit. A 30 FPS client therefore cannot starve a 5 FPS one:
+    it only gets more turns, not longer ones.
+
+    Batchable jobs with the same batch key (e.g. same input size and
+    parameters) are grouped into one call, taking at most the head frame of
+    each waiting session so batching never lets one client jump the queue.
+
+    Jobs run on a dedicated thread pool so the event loop stays responsive.
+    """
+
+    def __init__(self, workers: int = None, class_weights: Dict[str, float] = None):
+        self.workers = workers or config.INFERENCE_WORKERS
+        self._class_weights = class_weights  # None = follow config (hot-reloadable)
+        self.queues: Dict[str, Deque[Job]] = {}
+        self.active: Deque[str] = deque()    # Sessions with pending jobs, in turn order
+        self.active_set: Set[str] = set()    # Same sessions, for O(1) membership tests
+        self.deficit: Dict[str, float] = {}
+        self.weights: Dict[str, float] = {}
+        self.wait_stats: Dict[str, Dict] = {}
+        self.batch_histogram: Dict[int, int] = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="inference"
+        )
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks = []
+
+    @property
+    def class_weights(self) -> Dict[str, float]:
+        return self._class_weights or config.SCHEDULER_CLASS_WEIGHTS
+
+    # -------------------------------
+    # Public API
+    # -------------------------------
+    async def submit(self, sid: str, job: Callable, priority_class: str = "UNKNOWN"):
+        """
+        Queue a job for a session and wait for its result
+
+        Args:
+            sid: Socket ID
+            job: Blocking callable to run on an inference thread
+            priority_class: Client type used to look up the session's weight
+
+        Returns:
+            Whatever the job returns (exceptions are re-raised)
+        """
+        result, _ = await self._enqueue(sid, job, priority_class, None, None)
+        return result
+
+    async def submit_batchable(self, sid: str, payload: Any, batch_key: Hashable,
+                               runner: Callable[[List[Any]], List[Any]],
+                               priority_class: str = "UNKNOWN") -> Tuple[Any, float]:
+        """
+        Queue a job that may share a model call with other sessions' jobs
+
+        Args:
+            sid: Socket ID
+            payload: Job input handed to runner
+            batch_key: Jobs with equal keys can run in the same batch
+            runner: Blocking callable mapping a list of payloads to a list of results
+            priority_class: Client type used to look up the session's weight
+
+        Returns:
+            (this payload's entry from the runner's result list, time this
+            job waited in the queue in ms)
+        """
+        return await self._enqueue(sid, payload, priority_class, batch_key, runner)
+
+    def batch_sizes(self) -> Dict[int, int]:
+        """Histogram of executed batch sizes"""
+        return dict(self.batch_histogram)
+
+    @property
+    def pending(self) -> int:
+        """Total number of jobs waiting for a worker"""
+        return sum(len(q) for q in self.queues.values())
+
+    def stats(self, sid: str) -> Dict:
+        """
+        Wait-time statistics for one session
+
+        Returns:
+            Dictionary with served count, pending count, weight and wait times (ms)
+        """
+        wait = self.wait_stats.get(sid, {"served": 0, "total_wait_ms": 0.0, "max_wait_ms": 0.0, "last_wait_ms": 0.0})
+        served = wait["served"]
+        return {
+            "weight": self.weights.get(sid, 1.0),
+            "pending": len(self.queues.get(sid, ())),
+            "served": served,
+            "avg_wait_ms": round(wait["total_wait_ms"] / served, 2) if served else 0.0,
+            "max_wait_ms": round(wait["max_wait_ms"], 2),
+            "last_wait_ms": round(wait["last_wait_ms"], 2),
+        }
+
+    def forget(self, sid: str):
+        """Drop a disconnected session and cancel its queued jobs"""
+        for job in self.queues.pop(sid, ()):
+            if not job.future.done():
+                job.future.cancel()
+        self.deficit.pop(sid, None)
+        self.weights.pop(sid, None)
+        self.wait_stats.pop(sid, None)
+        # Stale entries in self.active are skipped by _next_job()
+
+    # -------------------------------
+    # Internals
+    # -------------------------------
+    async def _enqueue(self, sid, payload, priority_class, batch_key, runner):
+        self._ensure_started()
+        self.weights[sid] = self.class_weights.get(
+            priority_class, self.class_weights.get("UNKNOWN", 1.0)
+        )
+        future = asyncio.get_running_loop().create_future()
+        queue = self.queues.setdefault(sid, deque())
+        queue.append(Job(time.perf_counter(), payload, future, batch_key, runner))
+        if sid not in self.active_set:
+            self.active.append(sid)
+            self.active_set.add(sid)
+        self._wakeup.set()
+        return await future
+
+    def _ensure_started(self):
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.get_running_loop().create_task(self._worker())
+            for _ in range(self.workers)
+        ]
+
+    def _next_job(self):
+        """Pick the next job by deficit round-robin"""
+        while self.active:
+            sid = self.active[0]
+            queue = self.queues.get(sid)
+            if not queue:
+                self.active.popleft()
+                self.active_set.discard(sid)
+                self.deficit.pop(sid, None)
+                continue
+
+            if self.deficit.get(sid, 0.0) < 1.0:
+                self.deficit[sid] = self.deficit.get(sid, 0.0) + self.weights.get(sid, 1.0)
+                if self.deficit[sid] < 1.0:
+                    # Fractional weight: keep the credit, wait for another turn
+                    self.active.rotate(-1)
+                    continue
+
+            self.deficit[sid] -= 1.0
+            item = queue.popleft()
+            if not queue:
+                self.active.popleft()
+                self.active_set.discard(sid)
+                self.deficit[sid] = 0.0
+            elif self.deficit[sid] < 1.0:
+                self.active.rotate(-1)
+            return sid, item
+        return None
+
+    def _collect_batch(self, first_sid: str, batch_key: Hashable) -> List:
+        """Add the head job of other waiting sessions that share the batch key"""
+        batch = []
+        limit = config.MAX_BATCH_SIZE - 1
+        for sid in list(self.active):
+            if len(batch) >= limit:
+                break
+            if sid == first_sid:
+                continue
+            queue = self.queues.get(sid)
+            if not queue or queue[0].batch_key != batch_key or queue[0].future.cancelled():
+                continue
+            # Charge the ride-along frame to the session's deficit as if it had its turn
+            self.deficit[sid] = self.deficit.get(sid, 0.0) - 1.0
+            batch.append((sid, queue.popleft()))
+            if not queue:
+                self.active.remove(sid)
+                self.active_set.discard(sid)
+                self.deficit[sid] = 0.0
+        return batch
+
+    def _record_wait(self, sid: str, wait_ms: float):
+        wait = self.wait_stats.setdefault(
+            sid, {"served": 0, "total_wait_ms": 0.0, "max_wait_ms": 0.0, "last_wait_ms": 0.0}
+        )
+        wait["served"] += 1
+        wait["total_wait_ms"] += wait_ms
+        wait["max_wait_ms"] = max(wait["max_wait_ms"], wait_ms)
+        wait["last_wait_ms"] = wait_ms
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            picked = self._next_job()
+            if picked is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            sid, job = picked
+            if job.future.cancelled():
+                continue
+
+            batch = [(sid, job)]
+            if job.batch_key is not None and config.MAX_BATCH_SIZE > 1:
+                batch += self._collect_batch(sid, job.batch_key)
+            now = time.perf_counter()
+            waits = [(now - batch_job.enqueued) * 1000 for _, batch_job in batch]
+            for (batch_sid, _), wait_ms in zip(batch, waits):
+                self._record_wait(batch_sid, wait_ms)
+            self.batch_histogram[len(batch)] = self.batch_histogram.get(len(batch), 0) + 1
+
+            try:
+                if job.runner is None:
+                    results = [await loop.run_in_executor(self._executor, job.payload)]
+                else:
+                    payloads = [batch_job.payload for _, batch_job in batch]
+                    results = await loop.run_in_executor(self._executor, job.runner, payloads)
+            except Exception as e:
+                for _, batch_job in batch:
+                    if not batch_job.future.done():
+                        batch_job.future.set_exception(e)
+            else:
+                for (_, batch_job), result, wait_ms in zip(batch, results, waits):
+                    if not batch_job.future.done():
+                        batch_job.future.set_result((result, wait_ms))
@@ -6,12 +6,33 @@ Socket.IO server for real-time object detection
 
 import socketio
 import uvicorn
-from ultralytics import YOLO
 import cv2
 import numpy as np
 import base64
 import asyncio
+import hmac
+import time
 import config  
+from rate_control import RateController
+from flow_control import CreditManager
+from scheduler import FairScheduler
+from inference import extract_detections, infer_batch
+from buffer_pool import get_buffer_pool, buffer_pool_stats
+from runtime_config import RuntimeConfig
+from tiers import TierStats, pick_tier
+from model_registry import ModelRegistry
+from emit_queue import EmitQueue
+from sessions import CLIENT_TYPES, FRAME_FORMATS, STREAM_FORMATS, SessionRegistry
+from recorder import FrameRecorder
+from profiler import SamplingProfiler, StageTimers
+from stream_ingest import StreamIngest, available_stream_formats
+from raw_ws import RawWebSocketEndpoint, capabilities_from_query
+from pipeline import FramePipeline
+from thread_budget import apply_thread_budget, thread_info
+from roi import RoiPlanner
+from smoothing import DetectionSmoother
+from result_cache import ResultCache
+from annotate import AnnotationRenderer, encode_annotated
 
 # Create Socket.IO server
 sio = socketio.AsyncServer(
@@ -19,22 +40,65 @@ sio = socketio.AsyncServer(
     cors_allowed_origins=config.CORS_ORIGINS
 )
 
-# Create ASGI app
-app = socketio.ASGIApp(sio)
-
 # Global variables
-model = None
-client_sockets = {}  # Track client types by socket ID
+model_registry = ModelRegistry()  # Loaded models by name (lazy, LRU-evicted)
+tier_stats = TierStats()  # Latency per inference size
+runtime_config = RuntimeConfig()  # Hot-reloadable inference settings
+background_tasks = []
+rate_controller = RateController()  # Per-client FPS/quality recommendations
+credit_manager = CreditManager()  # Per-client in-flight frame credits
+scheduler = FairScheduler()  # Deficit round-robin across clients in front of the model
+stage_timers = StageTimers()  # Latency per pipeline stage (decode, queue, letterbox, infer, postprocess)
+emit_queue = EmitQueue(sio)  # Per-client outbound queues (slow sockets don't hold the handler)
+recorder = FrameRecorder()  # Opt-in recording of incoming frames for replay.py
+pipeline = FramePipeline()  # Bounded decode → infer → post stages (frames overlap across stages)
+profiler = SamplingProfiler(stage_timers)  # On-demand sampling profiler (admin 'profile' event)
+stream_ingest = StreamIngest()  # Per-session video stream decoders ('stream' events)
+roi_planner = RoiPlanner()  # Per-session region of interest around the last detection
+smoother = DetectionSmoother()  # Per-session temporal filter on the emitted detection
+result_cache = ResultCache()  # Replies for byte-identical frames, shared across sessions
+annotator = AnnotationRenderer()  # Draws detections for sessions that want annotated frames back
+
+# Per-client state (client type, preset, imgsz, model); removing a session
+# also frees everything the components above keep for it
+session_registry = SessionRegistry(on_expire=lambda sid, reason: disconnect_client(sid))
+for component in (rate_controller, credit_manager, scheduler, emit_queue, recorder, stream_ingest, roi_planner,
+                  smoother):
+    session_registry.on_remove(component.forget)
+
+async def on_startup():
+    """Start background tasks once the event loop is running"""
+    background_tasks.append(asyncio.create_task(runtime_config.watch()))
+    background_tasks.append(asyncio.create_task(session_registry.run()))
+
+def disconnect_client(sid):
+    """Close a client's connection, whichever transport it uses"""
+    if raw_ws.owns(sid):
+        return raw_ws.close(sid)
+    return sio.disconnect(sid)
+
+def is_admin(data):
+    """Check the admin token sent with an admin event"""
+    token = (data or {}).get('token') or ''
+    return bool(config.ADMIN_TOKEN) and hmac.compare_digest(str(token), config.ADMIN_TOKEN)
 
 def load_model():
     """Load YOLOv11x model"""
-    global model
+    if config.THREAD_BUDGET_ENABLED:
+        # Before the first inference, while PyTorch's thread pools can still be sized
+        plan = apply_thread_budget()
+        print(f"[THREADS] ✓ {plan['cores']} core(s): torch {plan['torch_intra']} intra-op / "
+              f"{plan['torch_interop']} inter-op per inference worker ({config.INFERENCE_WORKERS}), "
+              f"OpenCV {plan['opencv']}, {config.PIPELINE_DECODE_WORKERS} decode worker(s)")
     try:
         print("Loading YOLOv11x model...")
-        print(f"Model path: {config.MODEL_PATH}")
-        model = YOLO(config.MODEL_PATH)
+        print(f"Model path: {config.MODELS[config.DEFAULT_MODEL]}")
+        entry = model_registry.load(config.DEFAULT_MODEL)
         print(f"✓ Model loaded successfully!")
-        print(f"  Model type: {model.type}")
+        print(f"  Model type: {entry.model.type}")
+        print(f"  Models: {model_registry.names()} (default: {config.DEFAULT_MODEL}, "
+              f"others load on first use)")
+        print(f"  Inference tiers: {config.INFERENCE_TIERS} (auto: {config.AUTO_INFERENCE_TIER})")
         print(f"\nConfiguration:")
         print(f"  Confidence threshold: {config.YOLO_PARAMS['conf']:.0%}")
         print(f"  IoU threshold: {config.YOLO_PARAMS['iou']}")
@@ -46,15 +110,73 @@ def load_model():
         print("Please ensure 'model/best.pt' exists in the model directory")
         return False
 
-@sio.event
-async def connect(sid, environ):
-    """Handle client connection"""
-    global client_sockets
+def open_session(sid, client_type, auth):
+    """
+    Create a connecting client's session (freed on disconnect or idle expiry)
+    and apply the capabilities and model it declared
+    
+    Returns:
+        The session, or None when the registry is full (refuse the connection)
+    """
+    session = session_registry.create(sid, client_type)
+    if session is None:
+        return None
+    recorder.register(sid)
+    for problem in session.apply_capabilities(auth):
+        print(f"[{client_type}] ⚠️ Capabilities: {problem}")
+    if session.format in STREAM_FORMATS and session.format not in available_stream_formats():
+        print(f"[{client_type}] ⚠️ Capabilities: '{session.format}' streams are not supported here "
+              f"(options: {available_stream_formats()}), expecting JPEG frames")
+        session.format = 'jpeg'
+    rate_controller.set_client_fps(sid, session.target_fps)
     
+    requested_model = auth.get('model')
+    if requested_model:
+        if model_registry.is_known(requested_model):
+            session.model = requested_model
+        else:
+            print(f"[{client_type}] ⚠️ Unknown model '{requested_model}', using default")
+    return session
+
+def connection_info(sid, session):
+    """'connection_response' payload: accepted capabilities, models and first rate recommendation"""
+    response = {
+        'status': 'connected',
+        'message': 'Successfully connected to YOLOv11x server',
+        'capabilities': session.capabilities(),
+        'models': {
+            'available': model_registry.names(),
+            'default': config.DEFAULT_MODEL,
+            'selected': session.model or config.DEFAULT_MODEL
+        }
+    }
+    if config.RATE_CONTROL_ENABLED:
+        recommendation = rate_controller.recommend(sid)
+        rate_controller.mark_sent(sid, recommendation)
+        response['rate_control'] = recommendation
+    return response
+
+@sio.event
+async def connect(sid, environ, auth=None):
+    """
+    Handle client connection
+    Clients declare their capabilities once through Socket.IO auth data: {
+        'client': 'FLUTTER' | 'PYTHON',
+        'format': 'jpeg' | 'yuv420' for 'frame' events, 'h264' | 'mjpeg' for 'stream' events,
+        'binary': True to send frame bytes instead of base64,
+        'fps': target send rate,
+        'width', 'height': frame size sent,
+        'model': optional model or cascade name,
+        'annotate': True to get each frame back as a JPEG with detections drawn ('annotated')
+    }
+    """
+    auth = auth if isinstance(auth, dict) else {}
     user_agent = environ.get('HTTP_USER_AGENT', 'Unknown')
     
-    # Detect client type from User-Agent or connection path
-    if 'Python' in user_agent or 'python' in user_agent.lower():
+    # Legacy clients (no declared type): detect from User-Agent or connection path, once
+    if str(auth.get('client', '')).upper() in CLIENT_TYPES:
+        client_type = str(auth['client']).upper()
+    elif 'Python' in user_agent or 'python' in user_agent.lower():
         client_type = "PYTHON"
     elif 'Dart' in user_agent or 'dart' in user_agent.lower() or 'Flutter' in user_agent:
         client_type = "FLUTTER"
@@ -66,192 +188,774 @@ async def connect(sid, environ):
         else:
             client_type = "UNKNOWN"
     
-    # Store client type for this socket
-    client_sockets[sid] = client_type
-    
+    session = open_session(sid, client_type, auth)
+    if session is None:
+        raise socketio.exceptions.ConnectionRefusedError('Server is at capacity, try again later')
     print(f"[{client_type}] Client connected: {sid}")
     print(f"[{client_type}] User-Agent: {user_agent}")
+    print(f"[{client_type}] Capabilities: {session.capabilities()} "
+          f"({'declared' if session.declared else 'legacy client, per-frame format'})")
     
-    await sio.emit('connection_response', {
-        'status': 'connected',
-        'message': 'Successfully connected to YOLOv11x server'
-    }, to=sid)
+    response = connection_info(sid, session)
+    await sio.emit('connection_response', response, to=sid)
 
 @sio.event
 async def disconnect(sid):
     """Handle client disconnection"""
+    session_registry.remove(sid)
     print(f"Client disconnected: {sid}")
 
 @sio.event
-async def frame(sid, data):
+async def select_model(sid, data=None):
     """
-    Handle incoming frame from client
+    Switch this session to another model or cascade (sent as the event's ack)
     Expected data format: {
-        'image': base64_encoded_image_string
+        'model': name from connection_response['models']['available']
     }
     """
+    session = session_registry.get(sid)
+    name = (data or {}).get('model') or config.DEFAULT_MODEL
+    if session is None or not model_registry.is_known(name):
+        return {'status': 'error', 'message': f"Unknown model '{name}'",
+                'available': model_registry.names()}
+    session.model = name
+    print(f"[{sid[:10]}] 🔀 Model selected: {name}")
+    return {'status': 'ok', 'model': name}
+
+async def send_rate_control(sid):
+    """Emit an updated FPS / resolution / JPEG quality recommendation if it changed"""
+    if not config.RATE_CONTROL_ENABLED:
+        return
+    recommendation = rate_controller.recommend(sid)
+    if not rate_controller.should_send(sid, recommendation):
+        return
+    rate_controller.mark_sent(sid, recommendation)
+    print(f"[{sid[:10]}] 🎚️ Rate control: {recommendation['fps']} FPS, "
+          f"{recommendation['max_dim']}px, q{recommendation['jpeg_quality']} ({recommendation['tier']})")
+    await send_to(sid, 'rate_control', recommendation)
+
+async def send_to(sid, event, payload):
+    """Send an event through the session's outbound queue (or inline if disabled)"""
+    if raw_ws.owns(sid):
+        # Always queued: a raw socket send blocks for as long as the client isn't reading
+        emit_queue.send(sid, event, payload, transport=raw_ws.send)
+    elif config.EMIT_QUEUE_ENABLED:
+        emit_queue.send(sid, event, payload)
+    else:
+        await sio.emit(event, payload, to=sid)
+
+def now_ms():
+    """Wall-clock time in ms since the epoch (latency tracing timestamps)"""
+    return round(time.time() * 1000, 2)
+
+async def send_frame_reply(sid, event, payload, frame_id=None, timing=None):
+    """Send a 'detections'/'error' reply, returning the frame's credit with it
+    (and echoing the frame_id the client sent with the frame, if any)
+    
+    timing: The frame's latency tracing timestamps, sent as 'timing' with its
+    'emit' time (the emit queue re-stamps it when the reply actually goes out)
+    """
+    if config.FLOW_CONTROL_ENABLED:
+        payload['credits'] = credit_manager.release(sid)
+    if frame_id is not None:
+        payload['frame_id'] = frame_id
+    if timing is not None:
+        timing['emit'] = now_ms()
+        payload['timing'] = timing
+    await send_to(sid, event, payload)
+
+def run_batch(jobs):
+    """
+    Run one model call for frames that share a model, inference size and preset
+    (called on an inference thread by the scheduler)
+    """
+    size = jobs[0]['image_size']
+    infer_start = now_ms()
+    with pipeline.busy('infer'):
+        outputs = infer_batch(jobs[0]['route'], size, jobs[0]['params'], [job['frame'] for job in jobs], stage_timers)
+    infer_end = now_ms()
+    tier_stats.record(size, outputs[0]['latency_ms'], len(jobs))
+    for output in outputs:
+        output['infer_start'], output['infer_end'] = infer_start, infer_end
+    return outputs
+
+def resolve_settings(sid, session, data):
+    """
+    Inference settings and size for a session's next frame, applying any
+    'preset' / 'imgsz' the client sent with it
+    
+    Returns:
+        (settings from runtime_config.resolve(), inference size)
+    """
+    # Per-session preset: sticky once a client sends 'preset' with a frame
+    requested_preset = data.get('preset')
+    if requested_preset:
+        if runtime_config.is_preset(requested_preset):
+            session.preset = requested_preset
+        else:
+            print(f"[{sid[:10]}] ⚠️ Unknown preset '{requested_preset}', using default")
+    settings = runtime_config.resolve(session.preset)
+    
+    # Per-session inference size: pinned by the client, else picked by the load controller
+    requested_imgsz = data.get('imgsz')
+    if requested_imgsz is not None:
+        if requested_imgsz in config.INFERENCE_TIERS:
+            session.imgsz = requested_imgsz
+        else:
+            print(f"[{sid[:10]}] ⚠️ Unsupported imgsz {requested_imgsz}, options: {config.INFERENCE_TIERS}")
+    image_size = pick_tier(
+        session.imgsz,
+        rate_controller.last_sent.get(sid, {}).get('imgsz'),
+        settings['image_size']
+    )
+    return settings, image_size
+
+def select_detections(output, crop=None):
+    """Post-process stage: detections in frame pixels, reduced to the single most confident one"""
+    with stage_timers.stage('postprocess'):
+        # Extract detections (already filtered by confidence threshold), most confident first;
+        # boxes from a region-of-interest crop are shifted back to the full frame
+        detections = roi_planner.to_frame(extract_detections(output), crop)
+        # 🔹 SINGLE OBJECT MODE: Select only the highest confidence detection
+        return detections[:1], len(detections)  # Keep only the highest confidence detection (slice to ensure single item)
+
+def annotate_frame(session, frame, detections):
+    """
+    Post-process stage: the frame with its detections drawn, as JPEG
+    (bytes for binary sessions, base64 text otherwise)
+    
+    The decoded frame is drawn on in place: nothing reads it after this.
+    """
+    with stage_timers.stage('annotate'):
+        annotator.draw_detections(frame, detections)
+        jpeg = encode_annotated(frame, config.ANNOTATE_JPEG_QUALITY)
+    if jpeg is None or session.binary:
+        return jpeg
+    return base64.b64encode(jpeg).decode('ascii')
+
+def smoothed_reply(sid, reply, names):
+    """Copy of a 'detections' reply with the session's temporal smoothing applied"""
+    # Temporal smoothing of the selected object (box filter, class/confidence hysteresis)
+    reply = dict(reply, detections=smoother.apply(sid, reply['detections'], names))
+    reply['count'] = len(reply['detections'])
+    return reply
+
+async def detect(sid, session, frame, settings, image_size, ticket, cache_key=None):
+    """
+    Run a decoded BGR frame through the session's model and build the 'detections' reply
+    
+    Args:
+        ticket: The frame's FrameTicket; moved into the 'infer' and then the 'post' stage
+        cache_key: Result cache key of the frame as received (full-frame results are stored)
+    
+    Returns:
+        (reply payload, inference latency in ms, model call (start, end) timestamps),
+        or None if the client disconnected meanwhile (the frame is dropped)
+    
+    The session is re-checked after each wait: per-session state written for a
+    session that was already removed would never be freed.
+    """
+    if session_registry.get(sid) is not session:
+        return None
+    client_type = session.client_type
+    # Region of interest: crop around the session's last box at a lower size (a view, no copy)
+    crop, image_size = roi_planner.plan(sid, frame.shape, image_size)
+    if crop is not None:
+        frame = frame[crop[1]:crop[3], crop[0]:crop[2]]
+        print(f"[{sid[:10]}] [{client_type}] 🎯 ROI {crop} at {image_size}px")
+    await ticket.enter('infer')
+    # Pin the session's model(s) so they can't be evicted mid-frame
+    # (loads them on first use)
+    route = await model_registry.acquire(session.model)
     try:
-        if model is None:
-            print(f"[ERROR] Model not loaded!")
-            await sio.emit('error', {
-                'message': 'Model not loaded'
-            }, to=sid)
-            return
-        
-        # Detect client type from stored socket info
-        global client_sockets
-        base64_length = len(data['image'])
-        
-        # Get client type from stored socket info (set during connect event)
-        client_type = client_sockets.get(sid, "UNKNOWN")
-        
-        # If not found, try to identify from base64 size as fallback
-        if client_type == "UNKNOWN":
-            if base64_length < 15000:
-                client_type = "PYTHON"
-            else:
-                client_type = "FLUTTER"
-            client_sockets[sid] = client_type
-            print(f"[CLIENT IDENTIFICATION] ✨ Fallback detection: {sid[:15]}... → {client_type}")
-        
-        import time
-        timestamp = time.strftime('%H:%M:%S')
-        
-        print(f"\n{'='*70}")
-        print(f"[{client_type} REQUEST] Socket ID: {sid}")
-        print(f"[{client_type} REQUEST] Timestamp: {timestamp}")
-        print(f"[{client_type} REQUEST] Base64 length: {base64_length} chars")
-        print(f"{'='*70}")
-        
-        # Decode base64 image
-        image_data = base64.b64decode(data['image'])
-        print(f"[{sid[:10]}] [{client_type}] 📥 Received frame")
-        print(f"[{sid[:10]}] [{client_type}] Base64: {len(data['image'])} chars → Decoded: {len(image_data)} bytes")
-        print(f"[{sid[:10]}] [{client_type}] Preview: {data['image'][:50]}...")
+        if session_registry.get(sid) is not session:
+            return None  # Left while its model loaded; queueing would re-create its scheduler state
+        # Fair scheduler: sessions take turns on the inference workers;
+        # frames with the same model, size and preset may share one batched model call
+        output, wait_ms = await scheduler.submit_batchable(
+            sid,
+            {'frame': frame, 'image_size': image_size, 'params': settings['params'], 'route': route},
+            (route['key'], image_size, settings['preset'], settings['version']),
+            run_batch,
+            client_type
+        )
+    finally:
+        model_registry.release(route)
+    inference_ms = output['latency_ms']
+    stage_timers.record('queue', wait_ms)
+    print(f"[{sid[:10]}] [{client_type}] ✅ Inference completed by '{output['model']}' at {image_size}px "
+          f"({inference_ms:.0f} ms, waited {wait_ms:.0f} ms)")
+    
+    await ticket.enter('post')
+    detections, original_count = await pipeline.run('post', select_detections, output, crop)
+    if session_registry.get(sid) is not session:
+        return None
+    roi_planner.update(sid, detections, crop)
+    if detections:
+        print(f"[{sid[:10]}] [{client_type}] 🔄 Filtered from {original_count} to {len(detections)} object(s)")
+    
+    print(f"\n[{sid[:10]}] [{client_type}] 🎯 Detection Results:")
+    print(f"[{sid[:10]}]    Found: {len(detections)} object(s)")
+    
+    if detections:
+        det = detections[0]
+        print(f"[{sid[:10]}]    🎯 Selected: {det['class_name']} (confidence: {det['confidence']:.1%})")
+        print(f"[{sid[:10]}]    Bounding Box: {det['bbox']}")
+    else:
+        print(f"[{sid[:10]}]    ❌ NO OBJECTS DETECTED!")
+    
+    # Only one object is sent back
+    reply = {
+        'detections': detections,
+        'count': len(detections),
+        'transform': output['transform'],  # Letterbox applied by the server (boxes are already in frame pixels)
+        'roi': list(crop) if crop else None,  # Region inferred [x1, y1, x2, y2] (None = full frame); transform is relative to it
+        'preset': settings['preset'],
+        'imgsz': image_size,
+        'model': output['model'],
+        'model_version': output['model_version'],
+        'config_version': settings['version']
+    }
+    if cache_key is not None and crop is None:
+        result_cache.put(cache_key, reply, output['names'])  # Unsmoothed: other sessions have their own state
+    return smoothed_reply(sid, reply, output['names']), inference_ms, (output['infer_start'], output['infer_end'])
+
+def record_frame(sid, session, data, format_type, image_data):
+    """Opt-in recording: the frame as received plus what's needed to replay it"""
+    recorder.record(sid, image_data, {
+        'format': format_type,
+        'width': data.get('width', session.width),
+        'height': data.get('height', session.height),
+        **{key: data[key] for key in ('imgsz', 'preset', 'force_rgb') if key in data}
+    }, header=session.capabilities())
+
+def decode_frame(sid, session, data, format_type, leased):
+    """
+    Decode stage: turn a received frame into a BGR array (on a decode thread,
+    or on the event loop when PIPELINE_DECODE_WORKERS is 0)
+    
+    Args:
+        sid: Socket ID
+        session: The client's session
+        data: 'frame' event data
+        format_type: 'jpeg' or 'yuv420'
+        leased: Pooled buffers used for the frame are appended as (pool, buffer)
+    
+    Returns:
+        (BGR frame or None, frame bytes as received, error message or None)
+    """
+    client_type = session.client_type
+    pool = get_buffer_pool()
+    frame = None
+    decode_error = None
+    with stage_timers.stage('decode'):
+        # Binary clients send the encoded frame as bytes (no base64 round trip)
+        if session.binary:
+            image_data = data['image']
+            print(f"[{sid[:10]}] [{client_type}] 📥 Received frame ({len(image_data)} bytes, binary)")
+        else:
+            image_data = base64.b64decode(data['image'])
+            print(f"[{sid[:10]}] [{client_type}] 📥 Received frame")
+            print(f"[{sid[:10]}] [{client_type}] Base64: {len(data['image'])} chars → Decoded: {len(image_data)} bytes")
+            print(f"[{sid[:10]}] [{client_type}] Preview: {data['image'][:50]}...")
         
-        # 🔹 Detect format: YUV420 (raw) or JPEG  
         # Note: YUV420 raw is 3x larger than JPEG - not recommended for production
         # Keeping support for both formats for flexibility
-        format_type = data.get('format', 'jpeg')  # Default to JPEG (recommended)
-        
         if format_type == 'yuv420':
             # YUV420 raw format received
             print(f"[{client_type} FRAME] Format: YUV420 (raw)")
-            width = data.get('width')
-            height = data.get('height')
+            width = data.get('width', session.width)
+            height = data.get('height', session.height)
             
             if width is None or height is None:
                 print(f"[FRAME] ERROR: YUV420 requires width and height parameters")
-                await sio.emit('error', {
-                    'message': 'YUV420 format requires width and height parameters'
-                }, to=sid)
-                return
-            
-            # Decode YUV420 to BGR
-            yuv_frame = image_data
-            frame = cv2.cvtColor(yuv_frame.reshape((height, width)), cv2.COLOR_YUV420p2BGR)
-            # Reshape if needed for YUV420 planes
-            
-            print(f"[{client_type} FRAME] ✓ Decoded YUV420 to BGR")
+                decode_error = 'YUV420 format requires width and height parameters'
+            else:
+                # Decode YUV420 (I420 planes: H rows of Y + H/2 rows of U/V) to BGR
+                # straight into a pooled buffer
+                yuv_frame = np.frombuffer(image_data, np.uint8).reshape((height * 3 // 2, width))
+                frame = pool.acquire((height, width, 3))
+                leased.append((pool, frame))
+                cv2.cvtColor(yuv_frame, cv2.COLOR_YUV420p2BGR, dst=frame)
+                
+                print(f"[{client_type} FRAME] ✓ Decoded YUV420 to BGR")
         else:
             # JPEG format (default)
             print(f"[{client_type} FRAME] Format: JPEG")
-            nparr = np.frombuffer(image_data, np.uint8)
+            nparr = np.frombuffer(image_data, np.uint8)  # Zero-copy view
+            # Note: cv2.imdecode has no dst= in the Python bindings, so its
+            # output is the one per-frame allocation left on this path
             frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
             
             if frame is None:
                 print(f"[FRAME] ERROR: Failed to decode image!")
                 print(f"[FRAME] First 50 bytes: {image_data[:50]}")
                 print(f"[FRAME] Is JPEG header? {image_data[:3] == b'\\xff\\xd8\\xff'}")
-                await sio.emit('error', {
-                    'message': 'Failed to decode image'
-                }, to=sid)
-                return
-            
-            # 🔹 BACKEND CONVERSION OPTION (Python-powered!)
-            # Both clients send BGR, but if needed we can force conversion
-            # For debugging: check if colors look wrong and manually convert
-            needs_conversion = data.get('force_rgb', False)  # Optional flag from client
-            
-            if needs_conversion and client_type == "FLUTTER":
-                # Force Python conversion: RGB→BGR
-                frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-                print(f"[{client_type} FRAME] 🔄 Python converted RGB→BGR")
+                decode_error = 'Failed to decode image'
             else:
-                # Both clients now send BGR directly
-                print(f"[{client_type} FRAME] ✓ Already in BGR format (ready for YOLO)")
+                # 🔹 BACKEND CONVERSION OPTION (Python-powered!)
+                # Both clients send BGR, but if needed we can force conversion
+                # For debugging: check if colors look wrong and manually convert
+                needs_conversion = data.get('force_rgb', False)  # Optional flag from client
+                
+                if needs_conversion and client_type == "FLUTTER":
+                    # Force Python conversion: RGB→BGR (in place, no new array)
+                    cv2.cvtColor(frame, cv2.COLOR_RGB2BGR, dst=frame)
+                    print(f"[{client_type} FRAME] 🔄 Python converted RGB→BGR")
+                else:
+                    # Both clients now send BGR directly
+                    print(f"[{client_type} FRAME] ✓ Already in BGR format (ready for YOLO)")
+        
+        if frame is not None:
+            # ============================================================
+            # ORIENTATION: Keep native portrait (no rotation)
+            # ============================================================
+            height, width = frame.shape[:2]
+            orientation = "portrait" if height > width else "landscape"
+            print(f"[{client_type} ORIENTATION] 📸 Input frame: {width}×{height} ({orientation})")
+            print(f"[{client_type} ORIENTATION] ✅ Using native orientation (no rotation)")
+            
+            print(f"\n[{sid[:10]}] [{client_type}] 📊 Frame processed:")
+            print(f"[{sid[:10]}]    Shape: {frame.shape}")
+            print(f"[{sid[:10]}]    Dtype: {frame.dtype}")
+            print(f"[{sid[:10]}]    Pixel range: min={frame.min()}, max={frame.max()}")
+            print(f"[{sid[:10]}]    Mean brightness: {frame.mean():.1f}")
+    return frame, image_data, decode_error
+
+@sio.event
+async def frame(sid, data):
+    """
+    Handle incoming frame from client
+    Expected data format: {
+        'image': base64_encoded_image_string,
+        'frame_id': optional, echoed in the reply,
+        'capture_ts': optional client capture time (ms since the epoch), echoed in 'timing'
+    }
+    With LATENCY_TRACING_ENABLED, replies carry 'timing': server timestamps
+    (ms since the epoch) for received, decoded, infer_start, infer_end and emit
+    """
+    # Latency tracing: stamped as the frame moves through the server
+    # (not for raw WebSocket sessions: binary replies have no field for it)
+    timing = ({'received': now_ms(), 'capture_ts': data.get('capture_ts')}
+              if config.LATENCY_TRACING_ENABLED and not raw_ws.owns(sid) else None)
+    session = session_registry.touch(sid)
+    if session is None:
+        return  # Expired; the client is being disconnected
+    frame_id = data.get('frame_id')  # Optional, echoed in the reply
+    
+    # Flow control: drop frames beyond the session's credit window before any decoding
+    if config.FLOW_CONTROL_ENABLED and not credit_manager.acquire(sid):
+        if config.FLOW_CONTROL_NOTIFY_DROPS:
+            await send_to(sid, 'error', {
+                'message': 'Frame dropped: no credits available',
+                'code': 'no_credits',
+                'credits': 0,
+                'frame_id': frame_id
+            })
+        return
+    
+    inference_ms = None
+    leased = []  # (pool, buffer) pairs holding this frame, returned once inference is done
+    rate_controller.frame_started()
+    try:
+        if not model_registry.ready:
+            print(f"[ERROR] Model not loaded!")
+            await send_frame_reply(sid, 'error', {
+                'message': 'Model not loaded'
+            }, frame_id)
+            return
         
-        # ============================================================
-        # ORIENTATION: Keep native portrait (no rotation)
-        # ============================================================
-        height, width = frame.shape[:2]
-        orientation = "portrait" if height > width else "landscape"
-        print(f"[{client_type} ORIENTATION] 📸 Input frame: {width}×{height} ({orientation})")
-        print(f"[{client_type} ORIENTATION] ✅ Using native orientation (no rotation)")
+        payload_length = len(data['image'])
+        session.frames += 1
         
-        # Run YOLO inference with configured parameters
-        print(f"\n[{sid[:10]}] [{client_type}] 📊 Frame processed:")
-        print(f"[{sid[:10]}]    Shape: {frame.shape}")
-        print(f"[{sid[:10]}]    Dtype: {frame.dtype}")
-        print(f"[{sid[:10]}]    Pixel range: min={frame.min()}, max={frame.max()}")
-        print(f"[{sid[:10]}]    Mean brightness: {frame.mean():.1f}")
+        # Client type and capabilities were settled at connect: no per-frame identification
+        client_type = session.client_type
         
-        print(f"\n[{sid[:10]}] [{client_type}] 🔍 Running YOLO inference...")
-        results = model(frame, **config.YOLO_PARAMS)
-        print(f"[{sid[:10]}] [{client_type}] ✅ Inference completed")
+        settings, image_size = resolve_settings(sid, session, data)
         
-        # Extract detections (already filtered by confidence threshold)
-        detections = []
-        for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                detection = {
-                    'bbox': box.xyxy[0].tolist(),  # [x1, y1, x2, y2]
-                    'confidence': float(box.conf[0]),
-                    'class_id': int(box.cls[0]),
-                    'class_name': model.names[int(box.cls[0])]
-                }
-                detections.append(detection)
+        timestamp = time.strftime('%H:%M:%S')
         
-        # 🔹 SINGLE OBJECT MODE: Select only the highest confidence detection
-        original_count = len(detections)
-        if detections:
-            # Sort by confidence (highest first) and take only the first one
-            detections = sorted(detections, key=lambda x: x['confidence'], reverse=True)
-            detections = detections[:1]  # Keep only the highest confidence detection (slice to ensure single item)
-            print(f"[{sid[:10]}] [{client_type}] 🔄 Filtered from {original_count} to {len(detections)} object(s)")
+        print(f"\n{'='*70}")
+        print(f"[{client_type} REQUEST] Socket ID: {sid}")
+        print(f"[{client_type} REQUEST] Timestamp: {timestamp}")
+        print(f"[{client_type} REQUEST] Payload length: {payload_length} {'bytes' if session.binary else 'chars'}")
+        print(f"{'='*70}")
         
-        print(f"\n[{sid[:10]}] [{client_type}] 🎯 Detection Results:")
-        print(f"[{sid[:10]}]    Found: {len(detections)} object(s)")
+        # 🔹 Format: YUV420 (raw) or JPEG, declared at connect (legacy clients send it per frame)
+        format_type = session.format if session.declared and session.format in FRAME_FORMATS else data.get('format', 'jpeg')
+        annotating = session.annotate and config.ANNOTATE_ENABLED
         
-        if detections:
-            det = detections[0]
-            print(f"[{sid[:10]}]    🎯 Selected: {det['class_name']} (confidence: {det['confidence']:.1%})")
-            print(f"[{sid[:10]}]    Bounding Box: {det['bbox']}")
-        else:
-            print(f"[{sid[:10]}]    ❌ NO OBJECTS DETECTED!")
+        # Result cache: byte-identical frames (kiosks, retries) are answered before any decoding
+        # (not for annotated replies, which need the decoded pixels; their results are still stored)
+        cache_key = None
+        if config.RESULT_CACHE_ENABLED:
+            cache_key = result_cache.key(data['image'], (
+                model_registry.route_key(session.model), image_size, settings['preset'], settings['version'],
+                format_type, data.get('width', session.width), data.get('height', session.height),
+                bool(data.get('force_rgb')) and client_type == "FLUTTER"
+            ))
+            cached = None if annotating else result_cache.get(cache_key)
+            if cached is not None:
+                if recorder.enabled(sid):
+                    record_frame(sid, session, data, format_type,
+                                 data['image'] if session.binary else base64.b64decode(data['image']))
+                reply, names = cached
+                roi_planner.update(sid, reply['detections'], None)
+                print(f"[{sid[:10]}] [{client_type}] ⚡ Result cache hit, no decoding or inference")
+                await send_frame_reply(sid, 'detections', dict(smoothed_reply(sid, reply, names), cached=True),
+                                       frame_id, timing)
+                return
         
-        print(f"[{sid[:10]}] [{client_type}] 📤 Sending response to client...")
+        # Pipeline: decode → infer → post-process, each stage bounded, so this
+        # frame decodes on a decode thread while earlier frames are still inferring
+        async with pipeline.ticket() as ticket:
+            await ticket.enter('decode')
+            frame, image_data, decode_error = await pipeline.run('decode', decode_frame, sid, session, data, format_type, leased)
+            if timing is not None:
+                timing['decoded'] = now_ms()
+            
+            if recorder.enabled(sid):
+                record_frame(sid, session, data, format_type, image_data)
+            
+            if not decode_error:
+                print(f"\n[{sid[:10]}] [{client_type}] 🔍 Queueing YOLO inference...")
+                
+                detected = await detect(sid, session, frame, settings, image_size, ticket, cache_key)
+                if detected is None:
+                    return  # Client left; nobody to reply to
+                reply, inference_ms, (infer_start, infer_end) = detected
+                if timing is not None:
+                    timing['infer_start'], timing['infer_end'] = infer_start, infer_end
+                if annotating:
+                    reply['annotated'] = await pipeline.run('post', annotate_frame, session, frame,
+                                                            reply['detections'])
+        
+        # Replies go out after the ticket is released, so a slow client never holds a stage slot
+        if decode_error:
+            await send_frame_reply(sid, 'error', {
+                'message': decode_error
+            }, frame_id)
+            return
         
-        # Send detections back to client (only one object)
-        await sio.emit('detections', {
-            'detections': detections,
-            'count': len(detections)
-        }, to=sid)
+        print(f"[{sid[:10]}] [{client_type}] 📤 Sending response to client...")
+        await send_frame_reply(sid, 'detections', reply, frame_id, timing)
         
         print(f"[{sid[:10]}] [{client_type}] ✅ Response sent successfully")
         print(f"{'='*70}\n")
         
     except Exception as e:
         print(f"Error processing frame: {e}")
-        await sio.emit('error', {
+        await send_frame_reply(sid, 'error', {
             'message': f'Error processing frame: {str(e)}'
-        }, to=sid)
+        }, frame_id)
+    finally:
+        for pool, buffer in leased:
+            pool.release(buffer)
+        rate_controller.frame_finished(sid, inference_ms)
+    
+    if inference_ms is not None:
+        await send_rate_control(sid)
+
+@sio.event
+async def stream(sid, data):
+    """
+    Handle a chunk of an encoded video stream (sessions that declared format 'h264' or 'mjpeg')
+    Expected data format: {
+        'chunk': any slice of the stream (bytes, or base64 text),
+        'preset', 'imgsz': optional, as for 'frame'
+    }
+    Detections for the newest decoded frame come back as 'detections' events
+    with 'stream_frame' set to that frame's number in the stream
+    """
+    session = session_registry.touch(sid)
+    if session is None:
+        return  # Expired; the client is being disconnected
+    if session.format not in STREAM_FORMATS:
+        await send_to(sid, 'error', {
+            'message': f"Declare format {' or '.join(available_stream_formats())} at connect to stream video",
+            'code': 'not_streaming'
+        })
+        return
+    
+    data = data if isinstance(data, dict) else {'chunk': data}
+    chunk = data.get('chunk') or b''
+    if isinstance(chunk, str):
+        chunk = base64.b64decode(chunk)
+    if data.get('preset') or data.get('imgsz') is not None:
+        resolve_settings(sid, session, data)  # Sticky per-session choices, as with 'frame'
+    try:
+        # Decoded on the pipeline's decode threads, so other sessions' frames
+        # and emits keep flowing while a chunk decodes
+        await stream_ingest.feed(sid, session.format, chunk, run_stream,
+                                 run=lambda decode, chunk: pipeline.run('decode', decode_stream_chunk, decode, chunk))
+    except Exception as e:
+        print(f"[{sid[:10]}] ⚠️ Stream decode failed: {e}")
+        await send_to(sid, 'error', {
+            'message': f'Stream decode failed: {str(e)}',
+            'code': 'stream_decode'
+        })
+
+def decode_stream_chunk(decode, chunk):
+    """Decode stage (on a decode thread): a stream decoder's feed() for one chunk"""
+    with stage_timers.stage('decode'):
+        return decode(chunk)
+
+async def run_stream(sid):
+    """Worker for a streaming session: run inference on its newest frame until none is waiting"""
+    while True:
+        item = stream_ingest.take(sid)
+        session = session_registry.get(sid)
+        if item is None or session is None:
+            return
+        number, frame = item
+        if not model_registry.ready:
+            await send_to(sid, 'error', {'message': 'Model not loaded'})
+            continue
+        
+        session.frames += 1
+        inference_ms = None
+        rate_controller.frame_started()
+        try:
+            settings, image_size = resolve_settings(sid, session, {})
+            async with pipeline.ticket() as ticket:  # Already decoded: enters at the infer stage
+                detected = await detect(sid, session, frame, settings, image_size, ticket)
+            if detected is None:
+                return
+            reply, inference_ms, _ = detected
+            reply['stream_frame'] = number
+            await send_to(sid, 'detections', reply)
+        except Exception as e:
+            print(f"Error processing stream frame: {e}")
+            await send_to(sid, 'error', {
+                'message': f'Error processing stream frame: {str(e)}'
+            })
+        finally:
+            rate_controller.frame_finished(sid, inference_ms)
+        
+        if inference_ms is not None:
+            await send_rate_control(sid)
+
+# ============================================================
+# RAW WEBSOCKET TRANSPORT (see raw_ws.py)
+# ============================================================
+async def raw_connect(sid, params):
+    """A raw WebSocket client connected; query parameters carry its capabilities"""
+    client_type = str(params.get('client', '')).upper()
+    client_type = client_type if client_type in CLIENT_TYPES else "UNKNOWN"
+    auth, problems = capabilities_from_query(params)
+    for problem in problems:
+        print(f"[{client_type}] ⚠️ Capabilities: {problem}")
+    session = open_session(sid, client_type, auth)
+    if session is None:
+        await raw_ws.close(sid, code=1013)  # Try again later: server at capacity
+        return
+    try:
+        resolve_settings(sid, session, {
+            'preset': params.get('preset'),
+            'imgsz': int(params['imgsz']) if params.get('imgsz') else None
+        })
+    except ValueError:
+        print(f"[{sid[:10]}] ⚠️ Unsupported imgsz {params.get('imgsz')}")
+    print(f"[{client_type}] Raw WebSocket client connected: {sid}")
+    print(f"[{client_type}] Capabilities: {session.capabilities()}")
+    
+    response = connection_info(sid, session)
+    if problems:
+        response['rejected'] = problems
+    # Replies carry class ids only; names are sent once here
+    try:
+        route = await model_registry.acquire(session.model)
+        model_registry.release(route)
+        response['names'] = route['entries'][0].model.names
+    except Exception as e:
+        print(f"[{sid[:10]}] ⚠️ Could not load model for class names: {e}")
+    await raw_ws.send(sid, 'connection_response', response)
+
+async def raw_frame(sid, frame_id, payload):
+    """One binary message: a frame, or a chunk of the session's video stream"""
+    session = session_registry.get(sid)
+    if session is None:
+        return
+    if session.format in STREAM_FORMATS:
+        await stream(sid, {'chunk': payload})
+    else:
+        await frame(sid, {'image': payload, 'frame_id': frame_id})
+
+def raw_disconnect(sid):
+    session_registry.remove(sid)
+    print(f"Raw WebSocket client disconnected: {sid}")
+
+raw_ws = RawWebSocketEndpoint(raw_connect, raw_frame, raw_disconnect)
+
+# Create ASGI app (Socket.IO, plus the raw WebSocket route for other paths)
+app = socketio.ASGIApp(
+    sio,
+    other_asgi_app=raw_ws if config.RAW_WS_ENABLED else None,
+    on_startup=on_startup
+)
+
+@sio.event
+async def stats(sid, data=None):
+    """
+    Return per-session serving statistics (sent as the event's ack)
+    
+    Expected data format (optional):
+    {
+        'all': optional, every session's statistics (admin only)
+        'token': admin token, required with 'all'
+    }
+    """
+    data = data or {}
+    if data.get('all') and not is_admin(data):
+        return {'status': 'error', 'message': 'Not authorized'}
+    sessions = list(session_registry.sessions.values()) if data.get('all') else [session_registry.get(sid)]
+    return {
+        'sessions': {
+            s.sid: {
+                'client_type': s.client_type,
+                'transport': 'raw_ws' if raw_ws.owns(s.sid) else 'socketio',
+                'frames': s.frames,
+                'credits': credit_manager.stats(s.sid),
+                'scheduler': scheduler.stats(s.sid),
+                'emit': emit_queue.stats(s.sid),
+                'stream': stream_ingest.stats(s.sid),
+                'roi': roi_planner.stats(s.sid),
+                'preset': runtime_config.resolve(s.preset)['preset'],
+                'imgsz': s.imgsz or ('auto' if config.AUTO_INFERENCE_TIER else config.IMAGE_SIZE),
+                'model': s.model or config.DEFAULT_MODEL,
+            }
+            for s in sessions if s is not None
+        },
+        'registry': session_registry.stats(),
+        'models': model_registry.stats(),
+        'tiers': tier_stats.stats(),
+        'batch_sizes': scheduler.batch_sizes(),
+        'buffer_pool': buffer_pool_stats(),
+        'recorder': recorder.stats(),
+        'raw_ws': raw_ws.stats(),
+        'cpu_s': round(time.process_time(), 3),
+        'stages': stage_timers.stats(),
+        'pipeline': pipeline.stats(),
+        'smoothing': smoother.stats(),
+        'result_cache': result_cache.stats(),
+        'annotate': annotator.stats(),
+        'threads': thread_info(),
+        'config': runtime_config.info(),
+    }
+
+@sio.event
+async def reload_config(sid, data=None):
+    """
+    Admin: reload config.py and/or change inference settings live
+    Expected data format: {
+        'token': admin_token,
+        'preset': optional new default preset,
+        'params': optional YOLO parameter overrides, e.g. {'conf': 0.5},
+        'reset': optional, drop earlier overrides
+    }
+    """
+    data = data or {}
+    if not is_admin(data):
+        return {'status': 'error', 'message': 'Not authorized'}
+    try:
+        info = runtime_config.reload(
+            preset=data.get('preset'),
+            params=data.get('params'),
+            reset=bool(data.get('reset'))
+        )
+    except Exception as e:
+        print(f"[CONFIG] ⚠️ Reload requested by {sid[:10]} failed: {e}")
+        return {'status': 'error', 'message': str(e)}
+    print(f"[CONFIG] 🔄 Reloaded by {sid[:10]} (v{info['version']}, preset={info['default_preset']}, imgsz={info['image_size']})")
+    return {'status': 'ok', 'config': info}
+
+@sio.event
+async def swap_model(sid, data=None):
+    """
+    Admin: load new weights for a model in the background and switch to them
+    without disconnecting anyone (frames already queued finish on the old weights)
+    Expected data format: {
+        'token': admin_token,
+        'path': new weights file,
+        'model': optional model name (default: DEFAULT_MODEL),
+        'version': optional version label reported in detections
+    }
+    """
+    data = data or {}
+    if not is_admin(data):
+        return {'status': 'error', 'message': 'Not authorized'}
+    name = data.get('model') or config.DEFAULT_MODEL
+    if name not in config.MODELS:
+        return {'status': 'error', 'message': f"Unknown model '{name}'", 'available': list(config.MODELS)}
+    if not data.get('path'):
+        return {'status': 'error', 'message': 'path is required'}
+    print(f"[MODELS] ⏳ Swap of '{name}' to {data['path']} requested by {sid[:10]}")
+    try:
+        swap = await model_registry.swap_async(name, data['path'], data.get('version'))
+    except Exception as e:
+        print(f"[MODELS] ⚠️ Swap of '{name}' failed, still serving previous weights: {e}")
+        return {'status': 'error', 'message': str(e)}
+    return {'status': 'ok', 'swap': swap}
+
+@sio.event
+async def record(sid, data=None):
+    """
+    Admin: turn frame recording on or off
+    Expected data format: {
+        'token': admin_token,
+        'enable': True / False,
+        'sid': optional session to record (default: all sessions)
+    }
+    """
+    data = data or {}
+    if not is_admin(data):
+        return {'status': 'error', 'message': 'Not authorized'}
+    target = data.get('sid')
+    if target is not None and session_registry.get(target) is None:
+        return {'status': 'error', 'message': f"Unknown session '{target}'"}
+    recorder.enable(bool(data.get('enable', True)), target)
+    print(f"[RECORDER] {'⏺️ On' if data.get('enable', True) else '⏹️ Off'} for "
+          f"{target[:10] if target else 'all sessions'} (requested by {sid[:10]})")
+    return {'status': 'ok', 'recorder': recorder.stats()}
+
+@sio.event
+async def profile(sid, data=None):
+    """
+    Admin: sample the whole process for a few seconds and write a flamegraph profile
+    Expected data format: {
+        'token': admin_token,
+        'seconds': optional duration (default 10, at most PROFILE_MAX_SECONDS),
+        'interval_ms': optional sampling interval (default PROFILE_INTERVAL_MS),
+        'wait': optional, False to return immediately instead of when done
+    }
+    """
+    data = data or {}
+    if not is_admin(data):
+        return {'status': 'error', 'message': 'Not authorized'}
+    try:
+        seconds = min(float(data.get('seconds', 10)), config.PROFILE_MAX_SECONDS)
+        interval_ms = float(data['interval_ms']) if data.get('interval_ms') else None
+    except (TypeError, ValueError):
+        return {'status': 'error', 'message': 'seconds / interval_ms must be numbers'}
+    if not profiler.start(seconds, interval_ms):
+        return {'status': 'error', 'message': 'A profile is already running', 'profile': profiler.summary()}
+    print(f"[PROFILER] 🔥 Sampling for {seconds:g}s (requested by {sid[:10]})")
+    if not data.get('wait', True):
+        return {'status': 'ok', 'profile': profiler.summary()}
+    while profiler.running:
+        await asyncio.sleep(0.1)
+    return {'status': 'ok', 'profile': profiler.summary(), 'stages': stage_timers.stats()}
 
 @sio.event
 async def ping(sid, data):
-    """Handle ping requests for connection testing"""
-    await sio.emit('pong', {'timestamp': data.get('timestamp')}, to=sid)
+    """
+    Handle ping requests for connection testing
+    The pong (also returned as the ack) carries the server's clock, so clients
+    can estimate their clock offset for one-way latencies
+    """
+    pong = {'timestamp': data.get('timestamp'), 'server_time': now_ms()}
+    await sio.emit('pong', pong, to=sid)
+    return pong
 
 def main():
     """Main function to start the server"""
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Session registry for YOLOv11x backend
+Per-client state created on connect, freed on disconnect, with idle expiry and hard caps
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+import config
+
+
+CLIENT_TYPES = ("FLUTTER", "PYTHON")
+FRAME_FORMATS = ("jpeg", "yuv420")   # One image per 'frame' event
+STREAM_FORMATS = ("h264", "mjpeg")   # Encoded video in 'stream' chunks (see stream_ingest.py)
+TRUE_FLAGS = ("1", "true", "yes", "on")
+FALSE_FLAGS = ("0", "false", "no", "off", "")
+
+
+def parse_flag(value: Any) -> Optional[bool]:
+    """
+    A capability flag from Socket.IO auth data (bool / number) or a query
+    string ('1' / 'true' / 'yes' / 'on', '0' / 'false' / 'no' / 'off')
+
+    Returns:
+        The flag, or None if the value is neither
+    """
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return bool(value)
+    text = str(value).strip().lower()
+    if text in TRUE_FLAGS:
+        return True
+    if text in FALSE_FLAGS:
+        return False
+    return None
+
+
+class Session:
+    """State kept for one connected client"""
+
+    _serials = itertools.count()
+
+    def __init__(self, sid: str, client_type: str = "UNKNOWN"):
+        self.sid = sid
+        self.serial = next(self._serials)  # Tells heap entries of a reconnected sid apart
+        self.client_type = client_type
+        self.created_at = time.monotonic()
+        self.last_seen = self.created_at
+        self.preset: Optional[str] = None  # Sticky preset chosen via frame data
+        self.imgsz: Optional[int] = None   # Inference size pinned via frame data
+        self.model: Optional[str] = None   # Model or cascade chosen at connect / select_model
+        self.frames = 0
+        # Capabilities declared once in the Socket.IO auth payload (see apply_capabilities)
+        self.declared = False
+        self.format = "jpeg"      # Frame encoding: jpeg / yuv420, or h264 / mjpeg for streams
+        self.binary = False       # Frames arrive as raw bytes instead of base64 text
+        self.target_fps: Optional[float] = None
+        self.width: Optional[int] = None   # Frame size the client sends
+        self.height: Optional[int] = None
+        self.annotate = False     # Replies carry the frame as a JPEG with detections drawn on it
+        self.tracker: "OrderedDict[str, float]" = OrderedDict()  # object id -> last seen (oldest first)
+
+    def apply_capabilities(self, auth: Dict[str, Any]) -> List[str]:
+        """
+        Store the capabilities a client declared at connect
+
+        Args:
+            auth: Socket.IO auth data, e.g. {'client': 'FLUTTER', 'format': 'jpeg',
+                  'binary': True, 'fps': 15, 'width': 720, 'height': 1280,
+                  'annotate': False}
+
+        Returns:
+            Problems found (invalid values are ignored and defaults kept)
+        """
+        problems = []
+        client = str(auth.get("client", "")).upper()
+        if client in CLIENT_TYPES:
+            self.client_type = client
+            self.declared = True
+        elif client:
+            problems.append(f"unknown client '{auth['client']}'")
+
+        frame_format = auth.get("format")
+        if frame_format in FRAME_FORMATS + STREAM_FORMATS:
+            self.format = frame_format
+            self.declared = True
+        elif frame_format is not None:
+            problems.append(f"unsupported format '{frame_format}'")
+
+        if "binary" in auth:
+            binary = parse_flag(auth["binary"])
+            if binary is None:
+                problems.append(f"binary must be true or false, not '{auth['binary']}'")
+            else:
+                self.binary = binary
+                self.declared = True
+
+        if "annotate" in auth:
+            annotate = parse_flag(auth["annotate"])
+            if annotate is None:
+                problems.append(f"annotate must be true or false, not '{auth['annotate']}'")
+            self.annotate = bool(annotate)
+            if self.annotate and self.format in STREAM_FORMATS:
+                problems.append("annotated replies are only available for 'frame' events")
+                self.annotate = False
+
+        try:
+            if auth.get("fps") is not None:
+                self.target_fps = max(0.1, float(auth["fps"]))
+            if auth.get("width") is not None and auth.get("height") is not None:
+                self.width, self.height = int(auth["width"]), int(auth["height"])
+        except (TypeError, ValueError):
+            problems.append("fps / width / height must be numbers")
+
+        if self.format == "yuv420" and self.width is None:
+            problems.append("yuv420 needs width and height (falling back to per-frame values)")
+        return problems
+
+    def capabilities(self) -> Dict:
+        """Capabilities in effect for this session"""
+        return {
+            "client": self.client_type,
+            "format": self.format,
+            "binary": self.binary,
+            "fps": self.target_fps,
+            "width": self.width,
+            "height": self.height,
+            "annotate": self.annotate,
+        }
+
+    def track(self, object_id: str, now: float = None):
+        """
+        Mark a tracked object as seen, dropping objects past their TTL or over the cap
+
+        Only the stale front of the tracker is touched, never the whole dict.
+        """
+        now = now if now is not None else time.monotonic()
+        self.tracker[object_id] = now
+        self.tracker.move_to_end(object_id)
+        self.expire_objects(now)
+        while len(self.tracker) > config.SESSION_MAX_TRACKED_OBJECTS:
+            self.tracker.popitem(last=False)
+
+    def expire_objects(self, now: float = None) -> int:
+        """Drop tracked objects not seen for SESSION_OBJECT_TTL_S, returning how many"""
+        cutoff = (now if now is not None else time.monotonic()) - config.SESSION_OBJECT_TTL_S
+        expired = 0
+        while self.tracker:
+            object_id, seen = next(iter(self.tracker.items()))
+            if seen > cutoff:
+                break
+            del self.tracker[object_id]
+            expired += 1
+        return expired
+
+
+class SessionRegistry:
+    """
+    Owns every connected client's Session.
+
+    create() on connect and remove() on disconnect are O(1); remove() also
+    runs the cleanup hooks other components register with on_remove(), so a
+    session's credits, queues and stats go away with it.
+
+    Idle sessions are expired with a min-heap of deadlines swept from the
+    event loop (run()). touch() only updates last_seen; a popped deadline
+    whose session was active since is pushed back with its new deadline, and
+    entries of removed sessions are skipped. The heap is compacted when stale
+    entries outnumber live ones, so connect/disconnect churn cannot grow it.
+
+    At most SESSION_MAX_COUNT sessions exist at once: when full, sessions
+    past their idle deadline are swept first, and if none are, the new
+    connection is refused (create() returns None). Live sessions are never
+    dropped to make room, so reconnecting in a loop cannot push other
+    clients out. Each session tracks at most SESSION_MAX_TRACKED_OBJECTS
+    objects, which bounds registry memory.
+
+    All methods are called from the event loop, so no locking is needed.
+    """
+
+    def __init__(self, on_expire: Callable[[str, str], object] = None):
+        self.sessions: "OrderedDict[str, Session]" = OrderedDict()  # Least recently active first
+        self.on_expire = on_expire  # (sid, reason) -> None or awaitable, e.g. disconnect the client
+        self._hooks: List[Callable[[str], None]] = []
+        self._heap: List = []  # (deadline, sid, session serial) - may hold stale entries
+        self.created = 0
+        self.removed = 0
+        self.expired = 0
+        self.refused = 0
+
+    def on_remove(self, hook: Callable[[str], None]):
+        """Register a per-sid cleanup function (e.g. CreditManager.forget)"""
+        self._hooks.append(hook)
+
+    # -------------------------------
+    # Lifecycle
+    # -------------------------------
+    def create(self, sid: str, client_type: str = "UNKNOWN") -> Session:
+        """
+        Register a newly connected client
+
+        Args:
+            sid: Socket ID
+            client_type: FLUTTER / PYTHON / UNKNOWN
+
+        Returns:
+            The new session, or None if SESSION_MAX_COUNT live sessions exist
+            (the connection should be refused)
+        """
+        if sid in self.sessions:
+            self.remove(sid)
+        if len(self.sessions) >= config.SESSION_MAX_COUNT:
+            self.sweep()  # Only sessions past their idle deadline make room
+        if len(self.sessions) >= config.SESSION_MAX_COUNT:
+            self.refused += 1
+            print(f"[SESSIONS] ⚠️ SESSION_MAX_COUNT reached, refusing {sid[:10]}")
+            return None
+        session = Session(sid, client_type)
+        self.sessions[sid] = session
+        self.created += 1
+        heapq.heappush(self._heap, (session.last_seen + config.SESSION_IDLE_TTL_S, sid, session.serial))
+        return session
+
+    def get(self, sid: str) -> Optional[Session]:
+        return self.sessions.get(sid)
+
+    def touch(self, sid: str) -> Optional[Session]:
+        """Mark a session as active (O(1), the heap is not updated)"""
+        session = self.sessions.get(sid)
+        if session is not None:
+            session.last_seen = time.monotonic()
+            self.sessions.move_to_end(sid)
+        return session
+
+    def remove(self, sid: str) -> Optional[Session]:
+        """Free a session and everything registered for it"""
+        session = self.sessions.pop(sid, None)
+        for hook in self._hooks:
+            hook(sid)
+        if session is not None:
+            self.removed += 1
+            if len(self._heap) > 2 * len(self.sessions) + 64:
+                self._compact()
+        return session
+
+    def _expire(self, sid: str, reason: str):
+        self.remove(sid)
+        if self.on_expire is not None:
+            outcome = self.on_expire(sid, reason)
+            if asyncio.iscoroutine(outcome):
+                asyncio.ensure_future(outcome)
+
+    def _compact(self):
+        """Drop heap entries whose session is gone"""
+        live = {s.serial for s in self.sessions.values()}
+        self._heap = [entry for entry in self._heap if entry[2] in live]
+        heapq.heapify(self._heap)
+
+    # -------------------------------
+    # Expiry
+    # -------------------------------
+    def sweep(self, now: float = None) -> int:
+        """
+        Expire sessions idle for SESSION_IDLE_TTL_S
+
+        Returns:
+            Number of sessions expired
+        """
+        now = now if now is not None else time.monotonic()
+        expired = 0
+        while self._heap and self._heap[0][0] <= now:
+            _, sid, serial = heapq.heappop(self._heap)
+            session = self.sessions.get(sid)
+            if session is None or session.serial != serial:
+                continue  # Removed (or reconnected under the same sid) since
+            deadline = session.last_seen + config.SESSION_IDLE_TTL_S
+            if deadline > now:
+                heapq.heappush(self._heap, (deadline, sid, serial))  # Active since: re-arm
+                continue
+            print(f"[SESSIONS] ⏱️ Expiring idle session {sid[:10]} "
+                  f"({now - session.last_seen:.0f}s without frames)")
+            self.expired += 1
+            expired += 1
+            self._expire(sid, "idle")
+        return expired
+
+    async def run(self):
+        """Background task: sweep expired sessions periodically"""
+        while True:
+            await asyncio.sleep(config.SESSION_SWEEP_INTERVAL_S)
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"[SESSIONS] ⚠️ Sweep failed: {e}")
+
+    # -------------------------------
+    # Stats
+    # -------------------------------
+    def stats(self) -> Dict:
+        """Registry counters and sizes"""
+        return {
+            "active": len(self.sessions),
+            "created": self.created,
+            "removed": self.removed,
+            "expired_idle": self.expired,
+            "refused_capacity": self.refused,
+            "heap_entries": len(self._heap),
+            "tracked_objects": sum(len(s.tracker) for s in self.sessions.values()),
+        }
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Temporal smoothing of detections for YOLOv11x backend
+Per-session filtering of the selected object so boxes don't jitter and
+classes don't flip from frame to frame
+"""
+
+import math
+import time
+from typing import Dict, List
+
+import config
+
+
+def _alpha(cutoff_hz: float, dt: float) -> float:
+    """Smoothing factor of a first-order low-pass filter with this cutoff"""
+    tau = 1.0 / (2 * math.pi * cutoff_hz)
+    return 1.0 / (1.0 + tau / dt)
+
+
+def _iou(a, b) -> float:
+    ix = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+class _Track:
+    """The smoothed object of one session"""
+
+    __slots__ = ("box", "speed", "confidence", "class_id", "candidate", "votes", "misses", "seen_at", "names")
+
+    def __init__(self, det: Dict, now: float, names: Dict):
+        self.box = list(det["bbox"])
+        self.speed = [0.0, 0.0, 0.0, 0.0]  # Filtered corner speeds in px/s (One-Euro)
+        self.confidence = det["confidence"]
+        self.class_id = det["class_id"]
+        self.candidate = None  # Class trying to take over, and its consecutive frames
+        self.votes = 0
+        self.misses = 0
+        self.seen_at = now
+        self.names = names  # Class map the class ids refer to
+
+
+class DetectionSmoother:
+    """
+    Smooths each session's selected detection before it is emitted.
+
+    Box corners are filtered with a One-Euro filter (SMOOTHING_METHOD
+    'one_euro': little smoothing while the box moves fast, strong smoothing
+    while it is still) or a plain EMA ('ema'). A box that barely overlaps
+    the previous one (IoU < SMOOTHING_RESET_IOU) is a new object and
+    restarts the filter instead of sliding across the frame. So does a
+    change of class map (the session switched to a model with other classes).
+
+    Hysteresis: the reported class only changes after another class wins
+    SMOOTHING_CLASS_SWITCH_FRAMES frames in a row; confidence is averaged,
+    and an object missing from a frame is held at its last box for up to
+    SMOOTHING_HOLD_FRAMES frames while its averaged confidence stays at or
+    above SMOOTHING_HIDE_CONFIDENCE (held detections carry 'held': True).
+
+    State is one small slotted object per session.
+    All methods are called from the event loop, so no locking is needed.
+    """
+
+    def __init__(self):
+        self.tracks: Dict[str, _Track] = {}
+
+    def apply(self, sid: str, detections: List[Dict], names: Dict, now: float = None) -> List[Dict]:
+        """
+        Smooth a frame's detections (most confident first; only the first is tracked)
+
+        Args:
+            sid: Socket ID
+            detections: The frame's selected detections in frame pixels
+            names: Class names of the model that produced them
+            now: Frame time (defaults to time.monotonic())
+
+        Returns:
+            The detections to emit
+        """
+        if not config.SMOOTHING_ENABLED:
+            return detections
+        now = time.monotonic() if now is None else now
+        track = self.tracks.get(sid)
+        if track is not None and track.names is not names and track.names != names:
+            # Another model's class ids: the track's class means nothing under these names
+            del self.tracks[sid]
+            track = None
+
+        if not detections:
+            if track is None:
+                return []
+            track.misses += 1
+            track.confidence *= 1 - config.SMOOTHING_CONFIDENCE_ALPHA
+            if track.misses > config.SMOOTHING_HOLD_FRAMES or track.confidence < config.SMOOTHING_HIDE_CONFIDENCE:
+                del self.tracks[sid]
+                return []
+            return [self._report(track, names, held=True)]
+
+        det = detections[0]
+        if track is None or _iou(track.box, det["bbox"]) < config.SMOOTHING_RESET_IOU:
+            self.tracks[sid] = _Track(det, now, names)
+            return detections
+
+        dt = max(now - track.seen_at, 1e-3)
+        self._filter_box(track, det["bbox"], dt)
+        alpha = config.SMOOTHING_CONFIDENCE_ALPHA
+        track.confidence = alpha * det["confidence"] + (1 - alpha) * track.confidence
+        self._vote(track, det["class_id"])
+        track.misses = 0
+        track.seen_at = now
+        return [self._report(track, names)] + detections[1:]
+
+    @staticmethod
+    def _filter_box(track: _Track, box: List[float], dt: float):
+        if config.SMOOTHING_METHOD == "ema":
+            alpha = config.SMOOTHING_EMA_ALPHA
+            track.box = [alpha * new + (1 - alpha) * old for new, old in zip(box, track.box)]
+            return
+        # One-Euro: low-pass the speed, then let the cutoff grow with it
+        speed_alpha = _alpha(config.SMOOTHING_D_CUTOFF, dt)
+        for i, (new, old) in enumerate(zip(box, track.box)):
+            speed = speed_alpha * (new - old) / dt + (1 - speed_alpha) * track.speed[i]
+            cutoff = config.SMOOTHING_MIN_CUTOFF + config.SMOOTHING_BETA * abs(speed)
+            alpha = _alpha(cutoff, dt)
+            track.box[i] = alpha * new + (1 - alpha) * old
+            track.speed[i] = speed
+
+    @staticmethod
+    def _vote(track: _Track, class_id: int):
+        if class_id == track.class_id:
+            track.candidate, track.votes = None, 0
+            return
+        if class_id == track.candidate:
+            track.votes += 1
+        else:
+            track.candidate, track.votes = class_id, 1
+        if track.votes >= config.SMOOTHING_CLASS_SWITCH_FRAMES:
+            track.class_id, track.candidate, track.votes = class_id, None, 0
+
+    @staticmethod
+    def _report(track: _Track, names: Dict, held: bool = False) -> Dict:
+        det = {
+            "bbox": list(track.box),
+            "confidence": track.confidence,
+            "class_id": track.class_id,
+            "class_name": names[track.class_id],
+        }
+        if held:
+            det["held"] = True
+        return det
+
+    def stats(self) -> Dict:
+        return {"tracking": len(self.tracks), "method": config.SMOOTHING_METHOD if config.SMOOTHING_ENABLED else None}
+
+    def forget(self, sid: str):
+        """Drop a session's track (on disconnect)"""
+        self.tracks.pop(sid, None)
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Video stream ingest for YOLOv11x backend
+Per-session incremental decoders for clients that stream H.264 or MJPEG
+instead of sending independent JPEG frames
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+import config
+
+try:
+    import av
+except ImportError:  # H.264 needs PyAV; MJPEG streams only need OpenCV
+    av = None
+
+
+def available_stream_formats() -> List[str]:
+    """Stream formats this server can decode"""
+    return ["h264", "mjpeg"] if av is not None else ["mjpeg"]
+
+
+class MjpegDecoder:
+    """
+    Splits a byte stream of concatenated JPEGs at SOI/EOI markers.
+
+    Chunks may cut frames anywhere; incomplete data is kept until the rest
+    arrives. Only the newest complete JPEG in a chunk is decoded, since
+    MJPEG frames don't depend on each other. (Frames must not carry
+    embedded EXIF thumbnails, whose markers would split them early.)
+    """
+
+    SOI = b"\xff\xd8"
+    EOI = b"\xff\xd9"
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, chunk: bytes) -> Tuple[Optional[np.ndarray], int]:
+        """
+        Add stream bytes
+
+        Returns:
+            (newest decoded frame or None, number of complete frames in the chunk)
+        """
+        self.buffer += chunk
+        newest = None
+        count = 0
+        pos = 0
+        while True:
+            start = self.buffer.find(self.SOI, pos)
+            if start < 0:
+                pos = max(pos, len(self.buffer) - 1)  # A trailing 0xFF may start the next SOI
+                break
+            end = self.buffer.find(self.EOI, start + 2)
+            if end < 0:
+                pos = start
+                break
+            newest = (start, end + 2)
+            count += 1
+            pos = end + 2
+
+        jpeg = bytes(self.buffer[newest[0]:newest[1]]) if newest else None
+        del self.buffer[:pos]
+        if len(self.buffer) > config.STREAM_MAX_BUFFER_MB * 1024 * 1024:
+            self.buffer.clear()
+            raise ValueError("No complete JPEG within STREAM_MAX_BUFFER_MB, stream buffer dropped")
+        if jpeg is None:
+            return None, 0
+        frame = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError("Failed to decode MJPEG frame")
+        return frame, count
+
+
+class H264Decoder:
+    """
+    Annex-B H.264 elementary stream decoded with PyAV.
+
+    Every frame has to be decoded (later frames reference earlier ones), but
+    only the newest one of a chunk is converted to BGR. The parser emits a
+    packet once the next start code arrives, so output trails input by one
+    access unit.
+    """
+
+    def __init__(self):
+        if av is None:
+            raise RuntimeError("H.264 streams need PyAV (pip install av)")
+        self.codec = av.CodecContext.create("h264", "r")
+
+    def feed(self, chunk: bytes) -> Tuple[Optional[np.ndarray], int]:
+        """
+        Add stream bytes
+
+        Returns:
+            (newest decoded frame or None, number of frames decoded from the chunk)
+        """
+        newest = None
+        count = 0
+        for packet in self.codec.parse(bytes(chunk)):
+            for frame in self.codec.decode(packet):
+                newest = frame
+                count += 1
+        return (newest.to_ndarray(format="bgr24") if newest is not None else None), count
+
+
+class StreamIngest:
+    """
+    Decoders and a "latest frame wins" slot per streaming session.
+
+    feed() decodes a chunk off the event loop and keeps the newest decoded
+    frame in the session's slot, replacing one that has not been picked up
+    yet (counted as superseded). A session's chunks are decoded one at a
+    time, in arrival order (its decoder is stateful). One worker task per
+    session runs inference: feed() starts it when the slot fills while it
+    is idle, and it take()s frames until the slot is empty. A slow model or
+    link therefore never builds a backlog; inference always runs on the
+    most recent frame.
+
+    All methods are called from the event loop, so no locking is needed
+    (only the decoders run on other threads).
+    """
+
+    def __init__(self):
+        self.sessions: Dict[str, Dict] = {}
+
+    def _session(self, sid: str, stream_format: str) -> Dict:
+        state = self.sessions.get(sid)
+        if state is None:
+            state = self.sessions[sid] = {
+                "format": stream_format,
+                "decoder": H264Decoder() if stream_format == "h264" else MjpegDecoder(),
+                "pending": None,   # (frame number, BGR frame) waiting for the worker
+                "decoding": asyncio.Lock(),  # One decode per session at a time, in order
+                "worker": None,
+                "chunks": 0,
+                "bytes": 0,
+                "decoded": 0,
+                "superseded": 0,
+                "inferred": 0,
+            }
+        return state
+
+    async def feed(
+        self,
+        sid: str,
+        stream_format: str,
+        chunk: bytes,
+        worker: Callable[[str], object],
+        run: Callable[..., Awaitable] = None,
+    ) -> int:
+        """
+        Decode one chunk of a session's stream
+
+        Args:
+            sid: Socket ID
+            stream_format: 'h264' or 'mjpeg'
+            chunk: Any slice of the encoded stream
+            worker: Coroutine function run as worker(sid) while frames are waiting
+            run: Runs the blocking decode as await run(fn, chunk) off the event loop,
+                 e.g. on the pipeline's decode stage (default: the loop's executor)
+
+        Returns:
+            Number of frames the chunk completed
+        """
+        state = self._session(sid, stream_format)
+        state["chunks"] += 1
+        state["bytes"] += len(chunk)
+        if run is None:
+            loop = asyncio.get_running_loop()
+            run = lambda fn, *args: loop.run_in_executor(None, fn, *args)
+        async with state["decoding"]:
+            frame, count = await run(state["decoder"].feed, chunk)
+        if frame is None or self.sessions.get(sid) is not state:
+            return count  # Nothing new, or the session left while its chunk decoded
+        state["decoded"] += count
+        state["superseded"] += count - 1 + (state["pending"] is not None)
+        state["pending"] = (state["decoded"], frame)
+        if state["worker"] is None or state["worker"].done():
+            state["worker"] = asyncio.ensure_future(worker(sid))
+        return count
+
+    def take(self, sid: str) -> Optional[Tuple[int, np.ndarray]]:
+        """Next (frame number, frame) for the session's worker, None when the slot is empty"""
+        state = self.sessions.get(sid)
+        if state is None or state["pending"] is None:
+            return None
+        pending, state["pending"] = state["pending"], None
+        state["inferred"] += 1
+        return pending
+
+    def stats(self, sid: str) -> Optional[Dict]:
+        """Stream counters for a session (None if it never streamed)"""
+        state = self.sessions.get(sid)
+        if state is None:
+            return None
+        return {
+            "format": state["format"],
+            "chunks": state["chunks"],
+            "mb_received": round(state["bytes"] / (1024 * 1024), 2),
+            "decoded": state["decoded"],
+            "inferred": state["inferred"],
+            "superseded": state["superseded"],
+        }
+
+    def forget(self, sid: str):
+        """Drop a session's decoder and stop its worker (on disconnect)"""
+        state = self.sessions.pop(sid, None)
+        if state is not None and state["worker"] is not None:
+            state["worker"].cancel()
@@ -3,22 +3,39 @@
 YOLOv11x Detection Client - PORTRAIT VIEW ONLY (Upright)
 Displays camera feed in portrait orientation (9:16) — like a smartphone.
 No rotation, no stretch, and no excessive zoom.
+
+Usage:
+  python test_client.py                                   # Webcam, one JPEG per frame
+  python test_client.py --depth 3 --duration 60 --headless --report run.json
+                                                          # Latency benchmark, 3 frames in flight
+  python test_client.py --video sample.mp4                # Stream a video file as H.264
+  python test_client.py --video sample.mp4 --stream mjpeg
 """
 
+import argparse
 import cv2
 import base64
+import json
 import socketio
+import threading
 import time
 import numpy as np
 from typing import Tuple, Dict
 
+from annotate import AnnotationRenderer
+
+try:
+    import av
+except ImportError:  # Only needed to stream H.264 (--video)
+    av = None
+
 # =====================================================
 # Configuration
 # =====================================================
 SERVER_URL = "http://localhost:3000"
 CAMERA_ID = 0
 
-# YOLO input dimensions (portrait 9:16)
+# Maximum upload dimensions (portrait 9:16); the server letterboxes to the model input
 YOLO_WIDTH = 640
 YOLO_HEIGHT = 1136
 
@@ -26,6 +43,28 @@ YOLO_HEIGHT = 1136
 FPS_TARGET = 10
 FRAME_DELAY = 1.0 / FPS_TARGET
 
+# Frames in flight at once (1 = wait for each reply before sending the next)
+PIPELINE_DEPTH = 2
+
+# A frame without a reply after this long counts as lost (frees its slot)
+REPLY_TIMEOUT_S = 5.0
+
+# JPEG quality for outgoing frames
+JPEG_QUALITY = 80
+
+# Follow the server's 'rate_control' recommendations (FPS, resolution, quality)
+FOLLOW_RATE_CONTROL = True
+
+# Pin the server-side inference size (320 / 480 / 640), None = let the server choose
+INFERENCE_SIZE = None
+
+# Send JPEG bytes as a binary attachment instead of base64 text (~25% smaller)
+BINARY_FRAMES = True
+
+# Video streaming (--video): bytes per 'stream' event and H.264 encoder settings
+STREAM_CHUNK_BYTES = 16 * 1024
+H264_BITRATE = 1_500_000
+
 WINDOW_NAME = "YOLOv11x Portrait Detection"
 
 # =====================================================
@@ -34,8 +73,176 @@ WINDOW_NAME = "YOLOv11x Portrait Detection"
 sio = socketio.Client()
 current_detections = []
 detection_count = 0
-processing = False
 last_transform: Dict = {}
+last_stream_frame = 0
+
+# Send settings (updated by server 'rate_control' events)
+frame_delay = FRAME_DELAY
+jpeg_quality = JPEG_QUALITY
+yolo_width = YOLO_WIDTH
+yolo_height = YOLO_HEIGHT
+pipeline_depth = PIPELINE_DEPTH
+
+# =====================================================
+# Round trips
+# =====================================================
+def percentile(values: list, q: float) -> float:
+    """q-th percentile (0-100) of values, 0.0 when empty."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+# Latency breakdown: (sample name, label, from timestamp, to timestamp) of the server's 'timing'
+SERVER_STAGES = (
+    ("server_decode_ms", "Server decode", "received", "decoded"),
+    ("server_queue_ms", "Server queue", "decoded", "infer_start"),
+    ("server_infer_ms", "Server inference", "infer_start", "infer_end"),
+    ("server_post_ms", "Server post+emit", "infer_end", "emit"),
+    ("server_total_ms", "Server total", "received", "emit"),
+)
+
+class RoundTrips:
+    """
+    Client-side timestamps of every frame sent, matched to replies by frame_id,
+    and the latency breakdown built from the server's 'timing' in each reply.
+
+    Server intervals use server timestamps only, and the network share is the
+    round trip minus the server total, so neither needs synchronised clocks.
+    Uplink/downlink are split only once clock_offset_ms has been estimated
+    from pings.
+
+    Used from the encode thread (sent), the Socket.IO thread (answered /
+    failed) and the display thread (in_flight), hence the lock.
+    """
+
+    def __init__(self):
+        self.lock = threading.Condition()
+        self.pending: Dict[int, Dict] = {}  # frame_id -> timestamps and transform of the frame
+        self.samples: Dict[str, list] = {"encode_ms": [], "rtt_ms": [], "capture_to_reply_ms": []}
+        self.clock_offset_ms = None  # Server clock minus client clock
+        self.sent_count = 0
+        self.answered_count = 0
+        self.errors: Dict[str, int] = {}
+        self.lost = 0
+        self.started = time.perf_counter()
+
+    def sent(self, frame_id: int, captured_at: float, encoded_at: float, encode_ms: float, transform: Dict):
+        with self.lock:
+            self.pending[frame_id] = {"captured_at": captured_at, "encoded_at": encoded_at,
+                                      "sent_at": time.perf_counter(), "sent_wall_ms": time.time() * 1000,
+                                      "transform": transform}
+            self.samples["encode_ms"].append(encode_ms)
+            self.sent_count += 1
+
+    def answered(self, frame_id, timing: Dict = None) -> Dict:
+        """Record a reply (and its server 'timing'); returns the frame's send record (None for unknown ids)."""
+        now = time.perf_counter()
+        with self.lock:
+            sent = self.pending.pop(frame_id, None)
+            if sent is None:
+                return None
+            self.answered_count += 1
+            rtt_ms = (now - sent["sent_at"]) * 1000
+            self.samples["rtt_ms"].append(rtt_ms)
+            self.samples["capture_to_reply_ms"].append((now - sent["captured_at"]) * 1000)
+            self.add_sample("capture_to_send_ms", (sent["sent_at"] - sent["captured_at"]) * 1000)
+            if timing:
+                self.add_breakdown(timing, sent, rtt_ms)
+            self.lock.notify_all()
+        return sent
+
+    def add_sample(self, name: str, value: float):
+        self.samples.setdefault(name, []).append(value)
+
+    def add_breakdown(self, timing: Dict, sent: Dict, rtt_ms: float):
+        """Split one round trip into server stages and network (called with the lock held)."""
+        for name, _, start, end in SERVER_STAGES:
+            if timing.get(start) is not None and timing.get(end) is not None:
+                self.add_sample(name, timing[end] - timing[start])
+        if timing.get("received") is None or timing.get("emit") is None:
+            return
+        network_ms = max(0.0, rtt_ms - (timing["emit"] - timing["received"]))
+        self.add_sample("network_ms", network_ms)
+        if self.clock_offset_ms is not None:
+            uplink_ms = timing["received"] - self.clock_offset_ms - sent["sent_wall_ms"]
+            self.add_sample("uplink_ms", uplink_ms)
+            self.add_sample("downlink_ms", network_ms - uplink_ms)
+
+    def failed(self, frame_id, code: str):
+        with self.lock:
+            if self.pending.pop(frame_id, None) is not None:
+                self.errors[code] = self.errors.get(code, 0) + 1
+                self.lock.notify_all()
+
+    def in_flight(self) -> int:
+        with self.lock:
+            return len(self.pending)
+
+    def wait_for_slot(self, depth: int, timeout: float) -> bool:
+        """Block until fewer than depth frames are in flight; frames past REPLY_TIMEOUT_S are lost."""
+        deadline = time.perf_counter() + timeout
+        with self.lock:
+            while True:
+                cutoff = time.perf_counter() - REPLY_TIMEOUT_S
+                for frame_id in [f for f, sent in self.pending.items() if sent["sent_at"] < cutoff]:
+                    del self.pending[frame_id]
+                    self.lost += 1
+                if len(self.pending) < depth:
+                    return True
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    return False
+                self.lock.wait(min(remaining, REPLY_TIMEOUT_S))
+
+    def summary(self, captured: int) -> Dict:
+        elapsed = time.perf_counter() - self.started
+        with self.lock:
+            report = {
+                "duration_s": round(elapsed, 1),
+                "depth": pipeline_depth,
+                "captured": captured,
+                "sent": self.sent_count,
+                "answered": self.answered_count,
+                "errors": dict(self.errors),
+                "lost": self.lost,
+                "in_flight": len(self.pending),
+                "capture_fps": round(captured / elapsed, 1) if elapsed else 0.0,
+                "answered_fps": round(self.answered_count / elapsed, 1) if elapsed else 0.0,
+                "client_cpu_ms_per_frame": round(time.process_time() * 1000 / max(1, self.sent_count), 2),
+                "clock_offset_ms": round(self.clock_offset_ms, 1) if self.clock_offset_ms is not None else None,
+            }
+            for name, values in self.samples.items():
+                report[name] = {
+                    "p50": round(percentile(values, 50), 1),
+                    "p95": round(percentile(values, 95), 1),
+                    "p99": round(percentile(values, 99), 1),
+                    "max": round(max(values), 1) if values else 0.0,
+                }
+        return report
+
+round_trips = RoundTrips()
+
+def estimate_clock_offset(samples: int = 5):
+    """
+    Estimate server clock minus client clock from pings (NTP-style, using the
+    fastest round trip); leaves it unset for servers without 'server_time'.
+    """
+    best = None
+    for _ in range(samples):
+        sent_ms = time.time() * 1000
+        try:
+            pong = sio.call("ping", {"timestamp": sent_ms}, timeout=2)
+        except Exception:
+            return
+        received_ms = time.time() * 1000
+        if not isinstance(pong, dict) or pong.get("server_time") is None:
+            return
+        rtt = received_ms - sent_ms
+        if best is None or rtt < best[0]:
+            best = (rtt, pong["server_time"] - (sent_ms + received_ms) / 2)
+    round_trips.clock_offset_ms = best[1]
+    print(f"[CLOCK] Server clock offset: {best[1]:+.1f} ms (ping RTT {best[0]:.1f} ms)")
 
 # =====================================================
 # Socket.IO events
@@ -45,32 +252,65 @@ def connect():
     print("=" * 60)
     print("[CONNECTED] to YOLO backend")
     print("[MODE] PORTRAIT VIEW ONLY (upright)")
-    print(f"[CONFIG] YOLO input: {YOLO_WIDTH}×{YOLO_HEIGHT}")
+    print(f"[CONFIG] Upload size: ≤{YOLO_WIDTH}×{YOLO_HEIGHT} (server letterboxes)")
     print("=" * 60)
 
 @sio.event
 def disconnect():
     print("[DISCONNECTED] from server")
 
+@sio.event
+def connection_response(data):
+    if data.get("rate_control"):
+        apply_rate_control(data["rate_control"])
+
+@sio.event
+def rate_control(data):
+    apply_rate_control(data)
+
+def apply_rate_control(data: Dict):
+    """Adopt the server's recommended FPS, resolution and JPEG quality."""
+    global frame_delay, jpeg_quality, yolo_width, yolo_height
+    if not FOLLOW_RATE_CONTROL:
+        return
+    fps = data.get("fps") or FPS_TARGET
+    frame_delay = 1.0 / fps
+    jpeg_quality = int(data.get("jpeg_quality", JPEG_QUALITY))
+    max_dim = data.get("max_dim")
+    if max_dim:
+        # Portrait 9:16 → height is the long side
+        yolo_height = int(max_dim)
+        yolo_width = int(round(max_dim * 9 / 16))
+    print(f"[RATE] {fps} FPS, {yolo_width}×{yolo_height}, q{jpeg_quality} "
+          f"(tier={data.get('tier')}, server latency={data.get('latency_ms')} ms)")
+
 @sio.event
 def detections(data):
-    global current_detections, detection_count, processing
+    global current_detections, detection_count, last_stream_frame, last_transform
+    sent = round_trips.answered(data.get("frame_id"), data.get("timing"))
+    # Older replies the server replaced with this one on a backed-up link
+    for frame_id in data.get("coalesced_frame_ids", ()):
+        round_trips.failed(frame_id, "coalesced")
+    if sent is not None:
+        last_transform = sent["transform"]  # Boxes are in the coordinates of that frame's upload
     current_detections = data.get("detections", []) or []
     detection_count = data.get("count", 0) or len(current_detections)
-    processing = False
+    last_stream_frame = data.get("stream_frame", last_stream_frame)
 
 @sio.event
 def error(data):
-    global processing
-    print(f"[ERROR] {data.get('message')}")
-    processing = False
+    round_trips.failed(data.get("frame_id"), data.get("code") or "error")
+    if data.get("code") != "no_credits":
+        print(f"[ERROR] {data.get('message')}")
 
 # =====================================================
 # Helpers
 # =====================================================
-def encode_frame(frame: np.ndarray, quality: int = 80) -> str:
-    """Encode frame as JPEG base64 string."""
+def encode_frame(frame: np.ndarray, quality: int = 80, binary: bool = False):
+    """Encode frame as JPEG bytes (binary) or a base64 string."""
     _, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if binary:
+        return buf.tobytes()
     return base64.b64encode(buf).decode("utf-8")
 
 def rotate_to_portrait(frame: np.ndarray) -> np.ndarray:
@@ -89,45 +329,46 @@ def rotate_to_portrait(frame: np.ndarray) -> np.ndarray:
         new_w = int(h * target_ratio * (1 - crop_margin))
         x1 = max(0, (w - new_w) // 2)
         cropped = mirrored[:, x1:x1 + new_w]
-        print(f"[VIEW] Cropped width: {w}->{new_w} (x1={x1})")
+        view = f"[VIEW] Cropped width: {w}->{new_w} (x1={x1})"
     else:
         # Too tall → crop height
         new_h = int(w / target_ratio * (1 - crop_margin))
         y1 = max(0, (h - new_h) // 2)
         cropped = mirrored[y1:y1 + new_h, :]
-        print(f"[VIEW] Cropped height: {h}->{new_h} (y1={y1})")
-
-    ch, cw = cropped.shape[:2]
-    print(f"[VIEW] Output (cropped) frame: {cw}×{ch} (9:16 portrait)")
+        view = f"[VIEW] Cropped height: {h}->{new_h} (y1={y1})"
+
+    # Printed when the geometry changes, not for every frame
+    global last_view
+    if view != last_view:
+        last_view = view
+        ch, cw = cropped.shape[:2]
+        print(view)
+        print(f"[VIEW] Output (cropped) frame: {cw}×{ch} (9:16 portrait)")
     return cropped
 
+last_view = None
+
 def prepare_for_yolo(frame: np.ndarray) -> Tuple[np.ndarray, bool]:
     """Prepare frame for YOLO input (no rotation needed)."""
     return frame, False
 
-def letterbox_9_16(
-    img: np.ndarray, target_w: int, target_h: int
-) -> Tuple[np.ndarray, float, int, int]:
-    """Resize + pad to 9:16 portrait without stretching."""
+def resize_for_upload(
+    img: np.ndarray, max_w: int, max_h: int
+) -> Tuple[np.ndarray, float]:
+    """
+    Downscale to fit within max_w×max_h (no padding).
+    The server letterboxes to the model input itself and returns boxes in
+    the coordinates of the frame we send.
+    """
     h, w = img.shape[:2]
-    scale = min(target_w / w, target_h / h)
+    scale = min(max_w / w, max_h / h, 1.0)
+    if scale >= 1.0:
+        return img, 1.0
 
     new_w = int(round(w * scale))
     new_h = int(round(h * scale))
-    resized = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
-
-    pad_left = (target_w - new_w) // 2
-    pad_top = (target_h - new_h) // 2
-    pad_right = target_w - new_w - pad_left
-    pad_bottom = target_h - new_h - pad_top
-
-    color = (114, 114, 114)
-    padded = cv2.copyMakeBorder(
-        resized, pad_top, pad_bottom, pad_left, pad_right,
-        borderType=cv2.BORDER_CONSTANT, value=color
-    )
-
-    return padded, scale, pad_left, pad_top
+    resized = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_AREA)
+    return resized, new_w / w
 
 def map_bbox_to_portrait(
     bbox: Tuple[float, float, float, float], transform: Dict
@@ -171,150 +412,391 @@ TEXT_BG_COLOR = (0, 255, 0)
 TEXT_COLOR = (0, 0, 0)
 FONT = cv2.FONT_HERSHEY_SIMPLEX
 
+# Label glyphs are cached per class/confidence, drawing happens in place
+renderer = AnnotationRenderer(
+    box_color=BOX_COLOR, box_thickness=3, label_color=TEXT_BG_COLOR, text_color=TEXT_COLOR,
+    font_scale=0.7, text_thickness=2, label_format="{name} {confidence:.0%}",
+)
+
 def draw_detections(frame: np.ndarray, detections: list, transform: Dict):
-    out = frame.copy()
-    for det in detections:
-        bbox = det.get("bbox", det)
-        x1, y1, x2, y2 = map_bbox_to_portrait(bbox, transform)
-        conf = det.get("confidence", 0.0)
-        clsname = det.get("class_name", str(det.get("class_id", "obj")))
-
-        cv2.rectangle(out, (x1, y1), (x2, y2), BOX_COLOR, 3)
-        label = f"{clsname} {conf:.0%}"
-        (label_w, label_h), _ = cv2.getTextSize(label, FONT, 0.7, 2)
-        label_y = y1 - 10 if y1 - 10 > label_h else y1 + label_h + 10
-        cv2.rectangle(out, (x1, label_y - label_h - 5),
-                      (x1 + label_w + 10, label_y + 5), TEXT_BG_COLOR, -1)
-        cv2.putText(out, label, (x1 + 5, label_y),
-                    FONT, 0.7, TEXT_COLOR, 2, cv2.LINE_AA)
-    return out
-
-def draw_info(frame: np.ndarray, fps: float, count: int, processing: bool):
-    out = frame.copy()
+    """Draw detections into frame (in place, e.g. on renderer.canvas())."""
+    boxes = [map_bbox_to_portrait(det.get("bbox", det), transform) for det in detections]
+    return renderer.draw_detections(frame, detections, boxes)
+
+def draw_info(frame: np.ndarray, fps: float, count: int, in_flight: int):
+    """Draw the info panel into frame (in place); only the panel is blended."""
     h, w = frame.shape[:2]
-    overlay = out.copy()
-    cv2.rectangle(overlay, (10, 10), (w - 10, 180), (0, 0, 0), -1)
-    cv2.addWeighted(overlay, 0.6, out, 0.4, 0, out)
-    info = [
-        f"FPS: {fps:.1f}",
-        f"Detections: {count}",
-        f"View: PORTRAIT (upright)",
-        f"Display: {w}×{h}",
-        f"YOLO: {YOLO_WIDTH}×{YOLO_HEIGHT}",
+    white = (255, 255, 255)
+    lines = [
+        (f"FPS: {fps:.1f}", white, 0.6, 1),
+        (f"Detections: {count}", white, 0.6, 1),
+        ("View: PORTRAIT (upright)", white, 0.6, 1),
+        (f"Display: {w}×{h}", white, 0.6, 1),
+        (f"Upload: ≤{yolo_width}×{yolo_height} q{jpeg_quality}", white, 0.6, 1),
+        (f"Send rate: {1.0 / frame_delay:.1f} FPS", white, 0.6, 1),
     ]
-    for i, text in enumerate(info):
-        cv2.putText(out, text, (20, 45 + i * 25),
-                    FONT, 0.6, (255, 255, 255), 1, cv2.LINE_AA)
-    status = "Processing..." if processing else "Ready"
-    color = (0, 255, 255) if processing else (0, 255, 0)
-    cv2.putText(out, status, (20, 45 + len(info) * 25),
-                FONT, 0.7, color, 2, cv2.LINE_AA)
-    return out
+    status = f"In flight: {in_flight}/{pipeline_depth}" if in_flight else "Ready"
+    lines.append((status, (0, 255, 255) if in_flight else (0, 255, 0), 0.7, 2))
+    return renderer.panel(frame, (10, 10, w - 10, 205), lines, opacity=0.6)
+
+# =====================================================
+# Video streaming
+# =====================================================
+class StreamEncoder:
+    """Encodes frames into an H.264 (PyAV/libx264) or MJPEG byte stream."""
+
+    def __init__(self, stream_format: str, width: int, height: int, fps: float):
+        self.format = stream_format
+        self.codec = None
+        if stream_format == "h264":
+            if av is None:
+                raise RuntimeError("H.264 streaming needs PyAV (pip install av), or use --stream mjpeg")
+            self.codec = av.CodecContext.create("libx264", "w")
+            self.codec.width, self.codec.height = width, height
+            self.codec.pix_fmt = "yuv420p"
+            self.codec.framerate = int(round(fps))
+            self.codec.bit_rate = H264_BITRATE
+            self.codec.options = {"preset": "ultrafast", "tune": "zerolatency"}
+
+    def encode(self, frame: np.ndarray) -> bytes:
+        if self.codec is None:
+            _, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+            return buf.tobytes()
+        packets = self.codec.encode(av.VideoFrame.from_ndarray(frame, format="bgr24"))
+        return b"".join(bytes(packet) for packet in packets)
+
+
+def stream_video(path: str, stream_format: str, headless: bool = False):
+    """Stream a video file to the server as one encoded stream, in real time."""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        print(f"[ERROR] Cannot open video {path}")
+        return
+    fps = cap.get(cv2.CAP_PROP_FPS) or FPS_TARGET
+    # H.264 needs even dimensions; shrink to the upload limit like camera frames
+    ok, first = cap.read()
+    if not ok:
+        print(f"[ERROR] {path} has no frames")
+        return
+    first, _ = resize_for_upload(first, max(yolo_width, yolo_height), max(yolo_width, yolo_height))
+    height, width = (first.shape[0] // 2) * 2, (first.shape[1] // 2) * 2
+
+    try:
+        sio.connect(SERVER_URL, auth={
+            "client": "PYTHON",
+            "format": stream_format,
+            "binary": True,
+            "fps": fps,
+            "width": width,
+            "height": height,
+        })
+        encoder = StreamEncoder(stream_format, width, height, fps)
+    except Exception as e:
+        print(f"[ERROR] {e}")
+        return
+    print(f"[STREAM] {path}: {width}×{height} @ {fps:.1f} FPS as {stream_format.upper()} "
+          f"({STREAM_CHUNK_BYTES // 1024} KB chunks)")
+
+    transform = {"cam_w": width, "cam_h": height, "yolo_scale": 1.0, "yolo_pad_left": 0,
+                 "yolo_pad_top": 0, "rot_w": width, "rot_h": height, "mirrored": False}
+    sent_frames, sent_bytes = 0, 0
+    start = time.time()
+    frame = first
+    while ok:
+        frame = cv2.resize(frame, (width, height)) if frame.shape[:2] != (height, width) else frame
+        data = encoder.encode(frame)
+        for offset in range(0, len(data), STREAM_CHUNK_BYTES):
+            sio.emit("stream", {"chunk": data[offset:offset + STREAM_CHUNK_BYTES]})
+        sent_frames += 1
+        sent_bytes += len(data)
+
+        if not headless:
+            display = draw_detections(renderer.canvas(frame), current_detections, transform)
+            cv2.imshow(WINDOW_NAME, display)
+            if cv2.waitKey(1) & 0xFF == ord("q"):
+                break
+
+        # Real-time pacing: the server always works on the newest frame
+        delay = start + sent_frames / fps - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        ok, frame = cap.read()
+
+    time.sleep(1.0)  # Let the last detections arrive
+    elapsed = time.time() - start
+    print(f"[STREAM] Sent {sent_frames} frames in {elapsed:.1f}s, "
+          f"{sent_bytes / 1024:.0f} KB ({sent_bytes / max(1, sent_frames) / 1024:.1f} KB/frame, "
+          f"{sent_bytes * 8 / elapsed / 1e6:.2f} Mbit/s)")
+    print(f"[STREAM] Last detections were for frame {last_stream_frame} of {sent_frames}")
+    cap.release()
+    if not headless:
+        cv2.destroyAllWindows()
+    sio.disconnect()
 
 # =====================================================
 # Main loop
 # =====================================================
 def main():
-    global processing, last_transform, current_detections, detection_count
+    parser = argparse.ArgumentParser(description="YOLOv11x webcam / video test client")
+    parser.add_argument("--video", help="Stream this video file instead of the webcam")
+    parser.add_argument("--stream", choices=["h264", "mjpeg"], default="h264",
+                        help="Stream encoding for --video")
+    parser.add_argument("--headless", action="store_true", help="No preview window")
+    parser.add_argument("--camera", default=str(CAMERA_ID),
+                        help="Camera index, or a video file played as a camera at its own FPS")
+    parser.add_argument("--depth", type=int, default=PIPELINE_DEPTH, help="Frames in flight at once")
+    parser.add_argument("--duration", type=float, help="Stop after this many seconds (webcam)")
+    parser.add_argument("--report", help="Write the latency summary as JSON to this file (webcam)")
+    args = parser.parse_args()
+    if args.video:
+        stream_video(args.video, args.stream, args.headless)
+        return
+
+    global pipeline_depth
+    pipeline_depth = max(1, args.depth)
+    source = int(args.camera) if args.camera.isdigit() else args.camera
+    run_webcam(source, args.headless, args.duration, args.report)
+
+class CaptureThread(threading.Thread):
+    """
+    Reads the camera as fast as it delivers, keeping only the newest frame.
+
+    Consumers (encode thread, display) ask for a frame newer than the last
+    one they took, so a slow consumer skips frames instead of queueing them.
+    Video files are paced to their own FPS, like a live camera.
+    """
+
+    def __init__(self, cap, realtime_fps: float = None):
+        super().__init__(name="capture", daemon=True)
+        self.cap = cap
+        self.realtime_fps = realtime_fps
+        self.cond = threading.Condition()
+        self.frame = None
+        self.seq = 0
+        self.captured_at = 0.0
+        self.running = True
+
+    def run(self):
+        start = time.perf_counter()
+        while self.running:
+            ok, frame = self.cap.read()
+            now = time.perf_counter()
+            with self.cond:
+                if not ok:
+                    self.running = False
+                    self.cond.notify_all()
+                    break
+                self.frame, self.captured_at = frame, now
+                self.seq += 1
+                self.cond.notify_all()
+            if self.realtime_fps:
+                delay = start + self.seq / self.realtime_fps - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+    def latest(self, after_seq: int, timeout: float = 0.5):
+        """(seq, frame, capture time) of the newest frame after after_seq, or None."""
+        with self.cond:
+            if self.seq <= after_seq and self.running:
+                self.cond.wait(timeout)
+            if self.seq <= after_seq:
+                return None
+            return self.seq, self.frame, self.captured_at
+
+    def stop(self):
+        self.running = False
+
+def encode_loop(capture: CaptureThread, stop: threading.Event):
+    """
+    Encode thread: crop, downscale and JPEG-encode the newest captured frame
+    and send it, at most every frame_delay and with at most pipeline_depth
+    frames in flight.
+    """
+    last_seq, next_send = 0, 0.0
+    while not stop.is_set() and capture.running:
+        delay = next_send - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        if not round_trips.wait_for_slot(pipeline_depth, timeout=0.5):
+            continue
+        latest = capture.latest(last_seq)
+        if latest is None:
+            continue
+        last_seq, camera_frame, captured_at = latest
+
+        start = time.perf_counter()
+        rotated_frame = rotate_to_portrait(camera_frame)
+        yolo_frame, _ = prepare_for_yolo(rotated_frame)
+        upload, scale = resize_for_upload(yolo_frame, yolo_width, yolo_height)
+        payload = {
+            "image": encode_frame(upload, jpeg_quality, BINARY_FRAMES),
+            "frame_id": last_seq,
+            # Wall-clock capture time (ms since the epoch), echoed in the reply's 'timing'
+            "capture_ts": round((time.time() - (time.perf_counter() - captured_at)) * 1000, 2),
+        }
+        if INFERENCE_SIZE:
+            payload["imgsz"] = INFERENCE_SIZE
+        encoded_at = time.perf_counter()
+        transform = {
+            "cam_w": camera_frame.shape[1],
+            "cam_h": camera_frame.shape[0],
+            "yolo_scale": scale,
+            "yolo_pad_left": 0,
+            "yolo_pad_top": 0,
+            "rot_w": rotated_frame.shape[1],
+            "rot_h": rotated_frame.shape[0],
+            "mirrored": True,
+        }
+        round_trips.sent(last_seq, captured_at, encoded_at, (encoded_at - start) * 1000, transform)
+        try:
+            sio.emit("frame", payload)
+        except Exception as e:
+            print(f"[ERROR] Send failed: {e}")
+            round_trips.failed(last_seq, "send_failed")
+        next_send = start + frame_delay
+
+def print_summary(report: Dict):
+    print("\n" + "=" * 60)
+    print(f"[SUMMARY] {report['duration_s']}s, {report['depth']} frame(s) in flight")
+    print(f"  Captured {report['captured']} ({report['capture_fps']} FPS), sent {report['sent']}, "
+          f"answered {report['answered']} ({report['answered_fps']} FPS)")
+    if report["errors"] or report["lost"]:
+        print(f"  Not answered: {report['errors']}, lost (no reply in {REPLY_TIMEOUT_S:.0f}s): {report['lost']}")
+    rows = [("encode_ms", "Encode"), ("rtt_ms", "Send → reply"), ("capture_to_reply_ms", "Capture → reply")]
+    breakdown = [("capture_to_send_ms", "Capture → send")]
+    breakdown += [(name, label) for name, label, _, _ in SERVER_STAGES]
+    breakdown += [("network_ms", "Network (both)"), ("uplink_ms", "Uplink"), ("downlink_ms", "Downlink")]
+    for title, names in (("Round trips", rows), ("Latency breakdown", breakdown)):
+        names = [(name, label) for name, label in names if name in report]
+        if names:
+            print(f"  {title}:")
+        for name, label in names:
+            stats = report[name]
+            print(f"    {label:<18} p50 {stats['p50']:7.1f} ms  p95 {stats['p95']:7.1f} ms  "
+                  f"p99 {stats['p99']:7.1f} ms  max {stats['max']:7.1f} ms")
+    if report["clock_offset_ms"] is not None:
+        print(f"  Clock offset (server - client): {report['clock_offset_ms']:+.1f} ms")
+    print(f"  Client CPU: {report['client_cpu_ms_per_frame']} ms per frame sent")
+    print("=" * 60)
 
+def run_webcam(source=CAMERA_ID, headless: bool = False, duration: float = None, report_path: str = None):
+    """
+    Pipelined webcam client: capture and encode/send run on their own threads,
+    up to pipeline_depth frames are in flight, and the main thread only
+    displays. Prints a latency summary at the end.
+    """
     print("\n" + "=" * 60)
     print("Starting YOLOv11x Webcam Test (Portrait Mode)")
     print("=" * 60)
-    print("\nMake sure the server is running in another window!")
-    input("Press any key to continue...\n\n")
+    if not headless:
+        print("\nMake sure the server is running in another window!")
+        input("Press any key to continue...\n\n")
 
     print("[INFO] Connecting to server...")
     try:
-        sio.connect(SERVER_URL)
+        # Declare capabilities once so the server skips per-frame identification
+        sio.connect(SERVER_URL, auth={
+            "client": "PYTHON",
+            "format": "jpeg",
+            "binary": BINARY_FRAMES,
+            "fps": FPS_TARGET,
+            "width": YOLO_WIDTH,
+            "height": YOLO_HEIGHT,
+        })
     except Exception as e:
         print(f"[ERROR] Could not connect: {e}")
         return
 
     print("[INFO] Opening camera...")
-    cap = cv2.VideoCapture(CAMERA_ID)
+    cap = cv2.VideoCapture(source)
     if not cap.isOpened():
         print("[ERROR] Cannot open camera")
+        sio.disconnect()
         return
 
     cam_w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     cam_h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
     print(f"[CAMERA] Resolution: {cam_w}×{cam_h}")
-
-    cv2.namedWindow(WINDOW_NAME, cv2.WINDOW_NORMAL | cv2.WINDOW_KEEPRATIO)
-    cv2.resizeWindow(WINDOW_NAME, 720, 1280)
-    print("[DISPLAY] Window: 720×1280 (Portrait 9:16)\n")
-
-    print("=" * 60)
-    print("[INFO] 📱 PORTRAIT VIEW MODE ACTIVE (upright)")
-    print("[INFO] Press 'q' to quit, 'f' for fullscreen")
-    print("=" * 60 + "\n")
+    print(f"[PIPELINE] Up to {pipeline_depth} frame(s) in flight")
+    estimate_clock_offset()
+
+    # A video file stands in for a camera at its own frame rate
+    capture = CaptureThread(cap, realtime_fps=(cap.get(cv2.CAP_PROP_FPS) or FPS_TARGET)
+                            if isinstance(source, str) else None)
+    stop = threading.Event()
+    encoder = threading.Thread(target=encode_loop, args=(capture, stop), name="encode", daemon=True)
+    capture.start()
+    encoder.start()
+
+    if not headless:
+        cv2.namedWindow(WINDOW_NAME, cv2.WINDOW_NORMAL | cv2.WINDOW_KEEPRATIO)
+        cv2.resizeWindow(WINDOW_NAME, 720, 1280)
+        print("[DISPLAY] Window: 720×1280 (Portrait 9:16)\n")
+
+        print("=" * 60)
+        print("[INFO] 📱 PORTRAIT VIEW MODE ACTIVE (upright)")
+        print("[INFO] Press 'q' to quit, 'f' for fullscreen")
+        print("=" * 60 + "\n")
 
     frame_count, fps, fullscreen = 0, 0.0, False
-    start_time, last_send_time = time.time(), 0
+    start_time = time.time()
+    deadline = time.time() + duration if duration else None
+    shown_seq = 0
 
-    while True:
-        ret, camera_frame = cap.read()
-        if not ret:
-            print("[ERROR] Failed to read frame")
-            break
-
-        rotated_frame = rotate_to_portrait(camera_frame)
-        yolo_frame, _ = prepare_for_yolo(rotated_frame)
-        padded, scale, pad_left, pad_top = letterbox_9_16(
-            yolo_frame, YOLO_WIDTH, YOLO_HEIGHT
-        )
-
-        last_transform = {
-            "cam_w": cam_w,
-            "cam_h": cam_h,
-            "yolo_scale": scale,
-            "yolo_pad_left": pad_left,
-            "yolo_pad_top": pad_top,
-            "rot_w": rotated_frame.shape[1],
-            "rot_h": rotated_frame.shape[0],
-            "mirrored": True,
-        }
-
-        now = time.time()
-        if (now - last_send_time) >= FRAME_DELAY and not processing:
-            processing = True
-            try:
-                b64 = encode_frame(padded, 80)
-                sio.emit("frame", {"image": b64})
-            except Exception as e:
-                print(f"[ERROR] Send failed: {e}")
-                processing = False
-            last_send_time = now
-
-        display = rotated_frame
-        if last_transform and current_detections:
-            display = draw_detections(display, current_detections, last_transform)
-
-        frame_count += 1
-        elapsed = time.time() - start_time
-        if elapsed >= 1.0:
-            fps = frame_count / elapsed
-            frame_count, start_time = 0, time.time()
-
-        display = draw_info(display, fps, detection_count, processing)
-        cv2.imshow(WINDOW_NAME, display)
-
-        key = cv2.waitKey(1) & 0xFF
-        if key == ord("q"):
-            print("\n[INFO] Quitting...")
-            break
-        elif key == ord("f"):
-            fullscreen = not fullscreen
-            mode = cv2.WINDOW_FULLSCREEN if fullscreen else cv2.WINDOW_NORMAL
-            cv2.setWindowProperty(WINDOW_NAME, cv2.WND_PROP_FULLSCREEN, mode)
-            print(f"[INFO] Fullscreen: {'ON' if fullscreen else 'OFF'}")
+    try:
+        while capture.running and (deadline is None or time.time() < deadline):
+            if headless:
+                time.sleep(0.1)
+                continue
+            latest = capture.latest(shown_seq)
+            if latest is None:
+                continue
+            shown_seq, camera_frame, _ = latest
+
+            # One copy into the renderer's reused buffer; everything else draws in place
+            display = renderer.canvas(rotate_to_portrait(camera_frame))
+            if last_transform and current_detections:
+                draw_detections(display, current_detections, last_transform)
+
+            frame_count += 1
+            elapsed = time.time() - start_time
+            if elapsed >= 1.0:
+                fps = frame_count / elapsed
+                frame_count, start_time = 0, time.time()
+
+            draw_info(display, fps, detection_count, round_trips.in_flight())
+            cv2.imshow(WINDOW_NAME, display)
+
+            key = cv2.waitKey(1) & 0xFF
+            if key == ord("q"):
+                print("\n[INFO] Quitting...")
+                break
+            elif key == ord("f"):
+                fullscreen = not fullscreen
+                mode = cv2.WINDOW_FULLSCREEN if fullscreen else cv2.WINDOW_NORMAL
+                cv2.setWindowProperty(WINDOW_NAME, cv2.WND_PROP_FULLSCREEN, mode)
+                print(f"[INFO] Fullscreen: {'ON' if fullscreen else 'OFF'}")
+    except KeyboardInterrupt:
+        print("\n[INFO] Interrupted")
 
     print("[INFO] Cleaning up...")
+    stop.set()
+    encoder.join(timeout=2.0)
+    # Give frames still in flight a moment to come back
+    round_trips.wait_for_slot(1, timeout=min(REPLY_TIMEOUT_S, 2.0))
+    capture.stop()
+    capture.join(timeout=2.0)
+    report = round_trips.summary(capture.seq)
+    print_summary(report)
+    if report_path:
+        with open(report_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"[INFO] Report written to {report_path}")
     cap.release()
-    cv2.destroyAllWindows()
+    if not headless:
+        cv2.destroyAllWindows()
     sio.disconnect()
     print("[INFO] Done.\n")
 
-
 if __name__ == "__main__":
     main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Tests for emit_queue.py with a non-Socket.IO transport
+Run: python -m unittest test_emit_queue
+"""
+
+import asyncio
+import unittest
+from unittest import mock
+
+import config
+from emit_queue import EmitQueue
+
+
+class StuckTransport:
+    """A raw socket whose client stopped reading: sends never complete"""
+
+    def __init__(self):
+        self.started = 0
+
+    async def __call__(self, sid, event, payload):
+        self.started += 1
+        await asyncio.Event().wait()
+
+
+class RawTransportTest(unittest.TestCase):
+
+    def test_stuck_client_only_stalls_its_own_queue(self):
+        async def scenario():
+            queue = EmitQueue(sio=None)
+            stuck, sent = StuckTransport(), []
+
+            async def reading(sid, event, payload):
+                sent.append(payload["frame_id"])
+
+            for frame_id in range(5):
+                # send() must return at once even though the transport is stuck
+                queue.send("ws-stuck", "detections", {"frame_id": frame_id}, transport=stuck)
+                queue.send("ws-ok", "detections", {"frame_id": frame_id}, transport=reading)
+            await asyncio.sleep(0.05)
+            stats = queue.stats("ws-stuck")
+            queue.forget("ws-stuck")
+            queue.forget("ws-ok")
+            return stuck.started, stats, sent
+
+        with mock.patch.object(config, "EMIT_TIMEOUT_S", 10):
+            started, stats, sent = asyncio.run(scenario())
+        self.assertEqual(started, 1)
+        # Numbered replies are kept (binary replies can't list coalesced frame ids)
+        self.assertEqual(stats["queued"], 4)
+        self.assertEqual(stats["coalesced"], 0)
+        self.assertEqual(sent, [0, 1, 2, 3, 4])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Tests for model_registry.py routing and eviction
+Run: python -m unittest test_model_registry
+"""
+
+import asyncio
+import unittest
+from unittest import mock
+
+import config
+from model_registry import ModelEntry, ModelRegistry
+
+MB = 1024 * 1024
+
+
+def fake_build(registry, name, path, tier_paths, version):
+    """Stands in for ModelRegistry._build: a 1 MB entry without loading weights"""
+    if path == "missing.pt":
+        raise FileNotFoundError(path)
+    return ModelEntry(name, path, object(), None, MB, 0.0, version)
+
+
+class CascadeCapacityTest(unittest.TestCase):
+
+    def setUp(self):
+        # Room for exactly one model; the default model is not part of the cascade
+        patches = [
+            mock.patch.object(config, "MODELS", {"default": "default.pt", "fast": "fast.pt",
+                                                 "large": "large.pt", "broken": "missing.pt"}),
+            mock.patch.object(config, "CASCADES", {
+                "cascade": {"first": "fast", "second": "large", "min_confidence": 0.5},
+                "broken_cascade": {"first": "fast", "second": "broken"},
+            }),
+            mock.patch.object(config, "DEFAULT_MODEL", "default"),
+            mock.patch.object(config, "MODEL_MEMORY_BUDGET_MB", 1),
+            mock.patch.object(ModelRegistry, "_build", fake_build),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.registry = ModelRegistry()
+
+    def test_second_model_does_not_evict_the_first(self):
+        route = asyncio.run(self.registry.acquire("cascade"))
+        fast, large = route["entries"]
+        self.assertEqual([fast.name, large.name], ["fast", "large"])
+        # Over budget, but both models of the frame stay loaded and pinned
+        self.assertIn("fast", self.registry.entries)
+        self.assertIn("large", self.registry.entries)
+        self.assertEqual((fast.in_use, large.in_use), (1, 1))
+
+        self.registry.release(route)
+        self.assertEqual((fast.in_use, large.in_use), (0, 0))
+
+    def test_failed_second_load_unpins_the_first(self):
+        with self.assertRaises(FileNotFoundError):
+            asyncio.run(self.registry.acquire("broken_cascade"))
+        self.assertEqual(self.registry.entries["fast"].in_use, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Tests for raw_ws.py capability parsing
+Run: python -m unittest test_raw_ws
+"""
+
+import unittest
+
+from raw_ws import capabilities_from_query
+from sessions import Session
+
+
+def raw_session(query: dict):
+    """Session opened the way server.raw_connect opens one"""
+    auth, problems = capabilities_from_query(query)
+    session = Session("ws-test")
+    problems += session.apply_capabilities(auth)
+    return session, problems
+
+
+class RawCapabilitiesTest(unittest.TestCase):
+
+    def test_annotate_false_stays_off(self):
+        for value in ("false", "0", "no", "off"):
+            session, problems = raw_session({"client": "PYTHON", "format": "jpeg", "annotate": value})
+            self.assertFalse(session.annotate, value)
+            self.assertEqual(problems, [], value)
+
+    def test_annotate_true_is_refused(self):
+        session, problems = raw_session({"client": "PYTHON", "annotate": "true"})
+        self.assertFalse(session.annotate)
+        self.assertEqual(len(problems), 1)
+
+    def test_timing_is_refused(self):
+        _, problems = raw_session({"timing": "1"})
+        self.assertEqual(len(problems), 1)
+        _, problems = raw_session({"timing": "0"})
+        self.assertEqual(problems, [])
+
+    def test_frames_are_always_binary(self):
+        session, problems = raw_session({"binary": "0"})
+        self.assertTrue(session.binary)
+        self.assertEqual(len(problems), 1)
+
+    def test_socketio_auth_flags(self):
+        session = Session("sid")
+        self.assertEqual(session.apply_capabilities({"binary": "false", "annotate": "yes"}), [])
+        self.assertFalse(session.binary)
+        self.assertTrue(session.annotate)
+        self.assertEqual(len(session.apply_capabilities({"binary": "maybe"})), 1)
+        self.assertFalse(session.binary)
+
+
+if __name__ == "__main__":
+    unittest.main()
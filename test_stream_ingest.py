@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tests for stream_ingest.py
+Run: python -m unittest test_stream_ingest
+"""
+
+import asyncio
+import time
+import unittest
+
+import numpy as np
+
+from stream_ingest import StreamIngest
+
+
+class SlowDecoder:
+    """Stands in for a decoder whose chunk takes a while to decode"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    def feed(self, chunk):
+        time.sleep(self.seconds)  # Blocking, like PyAV / cv2.imdecode
+        return np.zeros((4, 4, 3), np.uint8), 1
+
+
+class StreamIngestTest(unittest.TestCase):
+
+    def test_event_loop_stays_responsive_while_a_chunk_decodes(self):
+        async def scenario():
+            ingest = StreamIngest()
+            ingest._session("sid", "mjpeg")["decoder"] = SlowDecoder(0.3)
+            ran = []
+
+            async def worker(sid):
+                ran.append(ingest.take(sid))
+
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            tick_task = asyncio.ensure_future(ticker())
+            count = await ingest.feed("sid", "mjpeg", b"chunk", worker)
+            tick_task.cancel()
+            await asyncio.sleep(0)
+            return count, ticks, ran
+
+        count, ticks, ran = asyncio.run(scenario())
+        self.assertEqual(count, 1)
+        # ~30 ticks fit into a 0.3 s decode; a blocked loop would manage at most one
+        self.assertGreater(ticks, 10)
+        self.assertEqual(len(ran), 1)
+
+    def test_chunks_of_a_session_decode_in_order(self):
+        class Recorder:
+            def __init__(self):
+                self.seen = []
+
+            def feed(self, chunk):
+                time.sleep(0.05 if chunk == b"1" else 0.0)
+                self.seen.append(chunk)
+                return None, 0
+
+        async def scenario():
+            ingest = StreamIngest()
+            decoder = ingest._session("sid", "mjpeg")["decoder"] = Recorder()
+            await asyncio.gather(*(ingest.feed("sid", "mjpeg", bytes(str(i), "ascii"), None) for i in range(1, 4)))
+            return decoder.seen
+
+        self.assertEqual(asyncio.run(scenario()), [b"1", b"2", b"3"])
+
+    def test_forgotten_session_is_not_revived_by_a_late_decode(self):
+        async def scenario():
+            ingest = StreamIngest()
+            ingest._session("sid", "mjpeg")["decoder"] = SlowDecoder(0.05)
+            feeding = asyncio.ensure_future(ingest.feed("sid", "mjpeg", b"chunk", None))
+            await asyncio.sleep(0.01)
+            ingest.forget("sid")
+            await feeding
+            return ingest.sessions
+
+        self.assertEqual(asyncio.run(scenario()), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+CPU thread budget for YOLOv11x backend
+Sizes OpenCV's and PyTorch's thread pools together so decoding and
+inference running side by side don't oversubscribe the cores
+"""
+
+import os
+from typing import Dict, Optional
+
+import cv2
+import torch
+
+import config
+
+_applied: Optional[Dict] = None
+
+
+def detect_cores() -> int:
+    """
+    Cores this process may actually use: CPU affinity, capped by a
+    cgroup v2 CPU quota (Docker --cpus) when one is set
+    """
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:  # Not available on Windows / macOS
+        cores = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            cores = min(cores, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, cores)
+
+
+def plan_threads(cores: int = None, inference_workers: int = None, decode_workers: int = None) -> Dict:
+    """
+    Work out thread counts for one server process
+
+    Cores left after THREADS_RESERVED (event loop, sockets) and one per
+    decode worker go to PyTorch, split across inference workers. Each
+    decode worker is a parallel stream already, so OpenCV gets one thread
+    unless frames are decoded on the event loop. Explicit THREADS_* values
+    in config.py override the automatic ones.
+
+    Returns:
+        {'cores', 'torch_intra', 'torch_interop', 'opencv'}
+    """
+    cores = cores or detect_cores()
+    inference_workers = inference_workers or config.INFERENCE_WORKERS
+    if decode_workers is None:
+        decode_workers = config.PIPELINE_DECODE_WORKERS
+
+    spare = max(1, cores - config.THREADS_RESERVED - decode_workers)
+    torch_intra = config.THREADS_TORCH_INTRA or max(1, spare // inference_workers)
+    if config.THREADS_OPENCV is not None:
+        opencv = config.THREADS_OPENCV
+    elif decode_workers > 0:
+        opencv = 1
+    else:
+        opencv = max(1, cores - config.THREADS_RESERVED - torch_intra * inference_workers)
+    return {
+        "cores": cores,
+        "torch_intra": torch_intra,
+        "torch_interop": config.THREADS_TORCH_INTEROP,
+        "opencv": opencv,
+    }
+
+
+def apply_thread_budget(plan: Dict = None) -> Dict:
+    """
+    Apply a plan (default: plan_threads()) to OpenCV and PyTorch
+
+    Call once at startup, before the first inference: PyTorch's inter-op
+    pool can't be resized after it has started.
+
+    Returns:
+        The plan as applied
+    """
+    global _applied
+    plan = dict(plan or plan_threads())
+    cv2.setNumThreads(plan["opencv"])
+    torch.set_num_threads(plan["torch_intra"])
+    try:
+        torch.set_num_interop_threads(plan["torch_interop"])
+    except RuntimeError:
+        # Already started (parallel work ran before this call): keep what's there
+        plan["torch_interop"] = torch.get_num_interop_threads()
+    _applied = plan
+    return plan
+
+
+def thread_info() -> Dict:
+    """Plan in effect plus what the libraries report now"""
+    return {
+        "enabled": config.THREAD_BUDGET_ENABLED,
+        "applied": _applied,
+        "opencv": cv2.getNumThreads(),
+        "torch_intra": torch.get_num_threads(),
+        "torch_interop": torch.get_num_interop_threads(),
+    }
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Inference resolution tiers for YOLOv11x backend
+Per-tier model instances, warm-up and latency statistics
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+
+import torch
+from ultralytics import YOLO
+
+import config
+
+
+def pick_tier(requested: Optional[int], recommended: Optional[int], default: int = None) -> int:
+    """
+    Choose the inference size for a frame
+
+    Args:
+        requested: Size pinned by the client ('imgsz' in frame data), if any
+        recommended: Size suggested by the load controller, if any
+        default: Size to use otherwise (defaults to config.IMAGE_SIZE)
+
+    Returns:
+        One of config.INFERENCE_TIERS, or the default
+    """
+    if requested in config.INFERENCE_TIERS:
+        return requested
+    if config.AUTO_INFERENCE_TIER and recommended in config.INFERENCE_TIERS:
+        return recommended
+    return default or config.IMAGE_SIZE
+
+
+class TierModels:
+    """
+    Model instance per inference size.
+
+    PyTorch weights accept any input size, so tiers share the base model by
+    default; fixed-shape exports can be listed per size (for the default
+    model: config.TIER_MODEL_PATHS). warm_up() runs a dummy batch per tier so
+    the first real frame at each size does not pay for graph setup.
+    """
+
+    def __init__(self, base_model, paths: Dict[int, str] = None):
+        self.base_model = base_model
+        self.models: Dict[int, object] = {}
+        for size, path in (paths or {}).items():
+            print(f"  Loading {size}px tier model: {path}")
+            self.models[int(size)] = YOLO(path)
+
+    def get(self, size: int):
+        """Model to use for an input size"""
+        return self.models.get(size, self.base_model)
+
+    def warm_up(self, params: Dict):
+        """Run one dummy inference per tier"""
+        for size in sorted(set(config.INFERENCE_TIERS) | {config.IMAGE_SIZE}):
+            start = time.perf_counter()
+            dummy = torch.zeros((1, 3, size, size), device=torch.device(config.DEVICE))
+            self.get(size)(dummy, **params)
+            print(f"  Warmed up {size}px tier ({(time.perf_counter() - start) * 1000:.0f} ms)")
+
+
+class TierStats:
+    """Per-tier inference latency, batch size and frame counts (thread-safe)"""
+
+    def __init__(self):
+        self.tiers: Dict[int, Dict] = {}
+        self._lock = threading.Lock()
+
+    def record(self, size: int, latency_ms: float, batch_size: int):
+        """
+        Record one model call
+
+        Args:
+            size: Inference size of the call
+            latency_ms: Time for the whole call (preprocess + model)
+            batch_size: Frames in the call
+        """
+        with self._lock:
+            tier = self.tiers.setdefault(size, {
+                "calls": 0, "frames": 0, "total_ms": 0.0, "max_ms": 0.0, "last_ms": 0.0,
+            })
+            tier["calls"] += 1
+            tier["frames"] += batch_size
+            tier["total_ms"] += latency_ms
+            tier["max_ms"] = max(tier["max_ms"], latency_ms)
+            tier["last_ms"] = latency_ms
+
+    def stats(self) -> Dict:
+        """Latency summary per tier"""
+        with self._lock:
+            tiers = {size: dict(t) for size, t in self.tiers.items()}
+        return {
+            size: {
+                "calls": t["calls"],
+                "frames": t["frames"],
+                "avg_call_ms": round(t["total_ms"] / t["calls"], 2),
+                "avg_frame_ms": round(t["total_ms"] / t["frames"], 2),
+                "max_call_ms": round(t["max_ms"], 2),
+                "last_call_ms": round(t["last_ms"], 2),
+            }
+            for size, t in sorted(tiers.items())
+        }
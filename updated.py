@@ -15,20 +15,30 @@ import config
 from collections import deque
 import uuid
 import time
-import threading
+from preprocess import get_letterboxer, unletterbox_box
+from sessions import SessionRegistry
 
 # -------------------------------
 # Socket.IO server
 # -------------------------------
 sio = socketio.AsyncServer(async_mode="asgi", cors_allowed_origins=config.CORS_ORIGINS)
 
-app = socketio.ASGIApp(sio)
-
 # -------------------------------
 # Global variables
 # -------------------------------
 model = None
-object_tracker = {}  # {unique_id: last_seen_timestamp}
+# Per-client state; each session's tracker maps object id -> last seen
+# and drops objects older than SESSION_OBJECT_TTL_S
+sessions = SessionRegistry(on_expire=lambda sid, reason: sio.disconnect(sid))
+background_tasks = []
+
+
+async def on_startup():
+    # Idle-session expiry runs on the event loop (no thread sharing the trackers)
+    background_tasks.append(asyncio.create_task(sessions.run()))
+
+
+app = socketio.ASGIApp(sio, on_startup=on_startup)
 
 
 # -------------------------------
@@ -50,17 +60,6 @@ def load_model():
         return False
 
 
-# -------------------------------
-# Helper: Resize frame for bandwidth
-# -------------------------------
-def preprocess_frame(frame, max_dim=640):
-    h, w = frame.shape[:2]
-    scale = max_dim / max(h, w)
-    if scale < 1.0:
-        frame = cv2.resize(frame, (int(w * scale), int(h * scale)))
-    return frame
-
-
 # -------------------------------
 # Persistent ID generator
 # -------------------------------
@@ -73,6 +72,9 @@ def get_persistent_id():
 # -------------------------------
 @sio.event
 async def connect(sid, environ):
+    if sessions.create(sid) is None:
+        # SESSION_MAX_COUNT live sessions: refuse rather than accept a client whose frames would be dropped
+        raise socketio.exceptions.ConnectionRefusedError("Server is at capacity, try again later")
     print(f"[CONNECT] Client connected: {sid}")
     await sio.emit(
         "connection_response",
@@ -83,6 +85,7 @@ async def connect(sid, environ):
 
 @sio.event
 async def disconnect(sid):
+    sessions.remove(sid)
     print(f"[DISCONNECT] Client disconnected: {sid}")
 
 
@@ -97,6 +100,10 @@ async def frame(sid, data):
         'image': base64_encoded_image
     }
     """
+    session = sessions.touch(sid)
+    if session is None:
+        return  # Expired; the client is being disconnected
+
     try:
         if model is None:
             await sio.emit("error", {"message": "Model not loaded"}, to=sid)
@@ -111,27 +118,29 @@ async def frame(sid, data):
             await sio.emit("error", {"message": "Failed to decode image"}, to=sid)
             return
 
-        # Resize to reduce bandwidth / inference time
-        frame = preprocess_frame(frame, max_dim=config.FRAME_MAX_DIM)
         h, w = frame.shape[:2]
 
         # -------------------------------
         # Run YOLO inference asynchronously
+        # (single letterbox into the worker's reused input buffer)
         # -------------------------------
+        def run_inference():
+            input_tensor, transform = get_letterboxer()(frame)
+            return model(input_tensor, **config.YOLO_PARAMS), transform
+
         loop = asyncio.get_event_loop()
-        results = await loop.run_in_executor(
-            None, lambda: model(frame, **config.YOLO_PARAMS)
-        )
+        results, transform = await loop.run_in_executor(None, run_inference)
 
         detections = []
-        current_time = time.time()
+        current_time = time.monotonic()
+        session.expire_objects(current_time)
 
         for result in results:
             boxes = result.boxes
             for box in boxes:
                 class_id = int(box.cls[0])
                 label = model.names[class_id]
-                bbox = box.xyxy[0].tolist()  # [x1, y1, x2, y2]
+                bbox = unletterbox_box(box.xyxy[0].tolist(), transform)  # [x1, y1, x2, y2]
 
                 # Assign persistent ID
                 unique_id = get_persistent_id()
@@ -146,8 +155,8 @@ async def frame(sid, data):
                     }
                 )
 
-                # Track last seen timestamp
-                object_tracker[unique_id] = current_time
+                # Track last seen timestamp (stale objects are dropped as we go)
+                session.track(unique_id, current_time)
 
         # Send detections to Flutter client
         await sio.emit(
@@ -156,6 +165,7 @@ async def frame(sid, data):
                 "detections": detections,
                 "count": len(detections),
                 "frame_size": {"width": w, "height": h},  # for coordinate mapping
+                "transform": transform,
             },
             to=sid,
         )
@@ -175,20 +185,6 @@ async def ping(sid, data):
     await sio.emit("pong", {"timestamp": data.get("timestamp")}, to=sid)
 
 
-# -------------------------------
-# Cleanup old tracked objects
-# -------------------------------
-def cleanup_old_objects(max_age_seconds=5):
-    while True:
-        now = time.time()
-        to_remove = [
-            uid for uid, t in object_tracker.items() if now - t > max_age_seconds
-        ]
-        for uid in to_remove:
-            del object_tracker[uid]
-        time.sleep(1)
-
-
 # -------------------------------
 # Main server entry point
 # -------------------------------
@@ -200,10 +196,6 @@ def main():
     if not load_model():
         print("[WARNING] Server starting without a model loaded.")
 
-    # Start object cleanup thread
-    cleanup_thread = threading.Thread(target=cleanup_old_objects, daemon=True)
-    cleanup_thread.start()
-
     # Start server
     print(f"\nStarting server on {config.SERVER_HOST}:{config.SERVER_PORT}")
     print("Press CTRL+C to stop\n")
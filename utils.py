@@ -9,6 +9,10 @@ import numpy as np
 import base64
 from typing import List, Dict, Tuple
 
+from annotate import AnnotationRenderer
+
+_renderers: Dict[Tuple, AnnotationRenderer] = {}  # (color, thickness) -> renderer used by draw_detections
+
 def resize_frame(frame: np.ndarray, target_size: Tuple[int, int] = (640, 640)) -> np.ndarray:
     """
     Resize frame to target size while maintaining aspect ratio
@@ -151,7 +155,8 @@ def draw_detections(
     frame: np.ndarray,
     detections: List[Dict],
     color: Tuple[int, int, int] = (0, 255, 0),
-    thickness: int = 2
+    thickness: int = 2,
+    inplace: bool = False
 ) -> np.ndarray:
     """
     Draw bounding boxes and labels on frame
@@ -161,41 +166,18 @@ def draw_detections(
         detections: List of detection dictionaries
         color: Box color (B, G, R)
         thickness: Box thickness
+        inplace: Draw into frame itself instead of a copy
     
     Returns:
         Frame with drawn detections
     """
-    frame_copy = frame.copy()
-    
-    for det in detections:
-        x1, y1, x2, y2 = map(int, det['bbox'])
-        label = f"{det['class_name']}: {det['confidence']:.2f}"
-        
-        # Draw box
-        cv2.rectangle(frame_copy, (x1, y1), (x2, y2), color, thickness)
-        
-        # Draw label background
-        label_size, _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
-        cv2.rectangle(
-            frame_copy,
-            (x1, y1 - label_size[1] - 10),
-            (x1 + label_size[0], y1),
-            color,
-            -1
-        )
-        
-        # Draw label text
-        cv2.putText(
-            frame_copy,
-            label,
-            (x1, y1 - 5),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            0.5,
-            (0, 0, 0),
-            1
+    # One renderer per style, so label glyphs stay cached between calls
+    renderer = _renderers.get((color, thickness))
+    if renderer is None:
+        renderer = _renderers.setdefault(
+            (color, thickness), AnnotationRenderer(box_color=color, box_thickness=thickness, label_color=color)
         )
-    
-    return frame_copy
+    return renderer.draw_detections(frame if inplace else frame.copy(), detections)
 
 def get_detection_statistics(detections: List[Dict]) -> Dict:
     """